@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+from dbt_selection import select_args
+
+def run_dbt_agg():
+    """
+    Run all dashboard aggregate models under marts/agg
+    """
+    try:
+        result = subprocess.run(
+            ["dbt", "run"] + select_args("path:marts/agg"),
+            check=True,
+            text=True
+        )
+        print("✅ dbt run (agg) completed successfully.")
+    except subprocess.CalledProcessError as e:
+        print("❌ dbt run (agg) failed.")
+        print(f"Exit code: {e.returncode}")
+        sys.exit(e.returncode)
+
+if __name__ == "__main__":
+    print("▶ Running dbt dashboard aggregate models: path:marts/agg ...")
+    run_dbt_agg()
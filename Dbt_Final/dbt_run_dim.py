@@ -1,13 +1,15 @@
 import subprocess
 import sys
 
+from dbt_selection import select_args
+
 def run_dbt_dim():
     """
     Run all dimension models under marts/dim
     """
     try:
         result = subprocess.run(
-            ["dbt", "run", "--select", "path:marts/dim"],
+            ["dbt", "run"] + select_args("path:marts/dim"),
             check=True,
             text=True
         )
@@ -1,13 +1,26 @@
+import json
+import os
 import subprocess
 import sys
 
+from dbt_selection import select_args
+
+# Set by daily partitioned Dagster runs; scopes the fact models to one order day
+PARTITION_DATE = os.environ.get("OLIST_PARTITION_DATE")
+
+def partition_vars():
+    """--vars for a partitioned run, empty otherwise"""
+    if not PARTITION_DATE:
+        return []
+    return ["--vars", json.dumps({"partition_date": PARTITION_DATE})]
+
 def run_dbt_fact():
     """
     Run all fact models under marts/fact
     """
     try:
         result = subprocess.run(
-            ["dbt", "run", "--select", "path:marts/fact"],
+            ["dbt", "run"] + select_args("path:marts/fact") + partition_vars(),
             check=True,
             text=True
         )
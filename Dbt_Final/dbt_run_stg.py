@@ -1,13 +1,15 @@
 import subprocess
 import sys
 
+from dbt_selection import select_args
+
 def run_dbt_stg():
     """
     Run all staging models (stg_db_*)
     """
     try:
         result = subprocess.run(
-            ["dbt", "run", "--select", "stg_db_*"],
+            ["dbt", "run"] + select_args("stg_db_*"),
             check=True,
             text=True
         )
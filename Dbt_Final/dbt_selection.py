@@ -0,0 +1,13 @@
+import os
+
+# Sensor-triggered micro-batch runs (dagster_proj/jobs/sensors.py) pass the raw
+# tables whose CSV files changed; only models downstream of them are run and tested
+CHANGED_SOURCES = [s for s in os.environ.get("OLIST_CHANGED_SOURCES", "").split(",") if s]
+SOURCE_NAME = "olist_raw"
+
+def select_args(selector):
+    """--select for `selector`, narrowed to the models downstream of CHANGED_SOURCES if set"""
+    if not CHANGED_SOURCES:
+        return ["--select", selector]
+    # "a,b" is an intersection, space separated selectors a union
+    return ["--select"] + [f"{selector},source:{SOURCE_NAME}.{source}+" for source in CHANGED_SOURCES]
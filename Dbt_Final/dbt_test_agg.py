@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+from dbt_selection import select_args
+
+def test_dbt_agg():
+    """
+    Run dbt tests for all dashboard aggregate models under marts/agg
+    """
+    try:
+        result = subprocess.run(
+            ["dbt", "test"] + select_args("path:marts/agg"),
+            check=True,
+            text=True
+        )
+        print("✅ dbt test (agg) completed successfully.")
+    except subprocess.CalledProcessError as e:
+        print("❌ dbt test (agg) failed.")
+        print(f"Exit code: {e.returncode}")
+        sys.exit(e.returncode)
+
+if __name__ == "__main__":
+    print("▶ Testing dbt dashboard aggregate models: path:marts/agg ...")
+    test_dbt_agg()
@@ -1,13 +1,15 @@
 import subprocess
 import sys
 
+from dbt_selection import select_args
+
 def test_dbt_dim():
     """
     Run dbt tests for all dimension models under marts/dim
     """
     try:
         result = subprocess.run(
-            ["dbt", "test", "--select", "path:marts/dim"],
+            ["dbt", "test"] + select_args("path:marts/dim"),
             check=True,
             text=True
         )
@@ -1,13 +1,15 @@
 import subprocess
 import sys
 
+from dbt_selection import select_args
+
 def test_dbt_stg():
     """
     Run dbt tests for all staging models (stg_db_*)
     """
     try:
         result = subprocess.run(
-            ["dbt", "test", "--select", "stg_db_*"],
+            ["dbt", "test"] + select_args("stg_db_*"),
             check=True,
             text=True
         )
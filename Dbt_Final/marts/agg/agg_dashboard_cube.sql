@@ -0,0 +1,28 @@
+{{ config(materialized='table') }}
+
+-- Additive measures by year/month x customer state x seller x category, for
+-- slicing the dashboard data down to a single seller without touching
+-- fact_db_order_items. seller_state is the seller's attribute, not part of the grain.
+-- Distinct counts are not additive; they live in agg_dashboard_series.
+
+select
+  d.year,
+  d.year_month,
+  c.customer_state,
+  f.seller_id,
+  s.seller_state,
+  coalesce(p.product_category_name_english, p.product_category_name) as category,
+  count(*)                      as order_items,
+  sum(f.price)                  as price,
+  sum(f.freight_value)          as freight_value,
+  sum(f.gross_order_item_value) as gross_order_item_value
+from {{ ref('fact_db_order_items') }} f
+join {{ ref('dim_db_dates') }} d
+  on f.order_date_key = d.date_key
+left join {{ ref('dim_db_customers') }} c
+  on f.customer_id = c.customer_id
+left join {{ ref('dim_db_sellers') }} s
+  on f.seller_id = s.seller_id
+left join {{ ref('dim_db_products') }} p
+  on f.product_id = p.product_id
+group by year, year_month, customer_state, f.seller_id, seller_state, category
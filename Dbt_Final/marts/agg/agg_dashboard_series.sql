@@ -0,0 +1,193 @@
+{{ config(materialized='table', cluster_by=['tab', 'series']) }}
+
+-- Every KPI and chart series of index.html, precomputed once per pipeline run.
+-- One row per (tab, series, year, label); year is NULL for the "All years" slicer.
+
+with base as (
+  select
+    f.order_id,
+    f.customer_id,
+    f.seller_id,
+    f.freight_value,
+    f.gross_order_item_value,
+    d.year,
+    d.year_month,
+    c.customer_state,
+    s.seller_city,
+    s.seller_state,
+    coalesce(p.product_category_name_english, p.product_category_name) as category,
+    c.customer_id is not null as has_customer,
+    s.seller_id is not null   as has_seller,
+    p.product_id is not null  as has_product
+  from {{ ref('fact_db_order_items') }} f
+  join {{ ref('dim_db_dates') }} d
+    on f.order_date_key = d.date_key
+  left join {{ ref('dim_db_customers') }} c
+    on f.customer_id = c.customer_id
+  left join {{ ref('dim_db_sellers') }} s
+    on f.seller_id = s.seller_id
+  left join {{ ref('dim_db_products') }} p
+    on f.product_id = p.product_id
+),
+
+-- Customers tab -------------------------------------------------------------
+customer_kpis as (
+  select
+    year,
+    cast(count(distinct customer_id) as float64) as customers,
+    cast(count(distinct concat(cast(year as string), ':', customer_id)) as float64) as order_rows,
+    cast(sum(gross_order_item_value) as float64) as total_rev
+  from base
+  group by grouping sets ((year), ())
+),
+
+customer_states as (
+  select
+    year,
+    customer_state as label,
+    cast(count(distinct customer_id) as float64) as value
+  from base
+  where has_customer
+  group by grouping sets ((year, customer_state), (customer_state))
+),
+
+-- Sellers tab ---------------------------------------------------------------
+seller_kpis as (
+  select
+    year,
+    cast(count(distinct seller_id) as float64)    as sellers,
+    cast(count(distinct seller_city) as float64)  as cities,
+    cast(count(distinct seller_state) as float64) as states,
+    cast(sum(gross_order_item_value) as float64)  as total_rev
+  from base
+  where has_seller
+  group by grouping sets ((year), ())
+),
+
+year_totals as (
+  select
+    year,
+    cast(sum(freight_value) as float64)          as freight,
+    cast(sum(gross_order_item_value) as float64) as revenue
+  from base
+  group by year
+),
+
+seller_states as (
+  select
+    seller_state as label,
+    cast(count(distinct seller_id) as float64) as value
+  from {{ ref('dim_db_sellers') }}
+  group by seller_state
+),
+
+seller_categories as (
+  select
+    year,
+    category as label,
+    cast(count(*) as float64) as value
+  from base
+  where has_product
+  group by grouping sets ((year, category), (category))
+  having count(*) > 2
+),
+
+-- Orders tab ----------------------------------------------------------------
+order_groups as (
+  select
+    order_id,
+    customer_id,
+    seller_id,
+    year,
+    count(*) as items,
+    sum(gross_order_item_value) as revenue
+  from base
+  group by order_id, customer_id, seller_id, year
+),
+
+order_kpis as (
+  select
+    year,
+    cast(count(distinct order_id) as float64)    as orders,
+    cast(count(distinct customer_id) as float64) as customers,
+    cast(count(distinct seller_id) as float64)   as sellers,
+    cast(sum(revenue) as float64)                as total_rev
+  from order_groups
+  where items > 2
+  group by grouping sets ((year), ())
+),
+
+category_years as (
+  select
+    year,
+    category,
+    count(distinct order_id) as orders,
+    sum(gross_order_item_value) as revenue
+  from base
+  where has_product
+  group by year, category
+),
+
+order_categories as (
+  select
+    year,
+    category as label,
+    cast(sum(revenue) as float64) as value
+  from category_years
+  where orders > 2
+  group by grouping sets ((year, category), (category))
+),
+
+seller_years as (
+  select
+    year,
+    concat('Seller ', substr(seller_id, 1, 8)) as seller_label,
+    count(distinct order_id) as orders,
+    sum(gross_order_item_value) as revenue
+  from base
+  group by year, seller_id, seller_label
+),
+
+order_sellers as (
+  select
+    year,
+    seller_label as label,
+    cast(sum(revenue) as float64) as value
+  from seller_years
+  where orders > 2
+  group by grouping sets ((year, seller_label), (seller_label))
+),
+
+orders_by_month as (
+  select
+    year,
+    year_month as label,
+    cast(count(distinct order_id) as float64) as value
+  from base
+  group by year, year_month
+  having count(distinct order_id) > 1
+)
+
+select 'customers' as tab, 'customer_kpis' as series, year, label, value
+from customer_kpis unpivot (value for label in (customers, order_rows, total_rev))
+union all
+select 'customers', 'customer_states', year, label, value from customer_states
+union all
+select 'sellers', 'seller_kpis', year, label, value
+from seller_kpis unpivot (value for label in (sellers, cities, states, total_rev))
+union all
+select 'sellers', 'seller_year_totals', year, label, value
+from year_totals unpivot (value for label in (freight, revenue))
+union all
+select 'sellers', 'seller_states', cast(null as int64), label, value from seller_states
+union all
+select 'sellers', 'seller_categories', year, label, value from seller_categories
+union all
+select 'orders', 'order_kpis', year, label, value
+from order_kpis unpivot (value for label in (orders, customers, sellers, total_rev))
+union all
+select 'orders', 'order_categories', year, label, value from order_categories
+union all
+select 'orders', 'order_sellers', year, label, value from order_sellers
+union all
+select 'orders', 'orders_by_month', year, label, value from orders_by_month
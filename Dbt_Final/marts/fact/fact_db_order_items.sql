@@ -1,4 +1,10 @@
-{{ config(materialized='table') }}
+-- Incremental on order day: a partitioned run (--vars '{"partition_date": "YYYY-MM-DD"}')
+-- rebuilds only that day's partition; without the var every day is rebuilt.
+{{ config(
+    materialized='incremental',
+    incremental_strategy='insert_overwrite',
+    partition_by={'field': 'order_date_key', 'data_type': 'date', 'granularity': 'day'}
+) }}
 
 select
   oi.order_id,
@@ -13,4 +19,6 @@ select
 from {{ ref('stg_db_order_items') }} oi
 left join {{ ref('stg_db_orders') }} o
   on oi.order_id = o.order_id
-
+{% if is_incremental() and var('partition_date', none) %}
+where date(o.order_purchase_timestamp) = date('{{ var("partition_date") }}')
+{% endif %}
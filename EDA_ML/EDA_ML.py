@@ -24,27 +24,76 @@
 # This section:
 # 
 # - Imports core Python libraries  
-# - Creates a BigQuery client (using Application Default Credentials or a service account)  
+# - Opens the shared warehouse pool (BigQuery via Application Default Credentials, or the local DuckDB stand-in)  
 # - Sets some display and plotting defaults
 
 # %%
-import pandas as pd
+import os
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pandas as pd
 
-from google.cloud import bigquery
+# Shared warehouse pool (dagster_proj/resources/warehouse.py); the Dagster op
+# passes its resource config through OLIST_* environment variables.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dagster_proj.resources.warehouse import get_warehouse
+from table_cache import TableCache
+from feature_store import CustomerFeatureStore
+from eda_aggregations import (
+    FACT, monthly_sales_query, top_categories_query, seller_activity_query, rfm_query,
+)
+
+# matplotlib/seaborn, scikit-learn and xgboost are imported by the functions that
+# use them: importing this module stays cheap, and the warm worker
+# (dagster_proj/worker.py) preloads them once for all runs instead.
 
 # Display options
 pd.set_option("display.max_columns", 100)
 pd.set_option("display.width", 200)
-sns.set(style="whitegrid", palette="deep")
 
-PROJECT_ID = "durable-ripsaw-477914-g0"  # <-- change if needed
-DATASET = "ecommerce"                    # dbt output dataset
+DATED_TABLES = {"fact_db_order_items": "order_date_key"}
+# The only fact columns brought to the client (health checks, freight vs price)
+ORDER_COLUMNS = ["order_date_key", "price", "freight_value", "gross_order_item_value"]
+URL = "https://pinghar.github.io/Brazilian-E-Commerce-Public-Dataset-by-Olist/"
+# Cores for XGBoost: the op's CPU share when run by the pipeline (dagster_proj/jobs/scheduling.py), else all
+N_JOBS = int(os.environ.get("OLIST_OP_THREADS", -1))
+
+# Set by setup(); module level so the cells below can also be run one by one
+warehouse = None
+table_cache = None
+PROJECT_ID = None
+DATASET = None
+AS_OF = None
+
+
+def setup(as_of=None):
+    """Opens the warehouse and the local table cache; `as_of` makes every read point-in-time."""
+    global warehouse, table_cache, PROJECT_ID, DATASET, AS_OF
+
+    warehouse = get_warehouse()
+    PROJECT_ID = warehouse.project_id  # <-- change if needed (or set OLIST_PROJECT_ID)
+    DATASET = warehouse.dataset        # dbt output dataset
+
+    print(f"✅ {warehouse.backend} warehouse initialised for project:", PROJECT_ID)
+
+    # Local Arrow cache of loaded tables, invalidated when a table is rebuilt
+    table_cache = TableCache()
 
-client = bigquery.Client(project=PROJECT_ID)
-print("✅ BigQuery client initialised for project:", PROJECT_ID)
+    # Daily partitioned Dagster runs set OLIST_PARTITION_DATE; every read below is
+    # then point-in-time: only orders on or before that day are used
+    AS_OF = as_of
+    if AS_OF:
+        print(f"📅 Partition run: reading orders as of {AS_OF}")
+
+
+def plotting():
+    """matplotlib.pyplot and seaborn, imported on first use."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set(style="whitegrid", palette="deep")
+    return plt, sns
 
 # %% [markdown]
 # ## Load dbt Star-Schema Tables
@@ -61,20 +110,38 @@ print("✅ BigQuery client initialised for project:", PROJECT_ID)
 # 
 
 # %%
-def load_table(table_name: str) -> pd.DataFrame:
-    """Helper to load a table from BigQuery into pandas."""
-    query = f"""SELECT * FROM `{PROJECT_ID}.{DATASET}.{table_name}`"""
+def load_table(table_name: str, columns=None) -> pd.DataFrame:
+    """Helper to load a table (optionally only `columns`) from the warehouse into pandas.
+
+    Results are cached on disk and reused until the table is rebuilt.
+    Dated tables are cut off at AS_OF on partitioned runs.
+    """
+    date_key = DATED_TABLES.get(table_name) if AS_OF else None
+    version = warehouse.table_version(table_name)
+    if date_key and version is not None:
+        version = f"{version}@{AS_OF}"
+    df = table_cache.get(table_name, columns, version)
+    if df is not None:
+        print(f"\n▶ Loaded {PROJECT_ID}.{DATASET}.{table_name} from cache (version {version})")
+        print(f"   Shape: {df.shape}")
+        return df
+
+    select = ", ".join(columns) if columns else "*"
+    query = f"""SELECT {select} FROM {warehouse.table(table_name)}"""
+    params = None
+    if date_key:
+        query += f" WHERE {date_key} <= :as_of"
+        params = {"as_of": pd.Timestamp(AS_OF).date()}
     print(f"\n▶ Loading {PROJECT_ID}.{DATASET}.{table_name} ...")
-    df = client.query(query).to_dataframe()
+    df = warehouse.query_df(query, params)
     print(f"   Shape: {df.shape}")
+    table_cache.put(table_name, columns, version, df)
     return df
 
-df_customers = load_table("dim_db_customers")
-df_sellers   = load_table("dim_db_sellers")
-df_products  = load_table("dim_db_products")
-df_orders    = load_table("fact_db_order_items")  # fact table from dbt
 
-df_customers.head()
+def load_orders() -> pd.DataFrame:
+    """The ORDER_COLUMNS of the fact table from dbt; aggregations over it run in the warehouse."""
+    return load_table(FACT, columns=ORDER_COLUMNS)
 
 # %% [markdown]
 # ## Basic Data Health Checks
@@ -87,34 +154,19 @@ df_customers.head()
 # - Key date ranges
 
 # %%
-df_customers.info()
-df_sellers.info()
-df_products.info()
-df_orders.info()
-
-# %%
-df_customers.describe()
-
-# %%
-df_sellers.describe()
-
-# %%
-df_products.describe()
+def health_checks(df_orders: pd.DataFrame):
+    df_orders.info()
 
-# %%
-df_orders.describe()
-
-# %%
-print("\n🔍 Missing values in fact_orders:")
-print(df_orders.isna().sum().sort_values(ascending=False))
+    print("\n🔍 Missing values in fact_orders:")
+    print(df_orders.isna().sum().sort_values(ascending=False))
 
-print("\n📊 Descriptive statistics (numeric columns):")
-print(df_orders.describe())
+    print("\n📊 Descriptive statistics (numeric columns):")
+    print(df_orders.describe())
 
-if 'order_date_key' in df_orders.columns:
-    df_orders['order_date_key'] = pd.to_datetime(df_orders['order_date_key'])
-    print("\n⏱ Purchase timestamp range:")
-    print(df_orders['order_date_key'].min(), "→", df_orders['order_date_key'].max())
+    if 'order_date_key' in df_orders.columns:
+        df_orders['order_date_key'] = pd.to_datetime(df_orders['order_date_key'])
+        print("\n⏱ Purchase timestamp range:")
+        print(df_orders['order_date_key'].min(), "→", df_orders['order_date_key'].max())
 
 # %% [markdown]
 # ## Monthly Sales Trend
@@ -126,29 +178,21 @@ if 'order_date_key' in df_orders.columns:
 # - Provide a high-level volume view for business stakeholders
 
 # %%
-# Create year-month column
-df_orders['year_month'] = df_orders['order_date_key'].dt.to_period('M').astype(str)
-
-# Compute monthly distinct orders
-monthly_sales = (
-    df_orders
-    .groupby('year_month')['order_id']
-    .nunique()
-    .reset_index(name='num_orders')
-)
-
-# Plot
-plt.figure(figsize=(15,5))
-sns.lineplot(data=monthly_sales, x='year_month', y='num_orders', marker="o")
-plt.title("Monthly Sales Trend (Number of Orders)")
-plt.xlabel("Year-Month")
-plt.ylabel("Distinct Orders")
-plt.xticks(rotation=45)
-plt.tight_layout()
-#plt.show()
-
-# Show last few rows
-monthly_sales.tail()
+def monthly_sales_trend() -> pd.DataFrame:
+    plt, sns = plotting()
+    # Compute monthly distinct orders in the warehouse (only the monthly rows come back)
+    monthly_sales = monthly_sales_query.run(warehouse, loader=load_table, as_of=AS_OF)
+
+    # Plot
+    plt.figure(figsize=(15,5))
+    sns.lineplot(data=monthly_sales, x='year_month', y='num_orders', marker="o")
+    plt.title("Monthly Sales Trend (Number of Orders)")
+    plt.xlabel("Year-Month")
+    plt.ylabel("Distinct Orders")
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    #plt.show()
+    return monthly_sales
 
 # %% [markdown]
 # ## Top Product Categories
@@ -158,33 +202,19 @@ monthly_sales.tail()
 # 
 
 # %%
-# Ensure we only keep relevant product columns
-product_cols = ['product_id', 'product_category_name', 'product_category_name_english']
-product_cols = [c for c in product_cols if c in df_products.columns]
-
-df_orders_products = df_orders.merge(
-    df_products[product_cols],
-    on='product_id',
-    how='left'
-)
-
-top_categories = (
-    df_orders_products
-    .groupby('product_category_name_english', dropna=False)['order_item_id']
-    .count()
-    .sort_values(ascending=False)
-    .head(20)
-)
-
-plt.figure(figsize=(12,8))
-sns.barplot(x=top_categories.values, y=top_categories.index)
-plt.title("Top 20 Product Categories by Items Sold")
-plt.xlabel("Order Items Count")
-plt.ylabel("Category (English)")
-plt.tight_layout()
-#plt.show()
-
-top_categories.to_frame(name='order_items').reset_index().head(10)
+def top_product_categories() -> pd.DataFrame:
+    plt, sns = plotting()
+    # Join + group by category in the warehouse, top 20 only
+    top_categories = top_categories_query.run(warehouse, loader=load_table, as_of=AS_OF)
+
+    plt.figure(figsize=(12,8))
+    sns.barplot(data=top_categories, x='order_items', y='product_category_name_english')
+    plt.title("Top 20 Product Categories by Items Sold")
+    plt.xlabel("Order Items Count")
+    plt.ylabel("Category (English)")
+    plt.tight_layout()
+    #plt.show()
+    return top_categories
 
 # %% [markdown]
 # ## Customer Segmentation – RFM (Recency, Frequency, Monetary)
@@ -199,43 +229,22 @@ top_categories.to_frame(name='order_items').reset_index().head(10)
 # 
 
 # %%
-df_orders['order_purchase_timestamp'] = df_orders['order_date_key']
-
-df_orders['order_date'] = df_orders['order_purchase_timestamp'].dt.date
-df_orders['gross_order_item_value'] = (
-    df_orders['gross_order_item_value']
-    .astype(str)
-    .str.replace(',', '', regex=False)
-    .astype(float)
-)
+def rfm_segmentation() -> pd.DataFrame:
+    plt, sns = plotting()
+    # Last order day, distinct orders and order value per customer, grouped in the warehouse
+    rfm = rfm_query.run(warehouse, loader=load_table, as_of=AS_OF).set_index('customer_id')
 
-snapshot_date = df_orders['order_purchase_timestamp'].max() + pd.Timedelta(days=1)
+    last_order = pd.to_datetime(rfm.pop('last_order')).dt.normalize()
+    snapshot_date = last_order.max() + pd.Timedelta(days=1)
+    rfm.insert(0, 'Recency', (snapshot_date - last_order).dt.days)
 
-# %%
-rfm = (
-    df_orders
-    .groupby('customer_id')
-    .agg({
-        'order_date': lambda x: (snapshot_date.date() - max(x)).days,
-        'order_id': 'nunique',
-        'gross_order_item_value': 'sum'
-    })
-    .rename(columns={
-        'order_date': 'Recency',
-        'order_id': 'Frequency',
-        'gross_order_item_value': 'Monetary'
-    })
-)
-
-
-# %%
-print("RFM shape:", rfm.shape)
-print(rfm.describe())
-
-sns.pairplot(rfm.reset_index()[['Recency', 'Frequency', 'Monetary']])
-plt.suptitle("RFM Feature Relationships", y=1.02)
-#plt.show()
+    print("RFM shape:", rfm.shape)
+    print(rfm.describe())
 
+    sns.pairplot(rfm.reset_index()[['Recency', 'Frequency', 'Monetary']])
+    plt.suptitle("RFM Feature Relationships", y=1.02)
+    #plt.show()
+    return rfm
 
 # %% [markdown]
 # ## Freight vs Price Relationship
@@ -244,19 +253,21 @@ plt.suptitle("RFM Feature Relationships", y=1.02)
 # which may indicate **pricing policy or carrier rules**.
 
 # %%
-sample_df = df_orders[['price', 'freight_value']].dropna().copy()
-if len(sample_df) > 10000:
-    sample_df = sample_df.sample(10000, random_state=42)
-
-plt.figure(figsize=(7,7))
-sns.scatterplot(data=sample_df, x='price', y='freight_value', alpha=0.4)
-plt.title("Price vs Freight Value (Sample)")
-plt.xlabel("Item Price")
-plt.ylabel("Freight Cost")
-plt.tight_layout()
-#plt.show()
-
-sample_df.corr()
+def freight_vs_price(df_orders: pd.DataFrame) -> pd.DataFrame:
+    plt, sns = plotting()
+    sample_df = df_orders[['price', 'freight_value']].dropna().copy()
+    if len(sample_df) > 10000:
+        sample_df = sample_df.sample(10000, random_state=42)
+
+    plt.figure(figsize=(7,7))
+    sns.scatterplot(data=sample_df, x='price', y='freight_value', alpha=0.4)
+    plt.title("Price vs Freight Value (Sample)")
+    plt.xlabel("Item Price")
+    plt.ylabel("Freight Cost")
+    plt.tight_layout()
+    #plt.show()
+
+    return sample_df.corr()
 
 # %% [markdown]
 # ## Seller Regional Activity
@@ -270,142 +281,26 @@ sample_df.corr()
 # - Regional campaigns
 
 # %%
-# Clean deduped dim table
-df_sellers_unique = (
-    df_sellers.groupby('seller_id')['seller_state']
-    .agg(lambda x: x.mode()[0])
-    .reset_index()
-)
-
-df_sellers_unique['seller_state'] = (
-    df_sellers_unique['seller_state']
-    .astype(str)
-    .str.upper()
-    .str.strip()
-)
-
-# Merge to fact
-df_orders_sellers = df_orders.merge(
-    df_sellers_unique,
-    on='seller_id',
-    how='left',
-    validate='many_to_one'
-)
-
-# Compute seller activity
-seller_activity = (
-    df_orders_sellers
-    .groupby('seller_state')['order_item_id']
-    .count()
-    .sort_values(ascending=False)
-)
-
-plt.figure(figsize=(10,6))
-sns.barplot(x=seller_activity.index, y=seller_activity.values)
-plt.title("Seller Activity by State (Order Items)")
-plt.xlabel("State")
-plt.ylabel("Items Sold")
-plt.tight_layout()
-#plt.show()
-
-# %%
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.linear_model import LinearRegression
-from sklearn.impute import SimpleImputer
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-
-# %%
-# Ensure numeric types for aggregation
-df_orders['gross_order_item_value'] = pd.to_numeric(df_orders['gross_order_item_value'], errors='coerce')
-df_orders['freight_value'] = pd.to_numeric(df_orders['freight_value'], errors='coerce')
-df_orders['price'] = pd.to_numeric(df_orders['price'], errors='coerce')
-
-# Aggregate orders per customer
-orders_agg = (
-    df_orders
-    .groupby('customer_id')
-    .agg(
-        total_revenue=('gross_order_item_value', 'sum'),
-        total_freight=('freight_value', 'sum')
-    )
-    .reset_index()
-)
-
-# Merge with customer info
-df_features = df_customers.merge(
-    orders_agg,
-    on='customer_id',
-    how='left'
-)
-
-# Select only required columns
-df_features = df_features[[
-    'customer_id',
-    'customer_state',
-    'customer_zip_code_prefix',  # maps to customer_zip
-    'total_revenue',
-    'total_freight',
-]]
-
-df_features.head()
-
-
-# %%
-df_features.info()
-
-# %%
-df_features_cleaned = df_features.dropna()
-
-# %%
-df_features_cleaned.info()
-
-# %%
-y = df_features_cleaned['total_freight']
-X = df_features_cleaned.drop(columns=['total_freight','customer_id'])
-
-# %%
-num_features = ['customer_zip_code_prefix','total_revenue']
-cat_features = ['customer_state']
-
-# %%
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-print(f"Training samples: {X_train.shape[0]}")
-print(f"Testing samples: {X_test.shape[0]}")
-
-# %%
-# Numeric transformer: fill missing values, then scale
-numerical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='mean')),  # fill NaN with mean
-    ('scaler', StandardScaler())
-])
-
-# Categorical transformer: fill missing values, then one-hot encode
-categorical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='most_frequent')),  # fill NaN with most frequent
-    ('onehot', OneHotEncoder(handle_unknown='ignore'))
-])
-
-# Column transformer
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', numerical_transformer, num_features),
-        ('cat', categorical_transformer, cat_features)
-    ],
-    remainder='drop'  # drop other columns
-)
+def seller_regional_activity() -> pd.DataFrame:
+    plt, sns = plotting()
+    # Join to dim_db_sellers (unique per seller_id, see dim_db.yml) and count
+    # order items per cleaned seller state in the warehouse
+    seller_activity = seller_activity_query.run(warehouse, loader=load_table, as_of=AS_OF)
+
+    plt.figure(figsize=(10,6))
+    sns.barplot(data=seller_activity, x='seller_state', y='order_items')
+    plt.title("Seller Activity by State (Order Items)")
+    plt.xlabel("State")
+    plt.ylabel("Items Sold")
+    plt.tight_layout()
+    #plt.show()
+    return seller_activity
 
 # %%
 def evaluate_model(model_name, y_true, y_pred):
     """Calculates and prints key regression performance metrics."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
     mae = mean_absolute_error(y_true, y_pred)
     rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     r2 = r2_score(y_true, y_pred)
@@ -418,62 +313,140 @@ def evaluate_model(model_name, y_true, y_pred):
     return {'RMSE': rmse, 'MAE': mae, 'R2': r2}
 
 # %%
-print("Starting Linear Regression (Baseline) Training...")
+def train_freight_models() -> dict:
+    """Fits the linear baseline and XGBoost freight models on the feature store; returns their test metrics."""
+    from sklearn.pipeline import Pipeline
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+    from sklearn.linear_model import LinearRegression
+    from sklearn.impute import SimpleImputer
+    from xgboost import XGBRegressor
+    from model_registry import ModelRegistry
+    from freight_features import (
+        FreightFeatures, INPUT_COLUMNS, NUMERIC_FEATURES, CATEGORICAL_FEATURES, REQUIRED_COLUMNS,
+    )
+    from freight_tuning import load_best_params
+
+    # Fitted pipelines persisted under EDA_ML/.cache/models, keyed by data + parameters
+    model_registry = ModelRegistry()
+
+    # Customer features (state, zip prefix and centroid, revenue, freight, item count,
+    # customer-to-seller distance sums) from the Parquet feature store; only customers
+    # with orders after the last snapshot's watermark are re-aggregated in the warehouse
+    feature_store = CustomerFeatureStore()
+    df_features = feature_store.refresh(warehouse, as_of=AS_OF)
+
+    df_features.info()
+
+    # Geolocation can be missing for some zip prefixes; the models handle that, so
+    # only rows without revenue or freight are dropped
+    df_features_cleaned = df_features.dropna(subset=REQUIRED_COLUMNS)
+
+    df_features_cleaned.info()
+
+    y = df_features_cleaned['total_freight']
+    X = df_features_cleaned[INPUT_COLUMNS]
+
+    # Columns produced by FreightFeatures (EDA_ML/freight_features.py): the zip prefix
+    # is frequency / target encoded instead of being scaled as a number, and the
+    # state stays categorical so XGBoost can split on it without one-hot columns
+    num_features = NUMERIC_FEATURES
+    cat_features = CATEGORICAL_FEATURES
+
+    # Split data into training and testing sets (~20% test). The split is by a hash
+    # of customer_id rather than a random shuffle, so a customer stays on the same
+    # side across runs and new customers only add rows (lets the registry warm-start)
+    is_test = (pd.util.hash_pandas_object(df_features_cleaned['customer_id'], index=False) % 5 == 0).to_numpy()
+    X_train, X_test = X[~is_test], X[is_test]
+    y_train, y_test = y[~is_test], y[is_test]
+
+    print(f"Training samples: {X_train.shape[0]}")
+    print(f"Testing samples: {X_test.shape[0]}")
+
+    # Numeric transformer: fill missing values, then scale
+    numerical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='mean')),  # fill NaN with mean
+        ('scaler', StandardScaler())
+    ])
+
+    # Categorical transformer: fill missing values, then one-hot encode
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),  # fill NaN with most frequent
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))
+    ])
+
+    # Column transformer (linear baseline only; XGBoost takes the FreightFeatures frame as is)
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', numerical_transformer, num_features),
+            ('cat', categorical_transformer, cat_features)
+        ],
+        remainder='drop'  # drop other columns
+    )
 
-# Create the full pipeline for Linear Regression
-lr_model = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('regressor', LinearRegression())
-])
+    print("Starting Linear Regression (Baseline) Training...")
 
-# Train the model
-lr_model.fit(X_train, y_train)
+    # Create the full pipeline for Linear Regression
+    lr_model = Pipeline(steps=[
+        ('features', FreightFeatures()),
+        ('preprocessor', preprocessor),
+        ('regressor', LinearRegression())
+    ])
 
-# Predict on the test set
-y_pred_lr = lr_model.predict(X_test)
+    # Train the model (or reuse the registered fit for identical data and parameters)
+    lr_model, lr_entry = model_registry.fit("lr_freight", lr_model, X_train, y_train)
 
-# Evaluate performance
-lr_metrics = evaluate_model("Linear Regression (Baseline)", y_test, y_pred_lr)
+    # Predict on the test set
+    y_pred_lr = lr_model.predict(X_test)
 
-# %%
-from xgboost import XGBRegressor
+    # Evaluate performance
+    lr_metrics = evaluate_model("Linear Regression (Baseline)", y_test, y_pred_lr)
 
-print("Starting XGBoost Training...")
+    print("Starting XGBoost Training...")
 
-# Create the full pipeline for XGBoost
-xgb_model = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('regressor', XGBRegressor(
-         objective='reg:squarederror',
-    n_estimators=500,  # Number of boosting rounds
-    learning_rate=0.05,
-    random_state=42,
-    n_jobs=-1, # Use all available cores
-    tree_method='hist' # Faster tree cons
-    ))
-])
+    xgb_params = dict(
+        objective='reg:squarederror',
+        n_estimators=500,  # Number of boosting rounds
+        learning_rate=0.05,
+        random_state=42,
+        n_jobs=N_JOBS, # All available cores, or the op's share of them
+        tree_method='hist', # Faster tree cons
+        enable_categorical=True # Native splits on the categorical customer_state
+    )
 
+    # Use the result of `python EDA_ML/freight_tuning.py` if a search has been run
+    # (n_estimators is then the early-stopped round count, not a fixed 500)
+    tuned = load_best_params()
+    if tuned:
+        xgb_params.update(tuned['params'], n_estimators=tuned['n_estimators'])
+        print(f"Using tuned parameters (validation RMSE {tuned['validation_rmse']:.2f}, tuned {tuned['tuned_at']})")
 
-# Train the model
-xgb_model.fit(X_train, y_train)
+    # Create the full pipeline for XGBoost
+    xgb_model = Pipeline(steps=[
+        ('features', FreightFeatures()),
+        ('regressor', XGBRegressor(**xgb_params))
+    ])
 
-# Predict on the test set
-y_pred_xgb = xgb_model.predict(X_test)
 
-# Evaluate performance
-xgb_metrics = evaluate_model("XGBoost Regressor", y_test, y_pred_xgb)
+    # Train the model; reuses the registered fit, or continues boosting when only new rows were added
+    xgb_model, xgb_entry = model_registry.fit("xgb_freight", xgb_model, X_train, y_train)
 
-# %%
-#Auto Launch dashboard html report
-import subprocess, platform, os
+    # Predict on the test set
+    y_pred_xgb = xgb_model.predict(X_test)
 
-# --- Configuration ---
-URL = "https://pinghar.github.io/Brazilian-E-Commerce-Public-Dataset-by-Olist/"
+    # Evaluate performance
+    xgb_metrics = evaluate_model("XGBoost Regressor", y_test, y_pred_xgb)
+    return {"lr_freight": lr_metrics, "xgb_freight": xgb_metrics}
 
+# %%
+#Auto Launch dashboard html report
 def open_url(url):
+    import platform
+    import subprocess
+
     system = platform.system()
     is_wsl = False
-    
+
     # lightweight WSL detection
     if system == "Linux" and os.path.exists("/proc/version"):
         with open("/proc/version", "r") as f:
@@ -497,6 +470,35 @@ def open_url(url):
     except Exception:
         print(f"❌ Failed to launch browser. Please visit: {url}")
 
-open_url(URL)
-
-
+# %%
+def main(argv=None) -> int:
+    """
+    python EDA_ML/EDA_ML.py [--as-of YYYY-MM-DD] [--no-browser]
+
+    Also called in-process by the warm worker (dagster_proj/worker.py).
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Olist EDA report and freight model training")
+    parser.add_argument("--as-of", default=os.environ.get("OLIST_PARTITION_DATE") or None,
+                        help="only use orders on or before this day (YYYY-MM-DD)")
+    parser.add_argument("--no-browser", action="store_true", help="do not open the dashboard at the end")
+    args = parser.parse_args(argv)
+
+    setup(args.as_of)
+    df_orders = load_orders()
+    health_checks(df_orders)
+    monthly_sales_trend()
+    top_product_categories()
+    rfm_segmentation()
+    freight_vs_price(df_orders)
+    seller_regional_activity()
+    train_freight_models()
+
+    if not args.no_browser:
+        open_url(URL)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
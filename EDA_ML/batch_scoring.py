@@ -0,0 +1,208 @@
+"""
+Batch scoring and a local prediction API for the freight model.
+
+`FreightScorer` loads the latest registered `xgb_freight` pipeline once and
+scores DataFrames of any size in fixed-size chunks, writing predictions into a
+preallocated float32 buffer. Every run reports rows/sec and per-chunk p50/p99
+latency.
+
+    python EDA_ML/batch_scoring.py score              # all customers in the feature store
+    python EDA_ML/batch_scoring.py serve --port 8766  # POST /predict, GET /stats, GET /health
+
+/predict accepts {"rows": [{...}, ...]} or columnar {"columns": {"name": [...]}}
+with the model's input columns and returns {"model": id, "predictions": [...]}.
+
+On daily partitioned pipeline runs (OLIST_PARTITION_DATE, or --as-of) `score`
+uses the feature snapshot as of that day and writes freight_scores_<day>.parquet.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from feature_store import CustomerFeatureStore
+from freight_features import INPUT_COLUMNS
+from model_registry import ModelRegistry
+
+MODEL_NAME = "xgb_freight"
+SCORES_DIR = Path(os.environ.get("EDA_SCORES_DIR", Path(__file__).resolve().parent / ".cache" / "scores"))
+CHUNK_SIZE = 50_000
+AS_OF = os.environ.get("OLIST_PARTITION_DATE") or None
+# Cores for prediction: the op's CPU share when run by the pipeline, else what the model was trained with
+N_JOBS = int(os.environ.get("OLIST_OP_THREADS", 0))
+
+
+def latency_summary(latencies_ms) -> dict:
+    if len(latencies_ms) == 0:
+        return {"p50_ms": None, "p99_ms": None}
+    p50, p99 = np.percentile(np.asarray(latencies_ms, dtype=np.float64), [50, 99])
+    return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+
+class FreightScorer:
+    """Chunked, vectorised inference with the persisted freight pipeline."""
+
+    def __init__(self, registry: ModelRegistry = None, model_name=MODEL_NAME, chunk_size=CHUNK_SIZE):
+        pipeline, self.entry = (registry or ModelRegistry()).load_latest(model_name)
+        *head, (_, self.final) = pipeline.steps
+        # Fitted preprocessing only; the regressor is called directly on its output
+        self.transform = Pipeline(steps=head) if head else None
+        if N_JOBS and "n_jobs" in self.final.get_params():
+            self.final.set_params(n_jobs=N_JOBS)
+        self.chunk_size = chunk_size
+        self.model_id = self.entry["id"]
+
+    def score(self, df: pd.DataFrame, out: np.ndarray = None):
+        """
+        Predicts freight for every row of `df`; returns `(predictions, stats)`.
+
+        `out` may be a preallocated float32 array of len(df) to reuse between calls.
+        """
+        n = len(df)
+        if out is None:
+            out = np.empty(n, dtype=np.float32)
+        elif out.shape != (n,):
+            raise ValueError(f"Output buffer has shape {out.shape}, expected ({n},)")
+
+        X = df[INPUT_COLUMNS]
+        latencies = np.empty(-(-n // self.chunk_size) if n else 0, dtype=np.float64)
+        start = time.perf_counter()
+        for i, lo in enumerate(range(0, n, self.chunk_size)):
+            chunk_start = time.perf_counter()
+            chunk = X.iloc[lo:lo + self.chunk_size]
+            features = self.transform.transform(chunk) if self.transform is not None else chunk
+            out[lo:lo + len(chunk)] = self.final.predict(features)
+            latencies[i] = (time.perf_counter() - chunk_start) * 1000
+        elapsed = time.perf_counter() - start
+
+        stats = {
+            "model": self.model_id,
+            "rows": n,
+            "chunks": len(latencies),
+            "seconds": round(elapsed, 4),
+            "rows_per_sec": round(n / elapsed, 1) if elapsed > 0 else None,
+            **latency_summary(latencies),
+        }
+        return out, stats
+
+
+def score_feature_store(scorer: FreightScorer, feature_store: CustomerFeatureStore = None, out_dir=SCORES_DIR,
+                        as_of=None) -> dict:
+    """Scores every customer in the latest (or `as_of`) feature snapshot and writes freight_scores.parquet."""
+    features = (feature_store or CustomerFeatureStore()).load(as_of)
+    predictions, stats = scorer.score(features)
+    name = f"freight_scores_{as_of}" if as_of else "freight_scores"
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    scores = pd.DataFrame({
+        "customer_id": features["customer_id"].to_numpy(),
+        "predicted_freight": predictions,
+    })
+    tmp_path = out_dir / f"{name}.parquet.tmp"
+    scores.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, out_dir / f"{name}.parquet")
+
+    stats["scored_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    stats["as_of"] = as_of
+    stats["path"] = str(out_dir / f"{name}.parquet")
+    with open(out_dir / f"{name}.json", "w") as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Prediction API
+# ---------------------------------------------------------------------------
+class PredictionHandler(BaseHTTPRequestHandler):
+    scorer: FreightScorer = None
+    latencies = deque(maxlen=10_000)
+    rows_served = 0
+    lock = threading.Lock()
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "model": self.scorer.model_id})
+        elif self.path == "/stats":
+            with self.lock:
+                latencies = list(self.latencies)
+                rows = PredictionHandler.rows_served
+            self._send_json(200, {"model": self.scorer.model_id, "requests": len(latencies),
+                                  "rows": rows, **latency_summary(latencies)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            df = pd.DataFrame(payload["columns"]) if "columns" in payload else pd.DataFrame(payload["rows"])
+            missing = [c for c in INPUT_COLUMNS if c not in df.columns]
+            if missing:
+                raise ValueError(f"Missing input columns: {missing}")
+            predictions, _ = self.scorer.score(df)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        self._send_json(200, {"model": self.scorer.model_id, "predictions": predictions.tolist()})
+        with self.lock:
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            PredictionHandler.rows_served += len(df)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(scorer: FreightScorer, host="127.0.0.1", port=8766):
+    PredictionHandler.scorer = scorer
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    print(f"🚀 Freight prediction API (model {scorer.model_id}) on http://{host}:{port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Prediction API stopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch scoring / prediction API for the freight model")
+    parser.add_argument("command", choices=["score", "serve"])
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--model", default=MODEL_NAME, help="Registry name, e.g. xgb_freight_streaming")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--as-of", default=AS_OF, help="Score the feature snapshot as of this day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    scorer = FreightScorer(model_name=args.model, chunk_size=args.chunk_size)
+    if args.command == "serve":
+        serve(scorer, args.host, args.port)
+        sys.exit(0)
+
+    stats = score_feature_store(scorer, as_of=args.as_of)
+    print(f"✅ Scored {stats['rows']} customers with model {stats['model']} in {stats['seconds']}s "
+          f"({stats['rows_per_sec']} rows/sec, chunk p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms)")
+    print(f"   Scores written to {stats['path']}")
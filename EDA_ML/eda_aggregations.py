@@ -0,0 +1,213 @@
+"""
+Grouped aggregations over the star schema, pushed down to the warehouse.
+
+An `AggregateQuery` describes one grouped query (joins, group keys, measures,
+ordering) and renders it as SQL for BigQuery or the DuckDB stand-in, so only
+the aggregated rows leave the warehouse. `run_pandas` computes the same result
+from DataFrames and is used as the fallback when the SQL path fails.
+
+Queries over a dated table (`date_key`) can be run point-in-time with
+`run(..., as_of=day)`, which only aggregates rows on or before that day.
+"""
+import pandas as pd
+
+# Per-backend SQL fragments
+DIALECTS = {
+    "bigquery": {"month": "FORMAT_DATE('%Y-%m', {col})", "float": "FLOAT64", "string": "STRING"},
+    "duckdb":   {"month": "strftime({col}, '%Y-%m')",    "float": "DOUBLE",  "string": "VARCHAR"},
+}
+
+MEASURES = ("count", "count_distinct", "sum", "max")
+
+
+class AggregateQuery:
+    """Builder for `SELECT <keys>, <measures> FROM fact [JOIN dim] GROUP BY <keys>`."""
+
+    def __init__(self, table: str, date_key: str = None):
+        self.table = table
+        self.date_key = date_key  # date column of `table` used by as_of filters
+        self.joins = []       # (table, key)
+        self.keys = []        # (alias, table, column, transform)
+        self.measures = []    # (alias, func, table, column)
+        self.order = None     # (alias, descending)
+        self.limit_rows = None
+
+    def _column(self, column):
+        """Splits 'table.column' (defaults to the base table)."""
+        table, _, name = column.rpartition(".")
+        return table or self.table, name
+
+    def join(self, table: str, on: str):
+        """LEFT JOIN `table` on a key column shared by both tables."""
+        self.joins.append((table, on))
+        return self
+
+    def group_by(self, alias: str, column: str, transform: str = None):
+        """Adds a group key; `transform` is None, 'month' (YYYY-MM) or 'upper_strip'."""
+        table, name = self._column(column)
+        self.keys.append((alias, table, name, transform))
+        return self
+
+    def measure(self, alias: str, func: str, column: str):
+        if func not in MEASURES:
+            raise ValueError(f"Unsupported measure '{func}', expected one of {MEASURES}")
+        table, name = self._column(column)
+        self.measures.append((alias, func, table, name))
+        return self
+
+    def order_by(self, alias: str, descending: bool = True):
+        self.order = (alias, descending)
+        return self
+
+    def limit(self, rows: int):
+        self.limit_rows = rows
+        return self
+
+    @property
+    def tables(self):
+        return [self.table] + [table for table, _ in self.joins]
+
+    def columns_for(self, table: str):
+        """Columns of `table` the query needs (used to project fallback loads)."""
+        needed = [name for _, t, name, _ in self.keys if t == table]
+        needed += [name for _, _, t, name in self.measures if t == table]
+        needed += [on for t, on in self.joins if table in (self.table, t)]
+        return sorted(set(needed))
+
+    # ------------------------------------------------------------------ SQL
+    def to_sql(self, warehouse, as_of=False) -> str:
+        """SQL for the query; with `as_of`, rows after the `:as_of` parameter are excluded."""
+        dialect = DIALECTS[warehouse.backend]
+        aliases = {table: f"t{i}" for i, table in enumerate(self.tables)}
+
+        def ref(table, name):
+            return f"{aliases[table]}.{name}"
+
+        select = []
+        for alias, table, name, transform in self.keys:
+            expr = ref(table, name)
+            if transform == "month":
+                expr = dialect["month"].format(col=expr)
+            elif transform == "upper_strip":
+                expr = f"UPPER(TRIM({expr}))"
+            select.append(f"{expr} AS {alias}")
+        for alias, func, table, name in self.measures:
+            if func == "count":
+                expr = f"COUNT({ref(table, name)})"
+            elif func == "count_distinct":
+                expr = f"COUNT(DISTINCT {ref(table, name)})"
+            elif func == "max":
+                expr = f"MAX({ref(table, name)})"
+            else:
+                expr = f"CAST(SUM({ref(table, name)}) AS {dialect['float']})"
+            select.append(f"{expr} AS {alias}")
+
+        sql = f"SELECT {', '.join(select)}\nFROM {warehouse.table(self.table)} {aliases[self.table]}"
+        for table, on in self.joins:
+            sql += (f"\nLEFT JOIN {warehouse.table(table)} {aliases[table]}"
+                    f" ON {ref(self.table, on)} = {ref(table, on)}")
+        if as_of and self.date_key:
+            sql += f"\nWHERE {ref(self.table, self.date_key)} <= :as_of"
+        if self.keys:
+            sql += f"\nGROUP BY {', '.join(str(i + 1) for i in range(len(self.keys)))}"
+        if self.order:
+            sql += f"\nORDER BY {self.order[0]} {'DESC' if self.order[1] else 'ASC'}"
+        if self.limit_rows:
+            sql += f"\nLIMIT {self.limit_rows}"
+        return sql
+
+    # --------------------------------------------------------------- pandas
+    def run_pandas(self, frames: dict) -> pd.DataFrame:
+        """Same aggregation over in-memory DataFrames keyed by table name."""
+        df = frames[self.table][self.columns_for(self.table)].add_prefix(f"{self.table}.")
+        for table, on in self.joins:
+            right = frames[table][self.columns_for(table)].drop_duplicates(on).add_prefix(f"{table}.")
+            df = df.merge(right, left_on=f"{self.table}.{on}", right_on=f"{table}.{on}", how="left")
+
+        for alias, table, name, transform in self.keys:
+            values = df[f"{table}.{name}"]
+            if transform == "month":
+                values = pd.to_datetime(values).dt.to_period("M").astype(str)
+            elif transform == "upper_strip":
+                values = values.astype("string").str.upper().str.strip()
+            df[alias] = values
+
+        agg = {}
+        for alias, func, table, name in self.measures:
+            column = f"{table}.{name}"
+            if func == "sum":
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+            agg[alias] = (column, {"count": "count", "count_distinct": "nunique", "sum": "sum", "max": "max"}[func])
+
+        key_aliases = [alias for alias, _, _, _ in self.keys]
+        result = df.groupby(key_aliases, dropna=False).agg(**agg).reset_index()
+        if self.order:
+            result = result.sort_values(self.order[0], ascending=not self.order[1], kind="stable")
+        if self.limit_rows:
+            result = result.head(self.limit_rows)
+        return result.reset_index(drop=True)
+
+    # ------------------------------------------------------------------ run
+    def run(self, warehouse, loader=None, as_of=None) -> pd.DataFrame:
+        """
+        Runs the aggregation in the warehouse; if that fails and a `loader(table, columns)`
+        is given, loads only the needed columns and aggregates in pandas instead
+        (the loader is then responsible for the `as_of` cut-off).
+        """
+        try:
+            if as_of is not None and self.date_key:
+                return warehouse.query_df(self.to_sql(warehouse, as_of=True), {"as_of": pd.Timestamp(as_of).date()})
+            return warehouse.query_df(self.to_sql(warehouse))
+        except Exception as e:
+            if loader is None:
+                raise
+            print(f"⚠️ SQL pushdown failed ({e}); falling back to pandas.")
+            frames = {table: loader(table, self.columns_for(table)) for table in self.tables}
+            return self.run_pandas(frames)
+
+
+# ---------------------------------------------------------------------------
+# Aggregations used by EDA_ML.py
+# ---------------------------------------------------------------------------
+FACT = "fact_db_order_items"
+DATE_KEY = "order_date_key"
+
+monthly_sales_query = (
+    AggregateQuery(FACT, date_key=DATE_KEY)
+    .group_by("year_month", "order_date_key", transform="month")
+    .measure("num_orders", "count_distinct", "order_id")
+    .order_by("year_month", descending=False)
+)
+
+top_categories_query = (
+    AggregateQuery(FACT, date_key=DATE_KEY)
+    .join("dim_db_products", on="product_id")
+    .group_by("product_category_name_english", "dim_db_products.product_category_name_english")
+    .measure("order_items", "count", "order_item_id")
+    .order_by("order_items")
+    .limit(20)
+)
+
+seller_activity_query = (
+    AggregateQuery(FACT, date_key=DATE_KEY)
+    .join("dim_db_sellers", on="seller_id")
+    .group_by("seller_state", "dim_db_sellers.seller_state", transform="upper_strip")
+    .measure("order_items", "count", "order_item_id")
+    .order_by("order_items")
+)
+
+orders_agg_query = (
+    AggregateQuery(FACT, date_key=DATE_KEY)
+    .group_by("customer_id", "customer_id")
+    .measure("total_revenue", "sum", "gross_order_item_value")
+    .measure("total_freight", "sum", "freight_value")
+)
+
+# Per-customer inputs of the RFM segmentation (recency is computed from last_order)
+rfm_query = (
+    AggregateQuery(FACT, date_key=DATE_KEY)
+    .group_by("customer_id", "customer_id")
+    .measure("last_order", "max", "order_date_key")
+    .measure("Frequency", "count_distinct", "order_id")
+    .measure("Monetary", "sum", "gross_order_item_value")
+)
@@ -0,0 +1,312 @@
+"""
+Customer-level feature store for the freight model in EDA_ML.py.
+
+Features are kept as Parquet snapshots keyed by `customer_id`, one file per
+refresh, with a manifest recording each snapshot's watermark (the latest
+`order_date_key` it includes). A refresh only aggregates fact rows newer than
+the previous watermark and adds them to the affected customers, so the full
+fact table is scanned once, on the first build. Older snapshots stay readable
+for point-in-time training and scoring.
+
+Distance features come from the raw olist_geolocation table (loaded by Meltano
+next to the dbt models): zip prefixes are averaged to centroids, and every order
+item contributes the haversine distance between its customer's and seller's
+centroids. Revenue, freight, item counts and distance sums are additive, which
+is what makes the incremental update exact.
+
+Rows that arrive late or are corrected for dates at or before the watermark
+cannot be merged this way. When the fact table has been rebuilt, a refresh first
+compares the snapshot's totals with the fact rows up to its watermark: item
+count, customers, revenue and freight. This is one grouped query over four
+columns. On any difference the store is rebuilt from the full fact table.
+
+`refresh(as_of=day)` (daily partitioned pipeline runs) only aggregates orders up
+to that day, starting from the newest snapshot at or before it. The manifest is
+kept ordered by watermark, so a backfilled day lands between the snapshots
+around it; retention drops the oldest-created snapshots first. Concurrent
+partitions update the manifest under a file lock.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from eda_aggregations import DIALECTS
+
+FEATURE_DIR = Path(os.environ.get("EDA_FEATURE_DIR", Path(__file__).resolve().parent / ".cache" / "features"))
+FACT = "fact_db_order_items"
+CUSTOMERS = "dim_db_customers"
+SELLERS = "dim_db_sellers"
+GEOLOCATION = "olist_geolocation"
+
+KEY = "customer_id"
+FEATURE_COLUMNS = [
+    KEY, "customer_state", "customer_zip_code_prefix", "customer_lat", "customer_lng",
+    "total_revenue", "total_freight", "order_items", "seller_km_sum", "seller_km_items",
+]
+# Per-customer attributes, replaced by the latest value on merge
+ATTRIBUTES = ["customer_state", "customer_zip_code_prefix", "customer_lat", "customer_lng"]
+ADDITIVE = ["total_revenue", "total_freight", "order_items", "seller_km_sum", "seller_km_items"]
+# One schema for fresh builds, incremental merges and Parquet re-reads: a customer without
+# a geolocation match must not turn the coordinates into `object` (model row hashes depend on it)
+FEATURE_DTYPES = {
+    KEY: "string", "customer_state": "string", "customer_zip_code_prefix": "string",
+    "customer_lat": "float64", "customer_lng": "float64",
+    "total_revenue": "float64", "total_freight": "float64", "order_items": "int64",
+    "seller_km_sum": "float64", "seller_km_items": "int64",
+    "last_order_date": "datetime64[ns]",
+}
+EARTH_RADIUS_KM = 6371.0
+
+
+def conform(features: pd.DataFrame) -> pd.DataFrame:
+    """`features` cast to FEATURE_DTYPES (columns it has), whatever the backend or merge produced."""
+    features = features.copy()
+    zips = features.get("customer_zip_code_prefix")
+    if zips is not None and pd.api.types.is_numeric_dtype(zips):
+        # 1234.0 (a float column because of a missing value) -> "1234"
+        features["customer_zip_code_prefix"] = zips.astype("Int64")
+    for column in ("customer_lat", "customer_lng"):
+        if column in features:
+            features[column] = pd.to_numeric(features[column], errors="coerce")
+    return features.astype({c: t for c, t in FEATURE_DTYPES.items() if c in features})
+
+
+class CustomerFeatureStore:
+    """Versioned Parquet snapshots of per-customer features with incremental refresh."""
+
+    def __init__(self, root=FEATURE_DIR, keep=10):
+        self.root = Path(root)
+        self.keep = keep
+        self.manifest_path = self.root / "manifest.json"
+
+    # ------------------------------------------------------------- manifest
+    def manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"snapshots": []}
+
+    def _save_manifest(self, manifest):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @contextmanager
+    def _manifest_lock(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "manifest.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def latest_snapshot(self, as_of=None):
+        """The newest snapshot, or the newest one whose watermark is on or before `as_of`."""
+        snapshots = self.manifest()["snapshots"]
+        if as_of is not None:
+            as_of = pd.Timestamp(as_of)
+            snapshots = [s for s in snapshots if s["watermark"] and pd.Timestamp(s["watermark"]) <= as_of]
+        return snapshots[-1] if snapshots else None
+
+    # ----------------------------------------------------------------- read
+    def load(self, as_of=None) -> pd.DataFrame:
+        """
+        Features from the latest snapshot, or, for point-in-time reads, from the
+        newest snapshot whose watermark is on or before `as_of`.
+        """
+        snapshot = self.latest_snapshot(as_of)
+        if snapshot is None:
+            raise LookupError(f"No feature snapshot available{f' as of {as_of}' if as_of is not None else ''}")
+        return conform(pd.read_parquet(self.root / snapshot["path"], columns=FEATURE_COLUMNS))
+
+    # --------------------------------------------------------------- update
+    def _delta_sql(self, warehouse, incremental: bool, bounded=False) -> str:
+        float_type = DIALECTS[warehouse.backend]["float"]
+        string_type = DIALECTS[warehouse.backend]["string"]
+        conditions = (["f.order_date_key > :watermark"] if incremental else []) + \
+                     (["f.order_date_key <= :as_of"] if bounded else [])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Haversine distance; ACOS(-1) is pi in both dialects
+        rad = "ACOS(-1) / 180"
+        distance = f"""2 * {EARTH_RADIUS_KM} * ASIN(SQRT(
+                  POWER(SIN((sg.lat - cg.lat) * {rad} / 2), 2)
+                  + COS(cg.lat * {rad}) * COS(sg.lat * {rad}) * POWER(SIN((sg.lng - cg.lng) * {rad} / 2), 2)))"""
+        return f"""
+            WITH geo AS (
+              SELECT
+                CAST(geolocation_zip_code_prefix AS {string_type}) AS zip,
+                AVG(CAST(geolocation_lat AS {float_type})) AS lat,
+                AVG(CAST(geolocation_lng AS {float_type})) AS lng
+              FROM {warehouse.table(GEOLOCATION)}
+              GROUP BY 1
+            ),
+            items AS (
+              SELECT
+                f.customer_id,
+                c.customer_state,
+                c.customer_zip_code_prefix,
+                cg.lat AS customer_lat,
+                cg.lng AS customer_lng,
+                f.gross_order_item_value,
+                f.freight_value,
+                f.order_date_key,
+                {distance} AS seller_km
+              FROM {warehouse.table(FACT)} f
+              LEFT JOIN {warehouse.table(CUSTOMERS)} c
+                ON f.customer_id = c.customer_id
+              LEFT JOIN {warehouse.table(SELLERS)} s
+                ON f.seller_id = s.seller_id
+              LEFT JOIN geo cg
+                ON CAST(c.customer_zip_code_prefix AS {string_type}) = cg.zip
+              LEFT JOIN geo sg
+                ON CAST(s.seller_zip AS {string_type}) = sg.zip
+              {where}
+            )
+            SELECT
+              customer_id,
+              customer_state,
+              customer_zip_code_prefix,
+              MAX(customer_lat) AS customer_lat,
+              MAX(customer_lng) AS customer_lng,
+              CAST(SUM(gross_order_item_value) AS {float_type}) AS total_revenue,
+              CAST(SUM(freight_value) AS {float_type}) AS total_freight,
+              COUNT(*) AS order_items,
+              CAST(COALESCE(SUM(seller_km), 0) AS {float_type}) AS seller_km_sum,
+              COUNT(seller_km) AS seller_km_items,
+              MAX(order_date_key) AS last_order_date
+            FROM items
+            GROUP BY 1, 2, 3
+        """
+
+    def _covered_totals_sql(self, warehouse) -> str:
+        float_type = DIALECTS[warehouse.backend]["float"]
+        return f"""
+            SELECT
+              COUNT(*) AS order_items,
+              COUNT(DISTINCT customer_id) AS customers,
+              CAST(SUM(gross_order_item_value) AS {float_type}) AS total_revenue,
+              CAST(SUM(freight_value) AS {float_type}) AS total_freight
+            FROM {warehouse.table(FACT)}
+            WHERE order_date_key <= :watermark
+        """
+
+    def _covered_rows_changed(self, warehouse, latest: dict, previous: pd.DataFrame) -> bool:
+        """True when the fact rows up to the snapshot's watermark no longer add up to its features."""
+        watermark = pd.Timestamp(latest["watermark"]).date()
+        current = warehouse.query_df(self._covered_totals_sql(warehouse), {"watermark": watermark}).iloc[0]
+        stored = {
+            "order_items": previous["order_items"].sum(),
+            "customers": len(previous),
+            "total_revenue": previous["total_revenue"].sum(),
+            "total_freight": previous["total_freight"].sum(),
+        }
+        return not all(np.isclose(float(current[name] or 0), float(value), rtol=1e-9, atol=1e-6)
+                       for name, value in stored.items())
+
+    def refresh(self, warehouse, full=False, as_of=None) -> pd.DataFrame:
+        """
+        Brings the store up to date with the warehouse and returns the latest features.
+
+        Skips the warehouse entirely when the fact table has not been rebuilt since
+        the last snapshot; otherwise aggregates only rows after the watermark.
+        Snapshots written with a different column set, or whose rows up to the
+        watermark changed in the rebuilt fact table, are rebuilt in full.
+        With `as_of`, only orders on or before that day are included.
+        """
+        as_of = pd.Timestamp(as_of).date() if as_of is not None else None
+        latest = None if full else self.latest_snapshot(as_of)
+        if latest is not None and latest.get("columns") != FEATURE_COLUMNS:
+            print("▶ Feature columns changed since the last snapshot; rebuilding.")
+            latest = None
+        fact_version = warehouse.table_version(FACT)
+        # A snapshot bounded at an earlier day is complete only for reads up to that day
+        bound = latest.get("as_of") if latest is not None else None
+        covers = bound is None or (as_of is not None and as_of <= pd.Timestamp(bound).date())
+        if latest is not None and covers and fact_version is not None and latest.get("fact_version") == fact_version:
+            print(f"▶ Feature store up to date (snapshot {latest['path']}, watermark {latest['watermark']})")
+            return self.load(as_of)
+
+        previous = None
+        if latest is not None and latest["watermark"]:
+            previous = conform(pd.read_parquet(self.root / latest["path"]))
+            if self._covered_rows_changed(warehouse, latest, previous):
+                print(f"▶ Fact rows on or before {latest['watermark'][:10]} changed since the last snapshot; rebuilding.")
+                latest = previous = None
+
+        params = {"as_of": as_of} if as_of is not None else {}
+        bounded = as_of is not None
+        if latest is None:
+            print(f"▶ Building customer features from the full fact table{f' up to {as_of}' if bounded else ''} ...")
+            delta = warehouse.query_df(self._delta_sql(warehouse, incremental=False, bounded=bounded), params)
+        else:
+            watermark = pd.Timestamp(latest["watermark"]).date()
+            print(f"▶ Updating customer features with orders after {watermark}{f' up to {as_of}' if bounded else ''} ...")
+            delta = warehouse.query_df(self._delta_sql(warehouse, incremental=True, bounded=bounded),
+                                       {"watermark": watermark, **params})
+        delta = conform(delta.assign(last_order_date=pd.to_datetime(delta["last_order_date"])))
+
+        if latest is None:
+            features = delta
+        else:
+            if previous is None:
+                previous = conform(pd.read_parquet(self.root / latest["path"]))
+            features = previous if delta.empty else self._merge(previous, delta)
+        features = conform(features)
+
+        watermark = features["last_order_date"].max() if len(features) else None
+        if latest is not None and watermark is not None:
+            watermark = max(pd.Timestamp(watermark), pd.Timestamp(latest["watermark"]))
+        self._write_snapshot(features, watermark, fact_version, updated=len(delta), as_of=as_of)
+        return features[FEATURE_COLUMNS]
+
+    @staticmethod
+    def _merge(previous: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+        """Adds the delta sums to existing customers and appends new ones."""
+        previous = previous.set_index(KEY)
+        delta = delta.set_index(KEY)
+        existing = delta.index.intersection(previous.index)
+
+        previous.loc[existing, ADDITIVE] = previous.loc[existing, ADDITIVE].add(delta.loc[existing, ADDITIVE])
+        previous.loc[existing, ATTRIBUTES] = delta.loc[existing, ATTRIBUTES]
+        previous.loc[existing, "last_order_date"] = delta.loc[existing, "last_order_date"]
+
+        new = delta.loc[delta.index.difference(previous.index)]
+        return pd.concat([previous, new]).reset_index()
+
+    def _write_snapshot(self, features, watermark, fact_version, updated, as_of=None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        created_at = datetime.now(timezone.utc)
+        path = f"features_{created_at:%Y%m%dT%H%M%S%f}.parquet"
+        features.to_parquet(self.root / path, index=False)
+
+        entry = {
+            "path": path,
+            "watermark": pd.Timestamp(watermark).isoformat() if watermark is not None else None,
+            "fact_version": fact_version,
+            "as_of": as_of.isoformat() if as_of is not None else None,
+            "columns": FEATURE_COLUMNS,
+            "rows": len(features),
+            "updated_customers": updated,
+            "created_at": created_at.isoformat(timespec="seconds"),
+        }
+        with self._manifest_lock():
+            manifest = self.manifest()
+            snapshots = manifest["snapshots"] + [entry]
+            # Paths embed the creation time, so they order snapshots by age
+            expired = sorted(snapshots, key=lambda s: s["path"])[:-self.keep]
+            for old in expired:
+                (self.root / old["path"]).unlink(missing_ok=True)
+            manifest["snapshots"] = sorted((s for s in snapshots if s not in expired),
+                                           key=lambda s: s["watermark"] or "")
+            self._save_manifest(manifest)
+        print(f"   Snapshot {path}: {len(features)} customers ({updated} updated), watermark {watermark}")
@@ -0,0 +1,101 @@
+"""
+Feature engineering for the freight model.
+
+Replaces the one-hot state / scaled zip preprocessing with a compact frame that
+XGBoost consumes directly:
+
+- `customer_state` stays a pandas categorical and is split natively by XGBoost
+  (`enable_categorical=True`) instead of being expanded to one column per state;
+- `customer_zip_code_prefix` is an identifier, not a quantity, so it is encoded
+  as its training frequency and as the smoothed mean freight of its 3-digit
+  zip region. Training rows get out-of-fold encodings so a row never sees its
+  own target;
+- geolocation: the customer's zip centroid and the mean customer-to-seller
+  distance of their order items (`seller_km_sum / seller_km_items`, aggregated
+  in the warehouse by the feature store from olist_geolocation).
+
+The encodings are fitted once in `fit`; `transform` is dictionary lookups and
+float32 columns, so scoring does no refitting and no dense one-hot matrices.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.model_selection import KFold
+
+TARGET = "total_freight"
+INPUT_COLUMNS = [
+    "customer_state", "customer_zip_code_prefix", "total_revenue", "order_items",
+    "customer_lat", "customer_lng", "seller_km_sum", "seller_km_items",
+]
+CATEGORICAL_FEATURES = ["customer_state"]
+NUMERIC_FEATURES = [
+    "total_revenue", "order_items", "zip_frequency", "zip3_freight", "customer_lat", "customer_lng", "seller_km",
+]
+# Rows without these cannot be used for training; every other input may be missing
+REQUIRED_COLUMNS = ["total_revenue", TARGET]
+
+
+def _zip_codes(X: pd.DataFrame) -> pd.Series:
+    return pd.to_numeric(X["customer_zip_code_prefix"], errors="coerce")
+
+
+class FreightFeatures(BaseEstimator, TransformerMixin):
+    """State as a native categorical, zip frequency / target encodings and distance features."""
+
+    def __init__(self, smoothing=20.0, n_folds=5, random_state=42):
+        self.smoothing = smoothing
+        self.n_folds = n_folds
+        self.random_state = random_state
+
+    def _target_means(self, regions: pd.Series, y: np.ndarray) -> dict:
+        """Mean freight per zip region, shrunk towards the overall mean by `smoothing` rows."""
+        stats = pd.DataFrame({"region": regions.to_numpy(), "y": y}).groupby("region")["y"].agg(["sum", "count"])
+        prior = float(y.mean())
+        means = (stats["sum"] + self.smoothing * prior) / (stats["count"] + self.smoothing)
+        return means.to_dict(), prior
+
+    def fit(self, X: pd.DataFrame, y=None):
+        if y is None:
+            raise ValueError("FreightFeatures needs the target to fit the zip encoding")
+        zips = _zip_codes(X)
+        y = np.asarray(y, dtype=np.float64)
+        self.states_ = sorted(X["customer_state"].dropna().astype(str).unique())
+        self.zip_frequency_ = (zips.value_counts() / len(zips)).to_dict()
+        self.zip3_freight_, self.prior_ = self._target_means(zips // 100, y)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y=None, **fit_params):
+        """Fits, then replaces the training rows' zip target encoding with out-of-fold values."""
+        self.fit(X, y)
+        out = self.transform(X)
+        regions = _zip_codes(X) // 100
+        y = np.asarray(y, dtype=np.float64)
+        oof = np.empty(len(X), dtype=np.float32)
+        folds = KFold(n_splits=self.n_folds, shuffle=True, random_state=self.random_state)
+        for fit_rows, encode_rows in folds.split(oof):
+            means, prior = self._target_means(regions.iloc[fit_rows], y[fit_rows])
+            oof[encode_rows] = regions.iloc[encode_rows].map(means).fillna(prior).to_numpy(np.float32)
+        out["zip3_freight"] = oof
+        return out
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        zips = _zip_codes(X)
+        km_items = pd.to_numeric(X["seller_km_items"], errors="coerce").to_numpy(np.float64)
+        km_sum = pd.to_numeric(X["seller_km_sum"], errors="coerce").to_numpy(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            seller_km = np.where(km_items > 0, km_sum / km_items, np.nan)
+
+        out = pd.DataFrame(index=X.index)
+        # Unknown states become missing, which XGBoost routes like any other NaN
+        out["customer_state"] = pd.Categorical(X["customer_state"].astype("string"), categories=self.states_)
+        out["total_revenue"] = X["total_revenue"].to_numpy(np.float32)
+        out["order_items"] = pd.to_numeric(X["order_items"], errors="coerce").to_numpy(np.float32)
+        out["zip_frequency"] = zips.map(self.zip_frequency_).fillna(0.0).to_numpy(np.float32)
+        out["zip3_freight"] = (zips // 100).map(self.zip3_freight_).fillna(self.prior_).to_numpy(np.float32)
+        out["customer_lat"] = pd.to_numeric(X["customer_lat"], errors="coerce").to_numpy(np.float32)
+        out["customer_lng"] = pd.to_numeric(X["customer_lng"], errors="coerce").to_numpy(np.float32)
+        out["seller_km"] = seller_km.astype(np.float32)
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(CATEGORICAL_FEATURES + NUMERIC_FEATURES, dtype=object)
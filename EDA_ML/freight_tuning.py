@@ -0,0 +1,288 @@
+"""
+Budgeted hyperparameter search for the XGBoost freight model.
+
+Successive halving over a process pool: a set of random configurations is
+trained for a few boosting rounds, the best 1/eta are kept and retrained with
+eta times more rounds, and so on. Every trial uses early stopping on a held-out
+validation fold (never the EDA test fold), so a configuration stops as soon as
+extra rounds stop helping. Trial results are cached per training-data
+fingerprint, and the search stops scheduling work once the CPU-hour budget is
+spent, so a run at 10x the data trims configurations instead of running longer.
+
+    python EDA_ML/freight_tuning.py --configs 27 --cpu-hours 0.25
+
+The winner is written to best_params.json; EDA_ML.py picks it up on its next run.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from freight_features import CATEGORICAL_FEATURES, NUMERIC_FEATURES, REQUIRED_COLUMNS, TARGET
+
+TUNING_DIR = Path(os.environ.get("EDA_TUNING_DIR", Path(__file__).resolve().parent / ".cache" / "tuning"))
+BEST_PARAMS_FILE = TUNING_DIR / "best_params.json"
+
+# Column types of the saved matrices: state codes are categorical ("c"), the rest quantitative
+FEATURE_TYPES = ["c"] * len(CATEGORICAL_FEATURES) + ["q"] * len(NUMERIC_FEATURES)
+
+# Fixed settings; the search space below is sampled on top of these
+BASE_PARAMS = {"objective": "reg:squarederror", "tree_method": "hist", "random_state": 42,
+               "enable_categorical": True, "feature_types": FEATURE_TYPES}
+SEARCH_SPACE = {
+    "learning_rate":    ("log", 0.01, 0.3),
+    "max_depth":        ("int", 3, 10),
+    "min_child_weight": ("log", 1.0, 20.0),
+    "subsample":        ("float", 0.5, 1.0),
+    "colsample_bytree": ("float", 0.5, 1.0),
+    "reg_lambda":       ("log", 0.1, 10.0),
+}
+
+
+def load_best_params(path=BEST_PARAMS_FILE):
+    """Tuned XGBoost parameters (including n_estimators), or None if no search has run."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def sample_configs(n, seed=42) -> list:
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for name, (kind, low, high) in SEARCH_SPACE.items():
+            if kind == "int":
+                config[name] = int(rng.integers(low, high + 1))
+            elif kind == "log":
+                config[name] = round(float(np.exp(rng.uniform(np.log(low), np.log(high)))), 5)
+            else:
+                config[name] = round(float(rng.uniform(low, high)), 4)
+        configs.append(config)
+    return configs
+
+
+def customer_fold(customer_ids: pd.Series, modulus: int) -> np.ndarray:
+    """Stable hash fold of each customer (EDA_ML.py holds out fold 0 of 5 as its test set)."""
+    return (pd.util.hash_pandas_object(customer_ids, index=False) % modulus).to_numpy()
+
+
+def prepare_matrices(features: pd.DataFrame, out_dir: Path) -> str:
+    """
+    Splits train/validation (excluding the EDA test fold), fits FreightFeatures on
+    the training part and saves float32 matrices for the workers to memory-map
+    (state as its category code, NaN when unknown). Returns the data fingerprint.
+    """
+    from freight_features import INPUT_COLUMNS, FreightFeatures
+
+    features = features.dropna(subset=REQUIRED_COLUMNS)
+    fold = customer_fold(features["customer_id"], 10)
+    test = fold % 5 == 0
+    valid = fold == 1
+    train = ~test & ~valid
+
+    def to_matrix(frame):
+        codes = frame[CATEGORICAL_FEATURES].apply(lambda c: c.cat.codes).to_numpy(np.float32)
+        codes = np.where(codes < 0, np.nan, codes).astype(np.float32)
+        return np.hstack([codes, frame[NUMERIC_FEATURES].to_numpy(np.float32)])
+
+    # Same feature engineering as the EDA_ML.py pipeline (out-of-fold encoding for the training rows)
+    encoder = FreightFeatures()
+    X_train = to_matrix(encoder.fit_transform(features.loc[train, INPUT_COLUMNS], features.loc[train, TARGET]))
+    X_valid = to_matrix(encoder.transform(features.loc[valid, INPUT_COLUMNS]))
+    y_train = features.loc[train, TARGET].to_numpy(np.float32)
+    y_valid = features.loc[valid, TARGET].to_numpy(np.float32)
+
+    digest = hashlib.sha1()
+    for array in (X_train, y_train, X_valid, y_valid):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    data_fp = digest.hexdigest()[:16]
+
+    data_dir = out_dir / data_fp
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for name, array in (("X_train", X_train), ("y_train", y_train), ("X_valid", X_valid), ("y_valid", y_valid)):
+        if not (data_dir / f"{name}.npy").exists():
+            np.save(data_dir / f"{name}.npy", array)
+    print(f"▶ Tuning data {data_fp}: {len(y_train)} train / {len(y_valid)} validation rows, {X_train.shape[1]} features")
+    return data_fp
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+_data = {}
+
+
+def _init_worker(data_dir):
+    for name in ("X_train", "y_train", "X_valid", "y_valid"):
+        _data[name] = np.load(Path(data_dir) / f"{name}.npy", mmap_mode="r")
+
+
+def _run_trial(config, rounds, early_stopping_rounds, n_jobs):
+    from xgboost import XGBRegressor
+
+    cpu_start = time.process_time()
+    model = XGBRegressor(**BASE_PARAMS, **config, n_estimators=rounds, n_jobs=n_jobs,
+                         early_stopping_rounds=early_stopping_rounds, eval_metric="rmse")
+    model.fit(_data["X_train"], _data["y_train"], eval_set=[(_data["X_valid"], _data["y_valid"])], verbose=False)
+    return {
+        "rmse": float(model.best_score),
+        "best_iteration": int(model.best_iteration),
+        "cpu_seconds": time.process_time() - cpu_start,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+def trial_key(config, rounds, early_stopping_rounds) -> str:
+    blob = json.dumps({"config": config, "rounds": rounds, "es": early_stopping_rounds}, sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class TrialCache:
+    """Append-only JSONL of finished trials for one training-data fingerprint."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.results = {}
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.results[record["key"]] = record
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def converged(self, config, early_stopping_rounds):
+        """A trial of `config` that early-stopped below its round cap; more rounds would not change it."""
+        for record in self.results.values():
+            if (record["config"] == config and record.get("es") == early_stopping_rounds
+                    and record["best_iteration"] + 1 + early_stopping_rounds < record["rounds"]):
+                return record
+        return None
+
+    def put(self, record):
+        self.results[record["key"]] = record
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def successive_halving(data_fp, out_dir=TUNING_DIR, n_configs=27, eta=3, min_rounds=50, max_rounds=2000,
+                       early_stopping_rounds=30, cpu_hours=0.25, threads_per_trial=2, workers=None, seed=42):
+    """Runs the search and returns the best trial record."""
+    data_dir = out_dir / data_fp
+    cache = TrialCache(data_dir / "trials.jsonl")
+    budget = cpu_hours * 3600
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+    spent = 0.0
+    cpu_per_round = None
+
+    configs = sample_configs(n_configs, seed)
+    rounds = min_rounds
+    best = None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(data_dir),)) as pool:
+        while configs:
+            # Drop the weakest configurations if the rung would overrun the CPU budget
+            if cpu_per_round is not None:
+                affordable = int((budget - spent) // max(cpu_per_round * rounds, 1e-9))
+                if affordable < len(configs):
+                    print(f"💰 Budget left {budget - spent:.0f} CPU-s: keeping {max(affordable, 0)} of {len(configs)} configs")
+                    configs = configs[:max(affordable, 0)]
+                    if not configs:
+                        break
+
+            keys = [trial_key(c, rounds, early_stopping_rounds) for c in configs]
+            known = {k: cache.get(k) or cache.converged(c, early_stopping_rounds) for k, c in zip(keys, configs)}
+            pending = {k: pool.submit(_run_trial, c, rounds, early_stopping_rounds, threads_per_trial)
+                       for k, c in zip(keys, configs) if known[k] is None}
+            results = []
+            for key, config in zip(keys, configs):
+                record = known[key]
+                if record is None:
+                    record = {"key": key, "config": config, "rounds": rounds, "es": early_stopping_rounds,
+                              **pending[key].result()}
+                    cache.put(record)
+                    spent += record["cpu_seconds"]
+                results.append(record)
+
+            executed = [r for r in results if r["key"] in pending and r["rounds"] == rounds]
+            if executed:
+                cpu_per_round = sum(r["cpu_seconds"] / (r["best_iteration"] + 1 + early_stopping_rounds)
+                                    for r in executed) / len(executed)
+            results.sort(key=lambda r: r["rmse"])
+            best = results[0] if best is None or results[0]["rmse"] < best["rmse"] else best
+            print(f"🪜 Rung with {rounds} rounds: {len(results)} configs ({len(executed)} trained, "
+                  f"{len(results) - len(executed)} cached), best RMSE {results[0]['rmse']:.4f}, "
+                  f"CPU spent {spent:.0f}s / {budget:.0f}s")
+
+            # Stop once one survivor is left or the round cap is hit
+            if len(results) <= 1 or rounds >= max_rounds:
+                break
+            configs = [r["config"] for r in results[:max(1, math.ceil(len(results) / eta))]]
+            rounds = min(rounds * eta, max_rounds)
+
+    return best, spent
+
+
+def save_best(best, data_fp, spent, path=BEST_PARAMS_FILE):
+    tuned = {
+        "params": best["config"],
+        "n_estimators": best["best_iteration"] + 1,
+        "validation_rmse": best["rmse"],
+        "data_fp": data_fp,
+        "cpu_seconds": round(spent, 1),
+        "tuned_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(tuned, f, indent=2)
+    return tuned
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Successive-halving search for the XGBoost freight model")
+    parser.add_argument("--configs", type=int, default=27, help="Configurations in the first rung")
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta per rung, multiply rounds by eta")
+    parser.add_argument("--min-rounds", type=int, default=50)
+    parser.add_argument("--max-rounds", type=int, default=2000)
+    parser.add_argument("--early-stopping-rounds", type=int, default=30)
+    parser.add_argument("--cpu-hours", type=float, default=0.25, help="CPU budget for all trials")
+    parser.add_argument("--threads-per-trial", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from dagster_proj.resources.warehouse import get_warehouse
+    from feature_store import CustomerFeatureStore
+
+    store = CustomerFeatureStore()
+    try:
+        features = store.load()
+    except LookupError:
+        features = store.refresh(get_warehouse())
+
+    start = time.perf_counter()
+    data_fp = prepare_matrices(features, TUNING_DIR)
+    best, spent = successive_halving(
+        data_fp, TUNING_DIR, args.configs, args.eta, args.min_rounds, args.max_rounds,
+        args.early_stopping_rounds, args.cpu_hours, args.threads_per_trial, args.workers, args.seed,
+    )
+    if best is None:
+        sys.exit("❌ No trial finished within the CPU budget.")
+    tuned = save_best(best, data_fp, spent)
+    print(f"✅ Best validation RMSE {tuned['validation_rmse']:.4f} with {tuned['n_estimators']} rounds: {tuned['params']}")
+    print(f"   {spent:.0f} CPU-s in {time.perf_counter() - start:.0f}s wall; written to {BEST_PARAMS_FILE}")
@@ -0,0 +1,246 @@
+"""
+Local registry of fitted model pipelines for EDA_ML.py.
+
+Each fit is stored under a fingerprint of the training data (order-insensitive
+row hashes of X and y) and of the pipeline's hyperparameters. On the next run:
+
+- same data and parameters      -> the persisted pipeline is loaded, no training;
+- same parameters, rows only added (XGBoost) -> the preprocessing is refitted
+  (out-of-fold, as in a full fit) and boosting continues from the previous
+  booster for `warm_start_rounds` extra rounds on the full data;
+- anything else                 -> a full fit.
+
+scikit-learn steps are persisted with joblib; XGBoost regressors are saved in
+XGBoost's native format so they load across library versions. Training time is
+recorded with every entry and printed on reuse.
+
+Registrations from concurrent processes are serialised by an exclusive lock on
+`index.json.lock`, so no process overwrites an entry another one just added.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+
+MODEL_DIR = Path(os.environ.get("EDA_MODEL_DIR", Path(__file__).resolve().parent / ".cache" / "models"))
+# Parameters that change how fast a model trains, not what it learns: not part of its fingerprint
+RUNTIME_PARAMS = ("memory", "n_jobs", "nthread")
+
+
+def _layout(Xt):
+    """Columns and types of a transformed matrix (categorical dtypes include their categories)."""
+    if hasattr(Xt, "dtypes"):
+        return list(Xt.dtypes.items())
+    return Xt.shape[1:], Xt.dtype
+
+
+def _is_xgboost(estimator) -> bool:
+    return hasattr(estimator, "get_booster")
+
+
+def _canonical(column: pd.Series) -> pd.Series:
+    """Equal values hash equally whatever the dtype: numbers as float64, timestamps as ns, the rest as text."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return pd.Series(column.to_numpy("datetime64[ns]").view("int64"))
+    try:
+        return pd.to_numeric(column).astype("float64")
+    except (TypeError, ValueError):
+        return column.astype("string").fillna("").astype(object)
+
+
+def row_hashes(X: pd.DataFrame, y: pd.Series) -> np.ndarray:
+    """Sorted 64-bit hashes of the (X, y) rows; the index and column dtypes are ignored."""
+    frame = X.reset_index(drop=True).assign(__target__=np.asarray(y))
+    frame = pd.DataFrame({name: _canonical(column) for name, column in frame.items()})
+    return np.sort(pd.util.hash_pandas_object(frame, index=False).to_numpy())
+
+
+def data_fingerprint(hashes: np.ndarray) -> str:
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:16]
+
+
+def params_fingerprint(pipeline: Pipeline) -> str:
+    """Hash of step types, hyperparameters and library versions."""
+    params = {}
+    for name, value in pipeline.get_params(deep=True).items():
+        if name == "steps" or hasattr(value, "get_params"):
+            params[name] = type(value).__name__ if hasattr(value, "get_params") else None
+        elif name.rsplit("__", 1)[-1] not in RUNTIME_PARAMS:
+            params[name] = repr(value)
+    params["__versions__"] = [sklearn.__version__]
+    final = pipeline.steps[-1][1]
+    if _is_xgboost(final):
+        import xgboost
+        params["__versions__"].append(xgboost.__version__)
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """Fingerprint-keyed store of fitted pipelines with reuse and XGBoost warm starts."""
+
+    def __init__(self, root=MODEL_DIR, keep=5, warm_start_rounds=100):
+        self.root = Path(root)
+        self.keep = keep
+        self.warm_start_rounds = warm_start_rounds
+        self.index_path = self.root / "index.json"
+
+    # ---------------------------------------------------------------- index
+    def index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _index_lock(self):
+        """Exclusive lock held while the index is read, changed and written back."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path.with_suffix(".json.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _save_index(self, index):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def entries(self, name: str) -> list:
+        return self.index().get(name, [])
+
+    # ------------------------------------------------------------ persistence
+    def _save(self, path: Path, pipeline: Pipeline):
+        path.mkdir(parents=True, exist_ok=True)
+        *head, (final_name, final) = pipeline.steps
+        if _is_xgboost(final):
+            final.save_model(path / "regressor.ubj")
+            joblib.dump({"steps": head, "final_name": final_name, "final_class": type(final),
+                         "final_params": final.get_params()}, path / "pipeline.joblib")
+        else:
+            joblib.dump({"pipeline": pipeline}, path / "pipeline.joblib")
+
+    def _load(self, path: Path) -> Pipeline:
+        saved = joblib.load(path / "pipeline.joblib")
+        if "pipeline" in saved:
+            return saved["pipeline"]
+        final = saved["final_class"](**saved["final_params"])
+        final.load_model(path / "regressor.ubj")
+        return Pipeline(steps=saved["steps"] + [(saved["final_name"], final)])
+
+    def load_latest(self, name: str):
+        """Most recently registered `(pipeline, entry)` for `name`."""
+        entries = self.entries(name)
+        if not entries:
+            raise LookupError(f"No registered model named '{name}' in {self.root}")
+        return self._load(self.root / entries[-1]["path"]), entries[-1]
+
+    # ------------------------------------------------------------------ fit
+    def fit(self, name: str, pipeline: Pipeline, X: pd.DataFrame, y: pd.Series):
+        """
+        Returns `(fitted_pipeline, entry)`, reusing or warm-starting a stored fit when possible.
+
+        `entry` is the registry record (mode, rows, train_seconds, ...) of the returned model.
+        """
+        hashes = row_hashes(X, y)
+        data_fp = data_fingerprint(hashes)
+        params_fp = params_fingerprint(pipeline)
+        candidates = [e for e in self.entries(name) if e["params_fp"] == params_fp]
+
+        for entry in reversed(candidates):
+            if entry["data_fp"] == data_fp:
+                model = self._load(self.root / entry["path"])
+                print(f"♻️ [{name}] Reusing model {entry['id']} ({entry['mode']}, {entry['rows']} rows, "
+                      f"trained in {entry['train_seconds']:.1f}s on {entry['trained_at']})")
+                return model, entry
+
+        previous = candidates[-1] if candidates else None
+        start = time.perf_counter()
+        model = None
+        if previous is not None and _is_xgboost(pipeline.steps[-1][1]) and self._only_added(previous, hashes):
+            print(f"🔁 [{name}] {len(hashes) - previous['rows']} new rows: continuing boosting from {previous['id']}...")
+            model = self._warm_start(self._load(self.root / previous["path"]), pipeline, X, y)
+            mode, parent = "warm_start", previous["id"]
+        if model is None:
+            print(f"🏋️ [{name}] Training from scratch on {len(hashes)} rows...")
+            model = clone(pipeline).fit(X, y)
+            mode, parent = "fit", None
+        train_seconds = time.perf_counter() - start
+
+        entry = self._register(name, model, hashes, data_fp, params_fp, mode, parent, train_seconds)
+        print(f"⏱️ [{name}] {mode} took {train_seconds:.1f}s (model {entry['id']})")
+        return model, entry
+
+    def _only_added(self, previous: dict, hashes: np.ndarray) -> bool:
+        """True when every row of the previous training set is still present and some were added."""
+        try:
+            old = np.load(self.root / previous["path"] / "rows.npy")
+        except OSError:
+            return False
+        return len(hashes) > len(old) and bool(np.isin(old, hashes, assume_unique=False).all())
+
+    def _warm_start(self, previous: Pipeline, pipeline: Pipeline, X, y):
+        """
+        Adds `warm_start_rounds` trees on top of the previous booster, or returns None.
+
+        The preprocessing is refitted on the full data through `fit_transform`, as in
+        a full fit, so target encodings of the training rows stay out-of-fold. When
+        that changes the columns the previous trees split on (e.g. a new category),
+        None is returned and the caller trains from scratch.
+        """
+        *previous_head, (final_name, previous_final) = previous.steps
+        head = clone(Pipeline(steps=pipeline.steps[:-1])) if previous_head else None
+        Xt = head.fit_transform(X, y) if head else X
+        if head and _layout(Xt) != _layout(Pipeline(steps=previous_head).transform(X.iloc[:0])):
+            print("   Preprocessing output changed since the previous fit: training from scratch instead.")
+            return None
+        final = clone(pipeline.steps[-1][1]).set_params(n_estimators=self.warm_start_rounds)
+        final.fit(Xt, y, xgb_model=previous_final.get_booster())
+        return Pipeline(steps=(head.steps if head else []) + [(final_name, final)])
+
+    def register(self, name: str, model: Pipeline, hashes: np.ndarray, mode: str, train_seconds: float,
+                 parent=None) -> dict:
+        """Records a pipeline fitted elsewhere (e.g. by streaming training) from its sorted row hashes."""
+        return self._register(name, model, hashes, data_fingerprint(hashes), params_fingerprint(model),
+                              mode, parent, train_seconds)
+
+    def _register(self, name, model, hashes, data_fp, params_fp, mode, parent, train_seconds) -> dict:
+        trained_at = datetime.now(timezone.utc)
+        model_id = f"{trained_at:%Y%m%dT%H%M%S}-{params_fp[:6]}-{data_fp[:8]}"
+        path = Path(name) / model_id
+        self._save(self.root / path, model)
+        np.save(self.root / path / "rows.npy", hashes)
+
+        entry = {
+            "id": model_id,
+            "path": str(path),
+            "mode": mode,
+            "parent": parent,
+            "params_fp": params_fp,
+            "data_fp": data_fp,
+            "rows": int(len(hashes)),
+            "train_seconds": round(train_seconds, 3),
+            "trained_at": trained_at.isoformat(timespec="seconds"),
+        }
+        with self._index_lock():
+            index = self.index()
+            entries = index.setdefault(name, [])
+            entries.append(entry)
+            for old in entries[:-self.keep]:
+                shutil.rmtree(self.root / old["path"], ignore_errors=True)
+            index[name] = entries[-self.keep:]
+            self._save_index(index)
+        return entry
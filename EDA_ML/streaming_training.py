@@ -0,0 +1,245 @@
+"""
+Out-of-core training path for the XGBoost freight model.
+
+The in-memory path in EDA_ML.py needs the whole feature matrix as one pandas
+frame. This one reads the feature-store Parquet snapshot in record batches:
+
+1. pass one fits the scaler (`StandardScaler.partial_fit`) and collects the
+   state categories batch by batch;
+2. pass two feeds the transformed batches to XGBoost through a `DataIter`,
+   backed by an external-memory quantile DMatrix cached on disk.
+
+Peak memory is bounded by the batch size and the quantised pages XGBoost keeps,
+not by the number of customers. The fitted preprocessor and booster are wrapped
+in a `Pipeline` (preprocessor, regressor) and registered in the model registry,
+so batch_scoring.py can serve them.
+
+    python EDA_ML/streaming_training.py --batch-size 200000
+    python EDA_ML/streaming_training.py --synthetic-scale 50   # 50x the customers, streamed to Parquet
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xgboost as xgb
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBRegressor
+
+from feature_store import CustomerFeatureStore
+from freight_features import REQUIRED_COLUMNS, TARGET
+from freight_tuning import customer_fold, load_best_params
+from model_registry import ModelRegistry
+
+MODEL_NAME = "xgb_freight_streaming"
+# Raw feature-store columns only: the zip encodings in freight_features.py need
+# the whole training set at once, so the streaming path uses the zip centroid instead
+NUM_FEATURES = ["total_revenue", "order_items", "customer_lat", "customer_lng"]
+CAT_FEATURES = ["customer_state"]
+COLUMNS = ["customer_id"] + NUM_FEATURES + CAT_FEATURES + [TARGET]
+BATCH_SIZE = 200_000
+
+# xgboost >= 3.0 has a dedicated external-memory quantile matrix; older
+# versions page a DMatrix built from the iterator to its cache_prefix instead
+if hasattr(xgb, "ExtMemQuantileDMatrix"):
+    ExternalMatrix = xgb.ExtMemQuantileDMatrix
+else:
+    def ExternalMatrix(data, max_bin=None, ref=None):
+        return xgb.DMatrix(data)
+
+
+class StreamingPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Scaler + one-hot encoding fitted incrementally with `partial_fit`.
+
+    Produces scaled numerics, then one indicator per known state (unknown states
+    get all zeros).
+    """
+
+    def __init__(self, num_features=tuple(NUM_FEATURES), cat_feature=CAT_FEATURES[0]):
+        self.num_features = num_features
+        self.cat_feature = cat_feature
+
+    def partial_fit(self, X, y=None):
+        if not hasattr(self, "scaler_"):
+            self.scaler_ = StandardScaler()
+            self.categories_ = set()
+        self.scaler_.partial_fit(X[list(self.num_features)].to_numpy(np.float64))
+        self.categories_.update(X[self.cat_feature].dropna().astype(str).unique())
+        return self
+
+    def fit(self, X, y=None):
+        for attr in ("scaler_", "categories_"):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        return self.partial_fit(X, y)
+
+    def transform(self, X):
+        categories = sorted(self.categories_)
+        numeric = X[list(self.num_features)].to_numpy(np.float64)
+        # Mean imputation, as in the EDA pipeline
+        numeric = np.where(np.isnan(numeric), self.scaler_.mean_, numeric)
+        out = np.zeros((len(X), len(self.num_features) + len(categories)), dtype=np.float32)
+        out[:, :len(self.num_features)] = self.scaler_.transform(numeric)
+        codes = pd.Categorical(X[self.cat_feature].astype("string"), categories=categories).codes
+        rows = np.flatnonzero(codes >= 0)
+        out[rows, len(self.num_features) + codes[rows]] = 1.0
+        return out
+
+
+def iter_frames(path, batch_size=BATCH_SIZE, fold=None):
+    """
+    DataFrames of up to `batch_size` rows from the Parquet file, without rows missing revenue or freight.
+    `fold` is "train" or "valid" (hash folds as in freight_tuning.py; the EDA test fold is skipped).
+    """
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=COLUMNS):
+        df = batch.to_pandas().dropna(subset=REQUIRED_COLUMNS)
+        folds = customer_fold(df["customer_id"], 10)
+        keep = folds % 5 != 0
+        if fold == "train":
+            keep &= folds != 1
+        elif fold == "valid":
+            keep &= folds == 1
+        yield df[keep]
+
+
+class ParquetBatches(xgb.DataIter):
+    """Feeds transformed Parquet batches of one fold to XGBoost; XGBoost may iterate several times."""
+
+    def __init__(self, path, preprocessor, batch_size, fold, cache_prefix):
+        self.path = path
+        self.preprocessor = preprocessor
+        self.batch_size = batch_size
+        self.fold = fold
+        self._frames = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._frames is None:
+            self._frames = iter_frames(self.path, self.batch_size, self.fold)
+        for df in self._frames:
+            if df.empty:
+                continue
+            input_data(data=self.preprocessor.transform(df), label=df[TARGET].to_numpy(np.float32))
+            return True
+        return False
+
+    def reset(self):
+        self._frames = None
+
+
+def write_synthetic(source, out_path, scale, batch_size=BATCH_SIZE, seed=42):
+    """Streams `scale` jittered copies of every feature row (new customer ids) into a Parquet file."""
+    rng = np.random.default_rng(seed)
+    writer = None
+    try:
+        for copy in range(scale):
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size, columns=COLUMNS):
+                df = batch.to_pandas()
+                df["customer_id"] = df["customer_id"].astype(str) + f"-{copy}"
+                noise = rng.normal(1.0, 0.05, len(df))
+                df["total_revenue"] = df["total_revenue"] * noise
+                df[TARGET] = df[TARGET] * noise
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema)
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return out_path
+
+
+def train_streaming(path, batch_size=BATCH_SIZE, num_boost_round=500, early_stopping_rounds=30,
+                    n_jobs=-1, registry: ModelRegistry = None, model_name=MODEL_NAME):
+    """Trains from the Parquet file in batches and registers the resulting pipeline."""
+    start = time.perf_counter()
+    preprocessor = StreamingPreprocessor()
+    hashes = []  # 8 bytes per row, for the registry's data fingerprint
+    for df in iter_frames(path, batch_size, "train"):
+        if not df.empty:
+            preprocessor.partial_fit(df)
+            rows = df[NUM_FEATURES + CAT_FEATURES].assign(__target__=df[TARGET].to_numpy())
+            hashes.append(pd.util.hash_pandas_object(rows, index=False).to_numpy())
+    if not hashes:
+        raise ValueError(f"No training rows in {path}")
+    hashes = np.sort(np.concatenate(hashes))
+    rows = len(hashes)
+    print(f"▶ Pass 1: fitted scaler and {len(preprocessor.categories_)} categories on {rows} rows")
+
+    params = {"objective": "reg:squarederror", "learning_rate": 0.05, "random_state": 42}
+    tuned = load_best_params()
+    if tuned:
+        params.update(tuned["params"])
+        num_boost_round = max(num_boost_round, tuned["n_estimators"])
+    params["nthread"] = n_jobs if n_jobs > 0 else os.cpu_count()
+
+    cache_dir = tempfile.mkdtemp(prefix="freight_xgb_")
+    try:
+        train_iter = ParquetBatches(path, preprocessor, batch_size, "train", os.path.join(cache_dir, "train"))
+        dtrain = ExternalMatrix(train_iter, max_bin=256)
+        valid_iter = ParquetBatches(path, preprocessor, batch_size, "valid", os.path.join(cache_dir, "valid"))
+        dvalid = ExternalMatrix(valid_iter, max_bin=256, ref=dtrain)
+        print(f"▶ Pass 2: external-memory DMatrix with {dtrain.num_row()} train / {dvalid.num_row()} validation rows")
+
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=[(dvalid, "valid")],
+                            early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+        # Release the matrices first so XGBoost deletes its own cache pages
+        del dtrain, dvalid
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    best_score = booster.best_score
+    booster = booster[: booster.best_iteration + 1]
+    regressor = XGBRegressor(**{k: v for k, v in params.items() if k != "nthread"},
+                             n_estimators=booster.num_boosted_rounds(), n_jobs=n_jobs, tree_method="hist")
+    regressor.load_model(bytearray(booster.save_raw("ubj")))
+    pipeline = Pipeline(steps=[("preprocessor", preprocessor), ("regressor", regressor)])
+    train_seconds = time.perf_counter() - start
+
+    entry = (registry or ModelRegistry()).register(
+        model_name, pipeline, hashes, mode="streaming", train_seconds=train_seconds,
+    )
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"✅ Trained {booster.num_boosted_rounds()} rounds (validation RMSE {best_score:.4f}) "
+          f"in {train_seconds:.1f}s, peak RSS {peak_mb:.0f} MiB; registered as {model_name}/{entry['id']}")
+    return pipeline, entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core training of the freight model from Parquet")
+    parser.add_argument("--features", default=None, help="Parquet file (default: latest feature-store snapshot)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--synthetic-scale", type=int, default=0, help="Train on N jittered copies of the features")
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    args = parser.parse_args()
+
+    path = args.features
+    if path is None:
+        store = CustomerFeatureStore()
+        path = store.root / store.latest_snapshot()["path"]
+
+    tmp_dir = None
+    if args.synthetic_scale > 1:
+        tmp_dir = tempfile.mkdtemp(prefix="freight_synthetic_")
+        print(f"▶ Writing {args.synthetic_scale}x synthetic features ...")
+        path = write_synthetic(path, Path(tmp_dir) / "features.parquet", args.synthetic_scale, args.batch_size)
+    # Train through the imported module so the preprocessor pickles as
+    # streaming_training.StreamingPreprocessor rather than __main__.StreamingPreprocessor
+    import streaming_training
+    try:
+        streaming_training.train_streaming(path, args.batch_size, args.rounds, model_name=args.model_name)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,81 @@
+"""
+On-disk cache of warehouse query results for EDA_ML.load_table.
+
+Entries are Arrow IPC files keyed by table name, projected columns and the
+table version (last-modified time or dbt run id). A new version replaces the
+old entry, total size is capped with least-recently-used eviction, and hits
+are read through a memory map so repeat runs skip the warehouse entirely.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+import pyarrow as pa
+
+CACHE_DIR = Path(os.environ.get("EDA_CACHE_DIR", Path(__file__).resolve().parent / ".cache" / "tables"))
+MAX_BYTES = int(os.environ.get("EDA_CACHE_MAX_BYTES", 2 * 1024**3))  # 2 GiB
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+
+
+class TableCache:
+    """Size-bounded LRU cache of DataFrames stored as uncompressed Arrow IPC files."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _prefix(self, table_name, columns) -> str:
+        projection = ",".join(sorted(columns)) if columns else "*"
+        return f"{table_name}__{_digest(projection)}__"
+
+    def _path(self, table_name, columns, version) -> Path:
+        return self.cache_dir / f"{self._prefix(table_name, columns)}{_digest(str(version))}.arrow"
+
+    def get(self, table_name, columns, version):
+        """Returns the cached DataFrame, or None on a miss (or when the version is unknown)."""
+        if version is None:
+            return None
+        path = self._path(table_name, columns, version)
+        if not path.exists():
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+
+    def put(self, table_name, columns, version, df):
+        """Stores `df`, dropping entries for older versions of the same projection."""
+        if version is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(table_name, columns, version)
+
+        for stale in self.cache_dir.glob(f"{self._prefix(table_name, columns)}*.arrow"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = path.with_suffix(".tmp")
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Deletes least-recently-used entries until the cache fits in `max_bytes`."""
+        entries = sorted(
+            (p.stat().st_mtime, p.stat().st_size, p) for p in self.cache_dir.glob("*.arrow")
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -1,9 +1,7 @@
 # %%
-import great_expectations as gx
 from datetime import datetime,timedelta, timezone
 import os
 import sys
-print(f"Great Expectations Version: {gx.__version__}")
 
 
 # %%
@@ -11,25 +9,57 @@ print(f"Great Expectations Version: {gx.__version__}")
 # CONFIGURATION
 # ============================================================================
 
-PROJECT_ID = "durable-ripsaw-477914-g0"
-DATASET =  "ecommerce"
-CONNECTION_STRING = f"bigquery://{PROJECT_ID}/{DATASET}"
+# Shared warehouse pool (dagster_proj/resources/warehouse.py); the Dagster op
+# passes its resource config through OLIST_* environment variables.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 CREDENTIALS_PATH = "/path/to/credentials.json"
 
+# Set by init(): importing this module does not import great_expectations or
+# touch the warehouse, so the warm worker (dagster_proj/worker.py) can preload
+# the library once and load the script per run
+gx = None
+warehouse = None
+PROJECT_ID = None
+DATASET = None
+CONNECTION_STRING = None
+context = None
+datasource = None
+RENDERED_RUNS_FILE = None
+
 # %%
 # ============================================================================
 # SETUP GREAT EXPECTATIONS
 # ============================================================================
+def init():
+    """Initialize GX context and datasource"""
+    global gx, warehouse, PROJECT_ID, DATASET, CONNECTION_STRING, context, datasource, RENDERED_RUNS_FILE
+    if context is not None:
+        return
 
+    import great_expectations
+    from dagster_proj.resources.warehouse import get_warehouse
 
-"""Initialize GX context and datasource"""
-context = context = gx.get_context(mode="file", project_root_dir=".")
+    gx = great_expectations
+    print(f"Great Expectations Version: {gx.__version__}")
 
-datasource = context.data_sources.add_or_update_sql(
-    name="bq_ds",
-    connection_string=CONNECTION_STRING
-    #kwargs={"credentials_path": CREDENTIALS_PATH}
-)
+    warehouse = get_warehouse()
+
+    PROJECT_ID = warehouse.project_id
+    DATASET =  warehouse.dataset
+    CONNECTION_STRING = warehouse.connection_string
+
+    context = gx.get_context(mode="file", project_root_dir=".")
+
+    datasource = context.data_sources.add_or_update_sql(
+        name="bq_ds" if warehouse.backend == "bigquery" else f"{warehouse.backend}_ds",
+        connection_string=CONNECTION_STRING,
+        kwargs=warehouse.engine_kwargs()
+        #kwargs={"credentials_path": CREDENTIALS_PATH}
+    )
+
+    # Run names already rendered into Data Docs (see generate_gx_html_report)
+    RENDERED_RUNS_FILE = os.path.join(context.root_directory, "uncommitted", "data_docs", "rendered_runs.txt")
 
 # %%
 #DATA COMPLETENESS PARAMETERS
@@ -39,6 +69,13 @@ MIN_TOTAL=100
 MAX_DATE =    datetime(2018, 9, 3)
 MIN_DATE = MAX_DATE - timedelta(days=365*5)
 FRESHNESS_DAY = 7
+
+# Exit code when expectations failed (errors exit with 1); see dagster_proj/jobs/policies.py
+VALIDATION_FAILED_EXIT = 3
+# Daily partitioned Dagster runs validate only their day of fact_db_order_items
+PARTITION_DATE = os.environ.get("OLIST_PARTITION_DATE") or None
+# Whole-table properties (volume, freshness) that a single day cannot satisfy
+TABLE_LEVEL_EXPECTATIONS = ("expect_table_row_count_to_be_between", "expect_column_max_to_be_between")
 brazilian_states = [
         'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA',
         'MT', 'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', 'RJ', 'RN',
@@ -526,6 +563,7 @@ def setup_expectations():
     print("🔧 SETUP MODE: Defining expectations...")
 
     fact_db_order_items_validation_asset()
+    partition_validation_suite()
     #fact_customer_validation_asset()
     dim_db_customers_validation_asset()
     dim_db_sellers_validation_asset()
@@ -616,14 +654,35 @@ def open_file_in_external_browser(linux_path: str):
         # Catch all other exceptions
         print(f"\n❌ Generic Error launching browser: {e}")
 
-def generate_gx_html_report(run_name):
+def pending_validation_result_ids():
+    """Returns the stored validation results whose run has not been rendered into Data Docs yet."""
+    rendered_runs = set()
+    if os.path.exists(RENDERED_RUNS_FILE):
+        with open(RENDERED_RUNS_FILE, "r") as f:
+            rendered_runs = {line.strip() for line in f if line.strip()}
+
+    return [
+        key for key in context.validation_results_store.list_keys()
+        if key.run_id.run_name not in rendered_runs
+    ]
+
+def generate_gx_html_report(open_browser=False):
     # ============================================
-    # 9. Open HTML Report
+    # 9. Incremental Data Docs Build
     # ============================================
+    # Only the validation results that are not rendered yet are passed to the
+    # site builder; the index page is rebuilt so it links every run.
+    pending = pending_validation_result_ids()
+    if not pending:
+        print("📄 Data Docs already up to date - nothing to render.")
+    else:
+        print(f"📄 Rendering {len(pending)} new validation result(s) into Data Docs...")
+        context.build_data_docs(resource_identifiers=pending, build_index=True)
 
-
-    # Build data docs
-    context.build_data_docs()
+        os.makedirs(os.path.dirname(RENDERED_RUNS_FILE), exist_ok=True)
+        with open(RENDERED_RUNS_FILE, "a") as f:
+            for run_name in sorted({key.run_id.run_name for key in pending}):
+                f.write(run_name + "\n")
 
     print(f"\n{'='*60}")
     print("GX HTML REPORT LOCATION")
@@ -633,21 +692,92 @@ def generate_gx_html_report(run_name):
     index_path = os.path.join(data_docs_path, "index.html")
 
     print(f"Main Index: {index_path}")
-    print(f"\n💡 The HTML report includes validation results for ALL 3 assets!")
-    print(f"   Navigate to 'Validation Results' > '{run_name}' to see all results.")
+    print(f"   Navigate to 'Validation Results' to see the results of each run.")
     print(f"{'='*60}\n")
 
-    print("\nOpen the index.html file in your browser to view the interactive report!")
-    open_file_in_external_browser( os.path.abspath(index_path)  )
+    if open_browser:
+        open_file_in_external_browser( os.path.abspath(index_path)  )
+
+# %%
+# ============================================
+# PARTITIONED RUNS: one order day of the fact table
+# ============================================
+def partition_validation_suite():
+    """Copy of the fact suite without the whole-table volume and freshness checks."""
+    try:
+        context.suites.delete("fact_db_order_items_validation_daily")
+    except:
+        pass
+    suite_name = gx.ExpectationSuite(name="fact_db_order_items_validation_daily")
+    for expectation in context.suites.get("fact_db_order_items_validation").expectations:
+        if expectation.expectation_type not in TABLE_LEVEL_EXPECTATIONS:
+            suite_name.add_expectation(expectation.copy(update={"id": None}))
+    context.suites.add(suite_name)
+    return suite_name
+
+
+def partition_batch_parameters(partition_date):
+    day = datetime.strptime(partition_date, "%Y-%m-%d")
+    return {"year": day.year, "month": day.month, "day": day.day}
+
+
+def run_partition_validation(partition_date):
+    """
+    Validates the rows of fact_db_order_items ordered on `partition_date` through a
+    daily batch definition on order_date_key. The dimensions are full rebuilds,
+    identical for every partition, so they are left to the unpartitioned runs.
+    """
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    batch_def = datasource.get_asset("fact_db_order_items").add_batch_definition_daily(
+        name=f"b_fact_db_order_items_daily_{stamp}",
+        column="order_date_key"
+    )
+    validation_def = gx.ValidationDefinition(
+        name=f"v_fact_db_order_items_{partition_date}_{stamp}",
+        data=batch_def,
+        # Defined by setup mode; partitions running concurrently only read it
+        suite=context.suites.get("fact_db_order_items_validation_daily")
+    )
+    context.validation_definitions.add(validation_def)
+
+    checkpoint = gx.Checkpoint(
+        name=f"checkpoint_partition_{stamp}",
+        validation_definitions=[validation_def],
+        result_format={"result_format": "COMPLETE"}
+    )
+    context.checkpoints.add(checkpoint)
+
+    print(f"\n🔍 Validating fact_db_order_items for partition {partition_date}...")
+    run_name = f"validation_run_{partition_date}_{stamp}"
+    checkpoint_result = checkpoint.run(
+        run_id=gx.RunIdentifier(run_name=run_name),
+        batch_parameters=partition_batch_parameters(partition_date)
+    )
+
+    for validation_result in checkpoint_result.run_results.values():
+        failed = [r for r in validation_result.results if not r.success]
+        print(f"   ✅ Passed: {len(validation_result.results) - len(failed)}")
+        print(f"   ❌ Failed: {len(failed)}")
+        for result in failed:
+            column = result.expectation_config.kwargs.get('column', 'N/A')
+            print(f"      ❌ {result.expectation_config.type} on column '{column}'")
+
+    print(f"✅ Checkpoint completed with run_name: {run_name}")
+    print(f"   Overall Success: {checkpoint_result.success}")
+    return checkpoint_result.success
 
 # %%
 # ============================================
 # SCRIPT MODE 2: Regular Runs (Run All Checkpoints)
 # ============================================
-def run_all_validations():
+def run_all_validations(partition_date=PARTITION_DATE):
     """
     This uses the ALREADY SAVED expectations - no need to redefine them!
+
+    Returns True when every expectation passed.
     """
+    if partition_date:
+        return run_partition_validation(partition_date)
     
     #fact_db_order_items
     batch_def_fact_db_order_items = datasource.get_asset("fact_db_order_items").add_batch_definition_whole_table(
@@ -780,28 +910,229 @@ def run_all_validations():
 
     print(f"✅ Checkpoint completed with run_name: {run_name}")
     print(f"   Overall Success: {checkpoint_result.success}")
+    print("💡 Data Docs are built separately: python GX/GX_Validation_Report.py --mode docs")
+
+    return checkpoint_result.success
+
+# %%
+# ============================================
+# FAST TIER: Sample-Based Validation (Fail Fast)
+# Validates a small deterministic sample of each asset against the SAME suites
+# and aborts before the full checkpoint when a failure is statistically certain.
+# ============================================
+import math
+import time
+import sqlalchemy as sa
+
+SAMPLE_FRACTION = 0.01
+SAMPLE_CONFIDENCE_Z = 3.0   # one-sided z-score required to call a sample failure "high confidence"
+
+# Tables covered by the fast tier -> (hash key used for sampling, column used to stratify the sample)
+SAMPLE_TABLES = {
+    "fact_db_order_items": ("CONCAT(order_id, '-', CAST(order_item_id AS STRING))", "order_date_key"),
+    "dim_db_customers":    ("customer_id", None),
+    "dim_db_sellers":      ("seller_id", None),
+    "dim_db_products":     ("product_id", None),
+}
+
+# A single violating row in the sample is a violation of the full table for these
+# expectation types (when they do not use `mostly`).
+EXACT_ON_SAMPLE = {
+    "expect_column_distinct_values_to_be_in_set",
+    "expect_column_values_to_be_in_set",
+    "expect_column_values_to_be_between",
+    "expect_column_values_to_not_be_null",
+    "expect_column_pair_values_a_to_be_greater_than_b",
+}
+
+def sample_table_sql(table_name, fraction):
+    """
+    Builds the CREATE TABLE statement for the sample of `table_name`.
+
+    Stratified tables keep ceil(fraction * rows) of every stratum (so every day is
+    represented), the others use a hash of the key so the sample is deterministic.
+    """
+    key, strata_column = SAMPLE_TABLES[table_name]
+    source = warehouse.table(table_name)
+    # FARM_FINGERPRINT is BigQuery only; the DuckDB stand-in has hash()
+    hash_fn = "FARM_FINGERPRINT" if warehouse.backend == "bigquery" else "hash"
+
+    if strata_column:
+        select = f"""
+            SELECT * FROM {source}
+            WHERE TRUE
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY {strata_column} ORDER BY {hash_fn}({key}))
+                <= GREATEST(1, CAST(CEIL(COUNT(*) OVER (PARTITION BY {strata_column}) * {fraction}) AS BIGINT))
+        """
+    else:
+        select = f"""
+            SELECT * FROM {source}
+            WHERE MOD(ABS({hash_fn}({key})), 1000000) < {int(fraction * 1000000)}
+        """
+
+    options = ""
+    if warehouse.backend == "bigquery":
+        options = "OPTIONS (expiration_timestamp = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL 1 DAY))"
+
+    return f"""
+        CREATE OR REPLACE TABLE {warehouse.table(f"gx_sample_{table_name}")}
+        {options}
+        AS {select}
+    """
+
+def sample_validation_asset(table_name, fraction):
+    """Materialises the sample table and registers it with a copy of the table's suite."""
+    with datasource.get_engine().begin() as conn:
+        conn.execute(sa.text(sample_table_sql(table_name, fraction)))
+
+    sample_name = f"gx_sample_{table_name}"
+    try:
+        datasource.delete_asset(sample_name)
+    except:
+        pass
+    datasource.add_table_asset(
+        name=sample_name,
+        table_name=sample_name,
+        schema_name=DATASET
+    )
+
+    try:
+        context.suites.delete(f"{table_name}_validation_sample")
+    except:
+        pass
+    suite_name = gx.ExpectationSuite(name=f"{table_name}_validation_sample")
+
+    for expectation in context.suites.get(f"{table_name}_validation").expectations:
+        update = {"id": None}
+        # Row counts shrink with the sample; scale the bounds accordingly
+        if expectation.expectation_type == "expect_table_row_count_to_be_between":
+            if expectation.min_value is not None:
+                update["min_value"] = int(expectation.min_value * fraction)
+            if expectation.max_value is not None:
+                update["max_value"] = int(math.ceil(expectation.max_value * fraction))
+        suite_name.add_expectation(expectation.copy(update=update))
+
+    context.suites.add(suite_name)
+    return sample_name
+
+def is_high_confidence_failure(result, table_name, fraction):
+    """
+    Decides whether a failed expectation on the sample proves the full table fails.
+
+    Failures that cannot be decided from a sample (quantiles, min/max outside the
+    strata column, ...) return False and are left to the full tier.
+    """
+    config = result.expectation_config
+    kwargs = config.kwargs
+    observed = result.result or {}
+    mostly = kwargs.get("mostly")
+
+    if config.type in EXACT_ON_SAMPLE and mostly is None:
+        return True
+
+    if mostly is not None and observed.get("unexpected_percent") is not None:
+        # One-sided test of H0: unexpected rate <= (1 - mostly)
+        n = observed.get("element_count") or 0
+        allowed = 1.0 - mostly
+        if n == 0 or allowed <= 0:
+            return n > 0
+        se = math.sqrt(allowed * (1 - allowed) / n)
+        return observed["unexpected_percent"] / 100.0 > allowed + SAMPLE_CONFIDENCE_Z * se
+
+    if config.type == "expect_table_row_count_to_be_between" and kwargs.get("min_value"):
+        # Sample row count ~ Binomial(rows, fraction)
+        expected = kwargs["min_value"]
+        se = math.sqrt(max(expected, 1) * (1 - fraction))
+        return observed.get("observed_value", 0) < expected - SAMPLE_CONFIDENCE_Z * se
+
+    if config.type == "expect_column_max_to_be_between":
+        # A stratified sample keeps every stratum, so the max of the strata column is exact
+        return kwargs.get("column") == SAMPLE_TABLES[table_name][1]
+
+    return False
+
+def run_sample_validations(fraction=SAMPLE_FRACTION):
+    """
+    Returns True when the sample tier found no high-confidence failure.
+    """
+    print(f"\n⚡ FAST TIER: validating a {fraction:.2%} sample of each asset...")
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    validation_defs = []
+    for table_name in SAMPLE_TABLES:
+        sample_name = sample_validation_asset(table_name, fraction)
+        batch_def = datasource.get_asset(sample_name).add_batch_definition_whole_table(
+            name=f"b_{sample_name}_{stamp}"
+        )
+        validation_def = gx.ValidationDefinition(
+            name=f"v_{sample_name}_{stamp}",
+            data=batch_def,
+            suite=context.suites.get(f"{table_name}_validation_sample")
+        )
+        context.validation_definitions.add(validation_def)
+        validation_defs.append(validation_def)
+
+    checkpoint = gx.Checkpoint(
+        name=f"checkpoint_sample_{stamp}",
+        validation_definitions=validation_defs,
+        result_format={"result_format": "SUMMARY"}
+    )
+    context.checkpoints.add(checkpoint)
+    checkpoint_result = checkpoint.run(run_id=gx.RunIdentifier(run_name=f"sample_run_{stamp}"))
 
-    generate_gx_html_report(run_name)
+    certain_failures = []
+    for validation_result in checkpoint_result.run_results.values():
+        table_name = validation_result.suite_name[:-len("_validation_sample")]
+        for result in validation_result.results:
+            if result.success:
+                continue
+            column = result.expectation_config.kwargs.get('column', 'N/A')
+            if is_high_confidence_failure(result, table_name, fraction):
+                certain_failures.append((table_name, result.expectation_config.type, column))
+            else:
+                print(f"   ⚠️ {table_name}: {result.expectation_config.type} on '{column}' failed on the sample (inconclusive, left to full tier)")
 
-    return checkpoint_result
+    for table_name, expectation_type, column in certain_failures:
+        print(f"   ❌ {table_name}: {expectation_type} on '{column}' (high confidence)")
+
+    return not certain_failures
 
 # %%
 # ============================================
 # SCRIPT MODE 3: Full Mode (Setup + Validate)
 # For CI/CD or when you want to ensure fresh setup
 # ============================================
-def full_run():
+def full_run(sample_fraction=SAMPLE_FRACTION, skip_sample=False, partition_date=PARTITION_DATE):
     """
     python validate_data.py --mode full
     
     Run this when you want to redefine expectations AND validate.
     Useful for CI/CD pipelines or testing.
+
+    The fast sample tier runs first; the full checkpoint only runs when it passes.
     """
     print("🔄 FULL MODE: Setting up expectations and running validation...\n")
     
     setup_expectations()
     print()
-    success = run_all_validations()
+
+    sample_seconds = None
+    # The sample tier checks whole tables; a partitioned run only covers one day
+    if not skip_sample and not partition_date:
+        start = time.perf_counter()
+        sample_passed = run_sample_validations(sample_fraction)
+        sample_seconds = time.perf_counter() - start
+        print(f"⏱ Fast tier (sample) took {sample_seconds:.1f}s")
+        if not sample_passed:
+            print("🛑 Aborting: the sample tier found high-confidence failures, full validation skipped.")
+            return False
+
+    start = time.perf_counter()
+    success = run_all_validations(partition_date)
+    full_seconds = time.perf_counter() - start
+
+    print(f"\n⏱ Tier timings: sample={'skipped' if sample_seconds is None else f'{sample_seconds:.1f}s'}"
+          f" | full={full_seconds:.1f}s")
     
     return success
 
@@ -809,17 +1140,51 @@ def full_run():
 # ============================================
 # Main Script Entry Point
 # ============================================
-if __name__ == "__main__":
-    
+def main(argv=None) -> int:
+    """
+    Command line entry point; returns the exit code.
+
+    Also called in-process by the warm worker (dagster_proj/worker.py).
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Great Expectations validation for the Olist star schema")
+    parser.add_argument("--mode", choices=["setup", "sample", "validate", "full", "docs"], default="full",
+                        help="setup: define suites, sample: fast sample tier only, validate: run checkpoint, "
+                             "full: setup + sample tier + validate, docs: render new results into Data Docs")
+    parser.add_argument("--sample-fraction", type=float, default=SAMPLE_FRACTION,
+                        help="fraction of each asset validated by the fast tier")
+    parser.add_argument("--skip-sample", action="store_true",
+                        help="run the full checkpoint without the fast sample tier")
+    parser.add_argument("--open-browser", action="store_true",
+                        help="open the Data Docs index after rendering (docs mode only)")
+    parser.add_argument("--partition-date", default=PARTITION_DATE,
+                        help="validate only this order day (YYYY-MM-DD) of fact_db_order_items")
+    args = parser.parse_args(argv)
+
     try:
-        success = full_run()
-        sys.exit(0 if success else 1)
+        init()
+        if args.mode == "setup":
+            setup_expectations()
+            success = True
+        elif args.mode == "sample":
+            success = run_sample_validations(args.sample_fraction)
+        elif args.mode == "validate":
+            success = run_all_validations(args.partition_date)
+        elif args.mode == "docs":
+            generate_gx_html_report(open_browser=args.open_browser)
+            success = True
+        else:
+            success = full_run(args.sample_fraction, args.skip_sample, args.partition_date)
+        # Distinct from errors (1): the pipeline does not retry a validation failure
+        return 0 if success else VALIDATION_FAILED_EXIT
     
     except Exception as e:
         print(f"\n❌ Error: {e}")
         import traceback
         traceback.print_exc()
-        sys.exit(1)
-
+        return 1
 
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Concurrent backfill of ELT_Pipeline_Job over a range of daily partitions.
+
+    python -m dagster_proj.backfill --start 2017-01-01 --end 2017-01-31 --max-concurrent 4
+
+Every partition is launched as its own run (tagged `dagster/partition`) from a
+pool of worker processes, at most `--max-concurrent` runs at a time and at most
+`--ops-per-run` ops in parallel inside each run. Partitions that already have a
+successful run in the Dagster instance are skipped, and partitions whose last
+run failed are re-executed from the failed op (`ReexecutionOptions.from_failure`)
+instead of from the start, so an interrupted backfill picks up where it stopped.
+Inside a run, stages whose inputs are unchanged for that day are skipped by the
+fingerprints (dagster_proj/jobs/fingerprints.py).
+
+The partitions only load, build, test and validate their own day. The stages
+that rebuild whole tables or shared files (`SHARED_STAGES`: dims, aggregates,
+model training, feature and dashboard snapshots) run once, in one
+unpartitioned run after the last partition (see dagster_proj/jobs/partitions.py).
+
+    python -m dagster_proj.backfill --resume <run_id>   # one failed run, from its failed op
+
+Needs DAGSTER_HOME: the run history of the instance is what tells finished
+partitions apart, and the runs show up in the Dagster UI like any other.
+"""
+import argparse
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dagster import (
+    DagsterInstance, DagsterRunStatus, PartitionKeyRange, ReexecutionOptions, RunsFilter, execute_job, reconstructable,
+)
+
+from dagster_proj.jobs.partitions import BACKFILL_TAG, SHARED_RUN_TAG, daily_partitions
+
+JOB_NAME = "ELT_Pipeline_Job"
+PARTITION_TAG = "dagster/partition"
+MAX_CONCURRENT = 4
+OPS_PER_RUN = 2
+
+
+def pipeline_job():
+    """ELT_Pipeline_Job with the resources bound in dagster_proj/definitions.py."""
+    from dagster_proj.definitions import defs
+
+    return defs.get_job_def(JOB_NAME)
+
+
+def partition_range(start=None, end=None) -> list:
+    keys = daily_partitions.get_partition_keys()
+    return daily_partitions.get_partition_keys_in_range(
+        PartitionKeyRange(start or keys[0], end or keys[-1])
+    )
+
+
+def succeeded_partitions(instance, partitions) -> set:
+    """Partitions of `partitions` with at least one successful run."""
+    runs = instance.get_runs(RunsFilter(job_name=JOB_NAME, statuses=[DagsterRunStatus.SUCCESS]))
+    return {run.tags.get(PARTITION_TAG) for run in runs} & set(partitions)
+
+
+def failed_runs(instance, partitions) -> dict:
+    """partition -> id of its most recent run, for partitions whose most recent finished run failed."""
+    runs = instance.get_runs(RunsFilter(job_name=JOB_NAME,
+                                        statuses=[DagsterRunStatus.SUCCESS, DagsterRunStatus.FAILURE]))
+    latest = {}
+    for run in runs:  # newest first
+        latest.setdefault(run.tags.get(PARTITION_TAG), run)
+    return {p: run.run_id for p, run in latest.items()
+            if p in set(partitions) and run.status == DagsterRunStatus.FAILURE}
+
+
+def run_partition(partition, backfill_id, ops_per_run=OPS_PER_RUN, force=False, resume_from=None, shared=False):
+    """
+    Runs one partition to completion in this (worker) process; returns (partition, success, run_id).
+
+    With `resume_from` (a failed run id), only the failed ops and those below them run again.
+    With `shared` (and no partition), runs the backfill's shared stages instead.
+    """
+    tags = {BACKFILL_TAG: backfill_id}
+    if partition:
+        tags[PARTITION_TAG] = partition
+    if shared:
+        tags[SHARED_RUN_TAG] = "true"
+    if force:
+        tags["olist/force"] = "true"
+    run_config = {"execution": {"config": {"multiprocess": {"max_concurrent": ops_per_run}}}}
+    with DagsterInstance.get() as instance:
+        reexecution = ReexecutionOptions.from_failure(resume_from, instance) if resume_from else None
+        result = execute_job(reconstructable(pipeline_job), instance=instance, run_config=run_config,
+                             tags=tags, raise_on_error=False, reexecution_options=reexecution)
+        return partition, result.success, result.run_id
+
+
+def resume(run_id, ops_per_run=OPS_PER_RUN) -> bool:
+    """Re-executes a failed run from its failed ops; the ops that succeeded are not run again."""
+    with DagsterInstance.get() as instance:
+        run = instance.get_run_by_id(run_id)
+        if run is None:
+            raise LookupError(f"No run {run_id} in {instance.root_directory}")
+    _, success, new_run_id = run_partition(run.tags.get(PARTITION_TAG), run.tags.get(BACKFILL_TAG, "resume"),
+                                           ops_per_run, resume_from=run_id,
+                                           shared=run.tags.get(SHARED_RUN_TAG) == "true")
+    print(f"{'✅' if success else '❌'} Run {run_id} resumed as {new_run_id}")
+    return success
+
+
+def backfill(start=None, end=None, max_concurrent=MAX_CONCURRENT, ops_per_run=OPS_PER_RUN, force=False) -> dict:
+    """Runs every partition from `start` to `end` (inclusive) that has not succeeded yet."""
+    partitions = partition_range(start, end)
+    with DagsterInstance.get() as instance:
+        done = set() if force else succeeded_partitions(instance, partitions)
+        resumable = {} if force else failed_runs(instance, partitions)
+    pending = [p for p in partitions if p not in done]
+    backfill_id = uuid.uuid4().hex[:8]
+    print(f"▶ Backfill {backfill_id}: {len(partitions)} partitions {partitions[0]} .. {partitions[-1]}, "
+          f"{len(done)} already succeeded, {len(pending)} to run ({len(resumable)} resumed from failure, "
+          f"{max_concurrent} at a time)")
+
+    summary = {"backfill_id": backfill_id, "skipped": sorted(done), "succeeded": [], "failed": []}
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_concurrent) as pool:
+        futures = [pool.submit(run_partition, p, backfill_id, ops_per_run, force, resumable.get(p)) for p in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                partition, success, run_id = future.result()
+            except Exception as e:
+                print(f"❌ [{i}/{len(pending)}] worker failed: {e}")
+                continue
+            summary["succeeded" if success else "failed"].append(partition)
+            print(f"{'✅' if success else '❌'} [{i}/{len(pending)}] {partition} (run {run_id})")
+
+    # Dims, aggregates, models and snapshots once for the whole range, unless no partition got through
+    if summary["succeeded"] or not pending:
+        print(f"▶ Backfill {backfill_id}: running the shared stages once")
+        _, success, run_id = run_partition(None, backfill_id, ops_per_run, force, shared=True)
+        summary["shared"] = {"success": success, "run_id": run_id}
+        print(f"{'✅' if success else '❌'} Shared stages (run {run_id})")
+        if not success:
+            print(f"   Resume them with: python -m dagster_proj.backfill --resume {run_id}")
+
+    summary["seconds"] = round(time.perf_counter() - start_time, 1)
+    print(f"🏁 Backfill {backfill_id} finished in {summary['seconds']}s: {len(summary['succeeded'])} succeeded, "
+          f"{len(summary['failed'])} failed, {len(done)} skipped")
+    if summary["failed"]:
+        print(f"   Failed partitions (rerun the same command to retry): {', '.join(sorted(summary['failed']))}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily partitions of ELT_Pipeline_Job concurrently")
+    parser.add_argument("--start", help="first partition (YYYY-MM-DD), default the first one")
+    parser.add_argument("--end", help="last partition (YYYY-MM-DD, inclusive), default the last one")
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT, help="partitions running at once")
+    parser.add_argument("--ops-per-run", type=int, default=OPS_PER_RUN, help="ops running at once inside a run")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun partitions that already succeeded and every stage inside them")
+    parser.add_argument("--resume", metavar="RUN_ID", help="re-execute one failed run from its failed ops")
+    args = parser.parse_args()
+
+    # Workers import this module by name, not as __main__
+    from dagster_proj import backfill as launcher
+
+    if args.resume:
+        sys.exit(0 if launcher.resume(args.resume, args.ops_per_run) else 1)
+    summary = launcher.backfill(args.start, args.end, args.max_concurrent, args.ops_per_run, args.force)
+    sys.exit(1 if summary["failed"] or not summary.get("shared", {}).get("success", True) else 0)
@@ -1,7 +1,11 @@
 # definitions.py
 from dagster import Definitions
 from dagster_proj.jobs.dagster_elt_pipeline import elt_pipeline_job
+from dagster_proj.jobs.sensors import csv_arrival_sensor
+from dagster_proj.resources import WarehouseResource
 
 defs = Definitions(
-    jobs=[elt_pipeline_job]
+    jobs=[elt_pipeline_job],
+    sensors=[csv_arrival_sensor],
+    resources={"warehouse": WarehouseResource()}
 )
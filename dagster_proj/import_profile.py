@@ -0,0 +1,146 @@
+"""
+Import-time profile of the Dagster code location (or any project module).
+
+    python -m dagster_proj.import_profile                          # dagster_proj.definitions
+    python -m dagster_proj.import_profile dashboard_api.server --top 15
+    python -m dagster_proj.import_profile EDA_ML --path EDA_ML --budget-ms 1500
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter (best
+of `--runs`) and aggregates the per-module lines Python prints:
+
+- by top-level package: self time summed over all its modules, i.e. what
+  importing pandas or great_expectations costs in total;
+- by project module: which of our modules pulls each expensive third-party
+  package in (its nearest project ancestor in the import tree), so a slow
+  start can be traced to the import that should be made lazy.
+
+`--budget-ms` exits non-zero when the total exceeds it, to keep the code
+location (loaded by `dagster dev` and on every reload) from growing slow again.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_TARGET = "dagster_proj.definitions"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def first_party_names(paths=()) -> set:
+    """Top-level names importable from the repo root and `paths`: packages and plain modules."""
+    names = set()
+    for base in [REPO_ROOT] + [Path(p).resolve() for p in paths]:
+        for entry in base.iterdir():
+            if entry.is_dir() and (entry / "__init__.py").exists():
+                names.add(entry.name)
+            elif entry.suffix == ".py":
+                names.add(entry.stem)
+    return names
+
+
+def _import_once(target, paths) -> list:
+    """[(module, self_us, cumulative_us, depth)] in the order -X importtime prints them."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO_ROOT)] + [str(Path(p).resolve()) for p in paths]
+                                        + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                          cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def _owners(rows, first_party) -> dict:
+    """module -> nearest project module above it in the import tree (itself if it is one)."""
+    # Lines are printed children first: a line at depth d adopts the pending lines at depth d + 1.
+    # Rows are tracked by index, a module whose import failed can be printed again later
+    children, pending = {}, defaultdict(list)
+    for i, (_, _, _, depth) in enumerate(rows):
+        children[i] = pending.pop(depth + 1, [])
+        pending[depth].append(i)
+
+    owners = {}
+    stack = [(i, None) for roots in pending.values() for i in roots]
+    while stack:
+        i, owner = stack.pop()
+        module = rows[i][0]
+        if module.split(".")[0] in first_party:
+            owner = module
+        owners.setdefault(module, owner)
+        stack.extend((child, owner) for child in children[i])
+    return owners
+
+
+def profile(target=DEFAULT_TARGET, paths=(), runs=3) -> dict:
+    """Best-of-`runs` import profile of `target`, aggregated by package and by owning project module."""
+    first_party = first_party_names(paths)
+    best = {}
+    rows = []
+    for _ in range(runs):
+        rows = _import_once(target, paths)
+        for module, self_us, _, _ in rows:
+            best[module] = min(best.get(module, self_us), self_us)
+    owners = _owners(rows, first_party)
+
+    packages = defaultdict(lambda: {"self_ms": 0.0, "modules": 0})
+    pulled_in = defaultdict(lambda: defaultdict(float))
+    for module, self_us in best.items():
+        package = module.split(".")[0]
+        packages[package]["self_ms"] += self_us / 1000
+        packages[package]["modules"] += 1
+        if package not in first_party:
+            pulled_in[owners.get(module) or "<interpreter>"][package] += self_us / 1000
+
+    return {
+        "target": target,
+        "total_ms": round(sum(best.values()) / 1000, 1),
+        "modules": len(best),
+        "packages": sorted(({"package": p, "self_ms": round(v["self_ms"], 1), "modules": v["modules"]}
+                            for p, v in packages.items()), key=lambda r: -r["self_ms"]),
+        "pulled_in_by": {owner: dict(sorted(((p, round(ms, 1)) for p, ms in deps.items()), key=lambda r: -r[1]))
+                         for owner, deps in sorted(pulled_in.items(), key=lambda r: -sum(r[1].values()))},
+    }
+
+
+def print_report(report, top=20):
+    print(f"📦 import {report['target']}: {report['total_ms']:.0f} ms, {report['modules']} modules")
+    print(f"\n{'package':<32}{'self ms':>10}{'share':>8}{'modules':>9}")
+    for row in report["packages"][:top]:
+        share = row["self_ms"] / report["total_ms"] if report["total_ms"] else 0
+        print(f"{row['package']:<32}{row['self_ms']:>10.1f}{share:>8.0%}{row['modules']:>9}")
+
+    print("\n🔎 Third-party imports by the project module that pulls them in:")
+    for owner, deps in list(report["pulled_in_by"].items())[:top]:
+        heaviest = ", ".join(f"{p} {ms:.0f} ms" for p, ms in list(deps.items())[:5])
+        print(f"   {owner:<45}{sum(deps.values()):>8.0f} ms  ({heaviest})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregated -X importtime profile of a project module")
+    parser.add_argument("target", nargs="?", default=DEFAULT_TARGET, help="module to import")
+    parser.add_argument("--path", action="append", default=[], help="extra sys.path entry (e.g. EDA_ML)")
+    parser.add_argument("--runs", type=int, default=3, help="imports to run; the fastest time per module is kept")
+    parser.add_argument("--top", type=int, default=20, help="rows per table")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--budget-ms", type=float, help="exit 1 when the total import time exceeds this")
+    args = parser.parse_args()
+
+    report = profile(args.target, args.path, args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.top)
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"❌ Import time {report['total_ms']:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
@@ -0,0 +1,48 @@
+"""
+Entity-scoped (micro-batch) runs of ELT_Pipeline_Job, launched by csv_arrival_sensor.
+
+The sensor (dagster_proj/jobs/sensors.py) tags a run with the tap-csv entities
+whose files changed. Such a run only loads and rebuilds what depends on them:
+
+- Meltano: `TAP_CSV__SELECT` limits tap-csv to those streams (the BigQuery
+  target still overwrites each loaded table with the full file);
+- dbt: the scripts in Dbt_Final narrow every `--select` to the models
+  downstream of those raw tables (`OLIST_CHANGED_SOURCES`, see dbt_selection.py).
+
+Runs without the tag (manual, partitioned, backfills) load everything, as before.
+"""
+import json
+import os
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+MELTANO_PROJECT = REPO_ROOT / "meltano_kaggle_csv"
+LANDING_DIR = Path(os.environ.get("OLIST_LANDING_DIR", MELTANO_PROJECT / "data"))
+ENTITIES_TAG = "olist/entities"
+TRIGGER_TAG = "olist/trigger"
+CHANGED_SOURCES_ENV = "OLIST_CHANGED_SOURCES"
+
+
+def entity_files() -> dict:
+    """CSV file name -> tap-csv entity, from the `files` of tap-csv in meltano.yml."""
+    with open(MELTANO_PROJECT / "meltano.yml") as f:
+        meltano = yaml.safe_load(f)
+    tap = next(p for p in meltano["plugins"]["extractors"] if p["name"] == "tap-csv")
+    return {Path(entry["path"]).name: entry["entity"] for entry in tap["config"]["files"]}
+
+
+def changed_entities(context) -> list:
+    """Entities of a sensor-triggered run; empty for a full run."""
+    return [e for e in context.run.tags.get(ENTITIES_TAG, "").split(",") if e]
+
+
+def arrival_env(context, env: dict = None) -> dict:
+    """`env` (default: os.environ) plus the Meltano / dbt selection of the run's changed entities."""
+    env = dict(os.environ if env is None else env)
+    entities = changed_entities(context)
+    if entities:
+        env["TAP_CSV__SELECT"] = json.dumps([f"{entity}.*" for entity in entities])
+        env[CHANGED_SOURCES_ENV] = ",".join(entities)
+    return env
@@ -1,191 +1,150 @@
 import time
 import random
-from dagster import op, job, OpExecutionContext, Out, In, Nothing
+from dagster import job, OpExecutionContext, In, Nothing, Field
 import os
-import subprocess
+from dagster_proj.jobs.partitions import daily_partitions, partition_key, stage_scope
+from dagster_proj.jobs.policies import RUN_TAGS
+from dagster_proj.jobs.arrivals import changed_entities
+from dagster_proj.jobs.stages import StageRun, meltano_stage_env, script_env, stage_op
 # --- 1. Define Operations (The Tasks) ---
+# Skipping, slots, telemetry and retries are handled by @stage_op (dagster_proj/jobs/stages.py)
 
-@op(name="Meltano_E_and_L")
-def run_meltano_elt(context: OpExecutionContext) -> str:
+@stage_op("Meltano_E_and_L", "staging_tables_ready", env=meltano_stage_env)
+def run_meltano_elt(context: OpExecutionContext, stage: StageRun):
     context.log.info("🚀 [Meltano] Starting extraction from Kaggle...")
+    entities = changed_entities(context)
+    if entities:
+        # Sensor-triggered micro-batch: only the entities whose CSV files changed
+        context.log.info(f"📥 [Meltano] Loading changed entities only: {', '.join(entities)}")
     
-    
-    #shell_command = "meltano run tap-csv target-bigquery"
-    shell_command = "sleep 30"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
-    
-    
+    shell_command = "cd meltano_kaggle_csv/; meltano run tap-csv target-bigquery"
+    # Partitioned runs keep their own Meltano state:
+    shell_command += f" --state-id-suffix={partition_key(context)}" if partition_key(context) else ""
+    stage.run(shell_command)
     
     context.log.info("✅ [Meltano] Data loaded into BigQuery staging_tables.")
-    return "staging_tables_ready"
 
-@op(name="DBT_STG_Build", ins={"start_signal": In(Nothing)})
-def run_dbt_stg_models(context: OpExecutionContext):
+@stage_op("DBT_STG_Build", "staging_models_built", ins={"start_signal": In(Nothing)})
+def run_dbt_stg_models(context: OpExecutionContext, stage: StageRun):
 
     context.log.info("🛠️ [dbt] Building staging models...")
-    shell_command = "cd Dbt_Final/; python dbt_run_stg.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
+    stage.run("cd Dbt_Final/; python dbt_run_stg.py")
     
     context.log.info("✅ [dbt] Staging models built successfully.")
-    return "staging_models_built"
 
-@op(name="DBT_STG_Test", ins={"start_signal": In(Nothing)})
-def run_dbt_stg_tests(context: OpExecutionContext) -> str:
+@stage_op("DBT_STG_Test", "staging_tests_complete", checks="dbt", ins={"start_signal": In(Nothing)})
+def run_dbt_stg_tests(context: OpExecutionContext, stage: StageRun):
 
     #context.log.info(f"Trigger received: {start_signal}")
-    shell_command = "cd Dbt_Final/; python dbt_test_stg.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
+    stage.run("cd Dbt_Final/; python dbt_test_stg.py")
 
     context.log.info("✅ [dbt] Staging tables tested successfully.")
-    return "staging_tests_complete"
 
 
-@op(name="DBT_TFM_Build", ins={"start_signal": In(Nothing)})
-def run_dbt_dim_fact_models(context: OpExecutionContext) -> str:
+@stage_op("DBT_TFM_Build", "dim_fact_tests_complete", ins={"start_signal": In(Nothing)})
+def run_dbt_dim_fact_models(context: OpExecutionContext, stage: StageRun):
 
     #context.log.info(f"Trigger received: {start_signal}")
     context.log.info("🛠️ [dbt] Building Dim & Fact models...")
-    shell_command = "cd Dbt_Final/; python dbt_run_fact.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
-    
-    shell_command = "cd Dbt_Final/; python dbt_run_dim.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
+    # Backfill partitions build only their day of the fact table, the backfill's shared run only the dims
+    scope = stage_scope(context)
+    if scope != "shared":
+        stage.run("cd Dbt_Final/; python dbt_run_fact.py")
+    if scope != "daily":
+        stage.run("cd Dbt_Final/; python dbt_run_dim.py")
+    stage.complete = scope != "shared"
     
     context.log.info("✅ [dbt] Dim & Fact models built successfully.")
-    return "dim_fact_tests_complete"
 
-@op(name="DBT_TFM_Test", ins={"start_signal": In(Nothing)})
-def run_dbt_dim_fact_tests(context: OpExecutionContext) -> str:
+@stage_op("DBT_TFM_Test", "dim_fact_tests_complete", checks="dbt", ins={"start_signal": In(Nothing)})
+def run_dbt_dim_fact_tests(context: OpExecutionContext, stage: StageRun):
 
     #context.log.info(f"Trigger received: {start_signal}")
     context.log.info("🛠️ [dbt] Running schema tests on Dim & Fact tables...")
-    
-    shell_command = "cd Dbt_Final/; python dbt_test_fact.py"
-    
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
-    
-    
-    shell_command = "cd Dbt_Final/; python dbt_test_dim.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
+    scope = stage_scope(context)
+    if scope != "shared":
+        stage.run("cd Dbt_Final/; python dbt_test_fact.py")
+    if scope != "daily":
+        stage.run("cd Dbt_Final/; python dbt_test_dim.py")
+    stage.complete = scope != "shared"
     
     context.log.info("✅ [dbt] Dim & Fact tables tested successfully.")
-    return "dim_fact_tests_complete"
-
-    # Simulate a conditional check (mocking a pass)
-    #if random.choice([True, True, False]): 
-    #    context.log.info("✅ [dbt] All tests passed.")
-    #else:
-        # In a real scenario, you might raise an exception here
-    #    context.log.warning("⚠️ [dbt] Warning: Some tests found data anomalies.")
-    context.log.info("✅ [dbt] All tests passed.")
-    return "tests_complete"
-
-@op(name="GX_Validation", ins={"start_signal": In(Nothing)})
-def run_gx_validation(context: OpExecutionContext):
+
+@stage_op("DBT_AGG_Build", "dashboard_aggregates_ready", checks="dbt", ins={"start_signal": In(Nothing)})
+def run_dbt_agg_models(context: OpExecutionContext, stage: StageRun):
+
+    context.log.info("🛠️ [dbt] Building dashboard aggregate models...")
+    stage.run("cd Dbt_Final/; python dbt_run_agg.py")
+    stage.run("cd Dbt_Final/; python dbt_test_agg.py")
+
+    context.log.info("✅ [dbt] Dashboard aggregates built and tested.")
+
+@stage_op("Dashboard_API_Refresh", "dashboard_api_refreshed", ins={"start_signal": In(Nothing)})
+def refresh_dashboard_api(context: OpExecutionContext, stage: StageRun):
+    """Bumps the dashboard API's data version so it reloads the new aggregates on the next request."""
+    # Imported here, not at module level: dashboard_api pulls in pandas, which the
+    # code location (loaded by the UI and on every reload) does not need
+    from dashboard_api.dashboard_data import write_version_stamp
+
+    version = write_version_stamp(context.run_id)
+    context.log.info(f"🔄 [Dashboard API] Data version set to {version}.")
+
+@stage_op("GX_Validation", "gx_success", env=script_env, checks="gx", ins={"start_signal": In(Nothing)})
+def run_gx_validation(context: OpExecutionContext, stage: StageRun):
     """Simulates Great Expectations data quality checks."""
     context.log.info("🔍 [GX] Running checkpoint 'Data quality Validation'...")
     #os.system("python  ../GX/GX_Validation_Report.py")
     
-    shell_command = "python  GX/GX_Validation_Report.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
+    # On the warm worker (dagster_proj/worker.py) when one is running, else in-process
+    shell_command = "python -m dagster_proj.worker run gx"
+    if partition_key(context):
+        # Only that day's fact rows; suites are defined by unpartitioned (full mode) runs
+        shell_command += " -- --mode validate"
+    stage.run(shell_command)
     
     context.log.info("✅ [GX] Data quality validation passed.")
-    return "gx_success"
 
-@op(name="EDA_ML_Analysis",  ins={"start_signal": In(Nothing)})
-def generate_eda_report(context: OpExecutionContext):
+@stage_op("GX_Data_Docs", "gx_docs_ready", env=script_env, ins={"start_signal": In(Nothing)},
+          config_schema={"enabled": Field(bool, default_value=True, description="Render new validation results into Data Docs")})
+def build_gx_data_docs(context: OpExecutionContext, stage: StageRun):
+    """Renders only the new validation results into the GX Data Docs site (off the critical path)."""
+    context.log.info("📄 [GX] Rendering new validation results into Data Docs...")
+    stage.run("python -m dagster_proj.worker run gx -- --mode docs")
+
+    context.log.info("✅ [GX] Data Docs updated.")
+
+@stage_op("EDA_ML_Analysis", "eda_ready", env=script_env, ins={"start_signal": In(Nothing)})
+def generate_eda_report(context: OpExecutionContext, stage: StageRun):
     """Simulates generating an EDA report."""
     context.log.info("📊 [EDA] Analyzing data distributions...")
     #time.sleep(1)
     #os.system("python  EDA_ML/EDA_ML.py")
 
-    shell_command = "python  EDA_ML/EDA_ML.py"
-    result = subprocess.run(
-            shell_command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-    # Log the output to Dagster's structured logging system
-    for line in result.stdout.splitlines():
-        context.log.info(line)
+    # On the warm worker (dagster_proj/worker.py) when one is running, else in-process
+    stage.run("python -m dagster_proj.worker run eda")
 
     context.log.info("✅ [EDA] Report generated at /tmp/eda_report.html")
-    return "eda_ready"
+
+@stage_op("Freight_Scoring", "freight_scores_ready", env=script_env, ins={"start_signal": In(Nothing)})
+def run_freight_scoring(context: OpExecutionContext, stage: StageRun):
+    """Scores every customer in the feature store with the latest registered freight model."""
+    context.log.info("🚚 [ML] Batch scoring freight estimates...")
+    stage.run("python  EDA_ML/batch_scoring.py score")
+
+    context.log.info("✅ [ML] Freight scores written to EDA_ML/.cache/scores/freight_scores.parquet")
+
+@stage_op("Dashboard_Snapshot", "dashboard_snapshot_ready", ins={"start_signal": In(Nothing)})
+def export_dashboard_snapshot(context: OpExecutionContext, stage: StageRun):
+    """Writes the dashboard series as static, versioned JSON files for GitHub Pages."""
+    from dashboard_api.snapshot import export_snapshot
+
+    context.log.info("📸 [Dashboard] Exporting static snapshot of the dashboard series...")
+    manifest = export_snapshot(stage.pool)
+    stage.telemetry.record(bytes_written=sum(entry["bytes"] for entry in manifest["tabs"].values()))
+    for tab, entry in manifest["tabs"].items():
+        context.log.info(f"{entry['path']}: {len(entry['series'])} series, {entry['bytes']} bytes")
+
+    context.log.info(f"✅ [Dashboard] Snapshot {manifest['version']} written to dashboard_data/.")
 """
 @op(name="Notification",  ins={"gx_signal": In(str), "eda_signal": In(str)})
 def send_notification(context: OpExecutionContext, gx_signal: str, eda_signal: str):
@@ -195,7 +154,7 @@ def send_notification(context: OpExecutionContext, gx_signal: str, eda_signal: s
 """
 # --- 2. Define the Job (The Workflow) ---
 
-@job(name="ELT_Pipeline_Job")
+@job(name="ELT_Pipeline_Job", partitions_def=daily_partitions, tags=RUN_TAGS)
 def elt_pipeline_job():
     # Step 1: Extract & Load
     raw_data = run_meltano_elt()
@@ -213,6 +172,19 @@ def elt_pipeline_job():
     # Step 4: Run GX and EDA in parallel (both wait for models to finish)
     gx_result = run_gx_validation(dim_fact_tests_done)
     eda_result = generate_eda_report(dim_fact_tests_done)
+
+    # Batch scoring with the model registered by the EDA/ML step
+    run_freight_scoring(eda_result)
+
+    # Optional: render Data Docs after validation, nothing downstream waits on it
+    build_gx_data_docs(gx_result)
+
+    # Dashboard aggregates for index.html (only need the tested dim & fact tables)
+    dashboard_aggregates = run_dbt_agg_models(dim_fact_tests_done)
+    refresh_dashboard_api(dashboard_aggregates)
+
+    # Final stage: static dashboard data (after EDA, once the aggregates exist)
+    export_dashboard_snapshot([eda_result, dashboard_aggregates])
     
     # Step 5: Notify (waits for BOTH GX and EDA to finish)
     #send_notification(gx_result, eda_result)
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Skip-if-unchanged fingerprints for the stages of ELT_Pipeline_Job.
+
+Every op declares what it depends on in `STAGES`:
+
+- `paths`: files whose content defines the stage (source CSVs, model SQL and
+  YAML, the GX script that builds the expectation suite, the Python it runs);
+- `tables`: warehouse tables it reads, by their metadata version stamp
+  (`WarehousePool.table_version`, no scan);
+- `upstream`: stages whose fingerprints are chained into its own, so a change
+  anywhere upstream invalidates everything below it.
+
+A stage whose fingerprint equals the one recorded at its last success is
+skipped: its outputs (tables, reports, files) from that run are still current.
+File hashes are cached by size and mtime, so a no-op run only stats files and
+reads table metadata. Tag a run with `olist/force=true` to run every stage.
+
+Daily partitioned runs keep one record per stage and partition, so a backfill
+skips the days whose stages already succeeded with the current inputs.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dagster_proj.jobs.partitions import partition_key
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+STATE_DIR = Path(os.environ.get("OLIST_FINGERPRINT_DIR", REPO_ROOT / "dagster_proj" / ".state" / "fingerprints"))
+FORCE_TAG = "olist/force"
+
+DBT_PROJECT = ["Dbt_Final/dbt_project.yml", "Dbt_Final/profiles.yml", "Dbt_Final/dbt_selection.py"]
+RAW = ["olist_customers", "olist_orders", "olist_order_items", "olist_order_payments",
+       "olist_products", "olist_sellers", "product_category_name_translation"]
+STAGING = ["stg_db_customers", "stg_db_orders", "stg_db_order_items", "stg_db_order_payments",
+           "stg_db_products", "stg_db_sellers", "stg_db_product_category_name_translation"]
+MARTS = ["fact_db_order_items", "dim_db_customers", "dim_db_sellers", "dim_db_products", "dim_db_dates"]
+
+STAGES = {
+    "Meltano_E_and_L": {
+        "paths": ["meltano_kaggle_csv/meltano.yml", "meltano_kaggle_csv/data/*.csv"],
+    },
+    "DBT_STG_Build": {
+        "paths": DBT_PROJECT + ["Dbt_Final/staging/*.sql", "Dbt_Final/staging/sources.yml", "Dbt_Final/dbt_run_stg.py"],
+        "upstream": ["Meltano_E_and_L"],
+        "tables": RAW,
+    },
+    "DBT_STG_Test": {
+        "paths": DBT_PROJECT + ["Dbt_Final/staging/*.yml", "Dbt_Final/dbt_test_stg.py"],
+        "upstream": ["DBT_STG_Build"],
+        "tables": STAGING,
+    },
+    "DBT_TFM_Build": {
+        "paths": DBT_PROJECT + ["Dbt_Final/marts/dim/*.sql", "Dbt_Final/marts/fact/*.sql",
+                                "Dbt_Final/dbt_run_fact.py", "Dbt_Final/dbt_run_dim.py"],
+        "upstream": ["DBT_STG_Test"],
+    },
+    "DBT_TFM_Test": {
+        "paths": DBT_PROJECT + ["Dbt_Final/marts/dim/*.yml", "Dbt_Final/marts/fact/*.yml",
+                                "Dbt_Final/dbt_test_fact.py", "Dbt_Final/dbt_test_dim.py"],
+        "upstream": ["DBT_TFM_Build"],
+        "tables": MARTS,
+    },
+    "DBT_AGG_Build": {
+        "paths": DBT_PROJECT + ["Dbt_Final/marts/agg/*", "Dbt_Final/dbt_run_agg.py", "Dbt_Final/dbt_test_agg.py"],
+        "upstream": ["DBT_TFM_Test"],
+        "tables": MARTS,
+    },
+    "Dashboard_API_Refresh": {
+        "upstream": ["DBT_AGG_Build"],
+        "tables": ["agg_dashboard_series"],
+    },
+    "GX_Validation": {
+        # The expectation suite is defined in the script itself
+        "paths": ["GX/GX_Validation_Report.py"],
+        "upstream": ["DBT_TFM_Test"],
+        "tables": ["fact_db_order_items"],
+    },
+    "GX_Data_Docs": {
+        "paths": ["GX/GX_Validation_Report.py"],
+        "upstream": ["GX_Validation"],
+    },
+    "EDA_ML_Analysis": {
+        "paths": ["EDA_ML/*.py"],
+        "upstream": ["DBT_TFM_Test"],
+        "tables": MARTS + ["olist_geolocation"],
+    },
+    "Freight_Scoring": {
+        "paths": ["EDA_ML/batch_scoring.py", "EDA_ML/freight_features.py", "EDA_ML/model_registry.py"],
+        "upstream": ["EDA_ML_Analysis"],
+    },
+    "Dashboard_Snapshot": {
+        "paths": ["dashboard_api/dashboard_data.py", "dashboard_api/snapshot.py"],
+        "upstream": ["EDA_ML_Analysis", "DBT_AGG_Build"],
+        "tables": ["agg_dashboard_series"],
+    },
+}
+
+
+# One file per stage, so ops finishing in parallel processes never overwrite each
+# other's record; the shared file-hash cache is best effort (a lost update only
+# means a file is hashed again)
+def _read_json(path: Path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path: Path, obj):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _state_path(stage, partition=None, state_dir=STATE_DIR) -> Path:
+    name = f"{stage}@{partition}" if partition else stage
+    return Path(state_dir) / "stages" / f"{name}.json"
+
+
+def last_success(stage, partition=None, state_dir=STATE_DIR):
+    return _read_json(_state_path(stage, partition, state_dir), None)
+
+
+def _file_hash(path: Path, cache: dict) -> str:
+    """sha1 of the file content, reused from `cache` while size and mtime are unchanged."""
+    stat = path.stat()
+    key = str(path.relative_to(REPO_ROOT))
+    cached = cache.get(key)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["sha1"]
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    cache[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+    return cache[key]["sha1"]
+
+
+def stage_fingerprint(stage, warehouse=None, file_cache=None, _memo=None) -> str:
+    """Fingerprint of the stage's files, table versions and (recursively) upstream stages."""
+    _memo = {} if _memo is None else _memo
+    if stage in _memo:
+        return _memo[stage]
+    spec = STAGES[stage]
+    file_cache = {} if file_cache is None else file_cache
+
+    parts = {"files": {}, "tables": {}, "upstream": {}}
+    for pattern in spec.get("paths", []):
+        for path in sorted(REPO_ROOT.glob(pattern)):
+            if path.is_file():
+                parts["files"][str(path.relative_to(REPO_ROOT))] = _file_hash(path, file_cache)
+    if warehouse is not None:
+        for table in spec.get("tables", []):
+            parts["tables"][table] = warehouse.table_version(table)
+    for upstream in spec.get("upstream", []):
+        parts["upstream"][upstream] = stage_fingerprint(upstream, warehouse, file_cache, _memo)
+
+    _memo[stage] = hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return _memo[stage]
+
+
+class StageCheck:
+    """Result of `check_stage`: skip the op when `unchanged`, else call `record_success()` at its end."""
+
+    def __init__(self, context, stage, fingerprint, previous, partition=None):
+        self.context = context
+        self.stage = stage
+        self.partition = partition
+        self.fingerprint = fingerprint
+        self.previous = previous
+        self.unchanged = previous is not None and previous["fingerprint"] == fingerprint
+
+    def record_success(self):
+        _write_json(_state_path(self.stage, self.partition), {
+            "fingerprint": self.fingerprint,
+            "run_id": self.context.run_id,
+            "succeeded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+
+
+def check_stage(context, warehouse=None) -> StageCheck:
+    """
+    Fingerprints the op's inputs and compares them with its last success.
+
+        check = check_stage(context, warehouse.get_pool())
+        if check.unchanged:
+            return "..."
+        ...
+        check.record_success()
+    """
+    stage = context.op_def.name
+    cache_path = STATE_DIR / "file_hashes.json"
+    file_cache = _read_json(cache_path, {})
+    cached = dict(file_cache)
+    fingerprint = stage_fingerprint(stage, warehouse, file_cache)
+    if file_cache != cached:
+        _write_json(cache_path, file_cache)
+
+    partition = partition_key(context)
+    previous = last_success(stage, partition)
+    if context.run.tags.get(FORCE_TAG, "").lower() == "true":
+        previous = None
+
+    check = StageCheck(context, stage, fingerprint, previous, partition)
+    if check.unchanged:
+        context.log.info(f"⏭️ [{stage}] Inputs unchanged since run {previous['run_id']} "
+                         f"({previous['succeeded_at']}); reusing its outputs.")
+        context.add_output_metadata({"skipped": True, "fingerprint": fingerprint,
+                                     "reused_run_id": previous["run_id"]})
+    return check
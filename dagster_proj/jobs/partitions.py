@@ -0,0 +1,108 @@
+"""
+Daily partitions of ELT_Pipeline_Job, keyed by order purchase date.
+
+A partitioned run hands its day to every stage as `OLIST_PARTITION_DATE`:
+
+- Meltano: a tap-csv stream map keeps only that day's olist_orders rows and the
+  BigQuery target upserts them instead of overwriting the table;
+- dbt: the fact scripts pass `--vars {"partition_date": ...}`, so
+  fact_db_order_items replaces only that day (incremental insert_overwrite on
+  `order_date_key`) and its tests only read that day;
+- GX: fact_db_order_items is validated through a daily batch definition;
+- EDA/ML: tables, aggregates and features are read as of the end of that day.
+
+Every partition writes dbt artifacts to its own target path, so partitions can
+run side by side (see dagster_proj/backfill.py). Runs without a partition key
+rebuild everything, as before.
+
+The partitions of a backfill only do their day's work. Meltano loads only
+olist_orders, and only the fact model is built and tested. `SHARED_STAGES`
+rebuild whole tables or shared files: the dimensions, aggregates, models,
+feature and dashboard snapshots. Concurrent partitions would run them at the
+same time, so they are skipped there. The backfill runs them once, in one
+unpartitioned run tagged `olist/shared-stages` after the partitions. That run
+skips `DAILY_STAGES` and builds and tests only the dimensions. A backfill
+launched from the Dagster UI has no such run: launch the job once without a
+partition afterwards.
+"""
+import json
+import os
+from pathlib import Path
+
+from dagster import DailyPartitionsDefinition
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PARTITION_ENV = "OLIST_PARTITION_DATE"
+# Olist orders were purchased between 2016-09-04 and 2018-10-17
+START_DATE = "2016-09-01"
+END_DATE = "2018-11-01"
+
+daily_partitions = DailyPartitionsDefinition(start_date=START_DATE, end_date=END_DATE)
+
+BACKFILL_TAG = "olist/backfill"
+BACKFILL_TAGS = (BACKFILL_TAG, "dagster/backfill")
+SHARED_RUN_TAG = "olist/shared-stages"
+# Whole-table / shared-file stages: skipped by the partitions of a backfill, run once after them
+SHARED_STAGES = ["DBT_STG_Build", "DBT_AGG_Build", "Dashboard_API_Refresh", "GX_Data_Docs",
+                 "EDA_ML_Analysis", "Freight_Scoring", "Dashboard_Snapshot"]
+# Per-day stages: skipped by that shared run
+DAILY_STAGES = ["Meltano_E_and_L", "GX_Validation"]
+
+
+def partition_key(context):
+    return context.partition_key if context.has_partition_key else None
+
+
+def stage_scope(context) -> str:
+    """'daily' in a partition of a backfill, 'shared' in the backfill's shared run, else 'all'."""
+    tags = context.run.tags
+    if partition_key(context) and any(tag in tags for tag in BACKFILL_TAGS):
+        return "daily"
+    if tags.get(SHARED_RUN_TAG, "").lower() == "true":
+        return "shared"
+    return "all"
+
+
+def skip_stage(context) -> bool:
+    """True (and logged) when the running op is out of the run's scope (see `stage_scope`)."""
+    scope, stage = stage_scope(context), context.op_def.name
+    if scope == "daily" and stage in SHARED_STAGES:
+        context.log.info(f"⏭️ [{stage}] Shared stage: runs once after the backfill, not per partition.")
+        return True
+    if scope == "shared" and stage in DAILY_STAGES:
+        context.log.info(f"⏭️ [{stage}] Per-day stage: already run by the backfill's partitions.")
+        return True
+    return False
+
+
+def dbt_target_path(partition=None) -> Path:
+    """dbt's target directory: the project default, or one per partition."""
+    target = REPO_ROOT / "Dbt_Final" / "target"
+    return target / "partitions" / partition if partition else target
+
+
+def partition_env(context, env: dict = None) -> dict:
+    """`env` (default: os.environ) plus the run's partition day, for child processes."""
+    env = dict(os.environ if env is None else env)
+    partition = partition_key(context)
+    if partition:
+        env[PARTITION_ENV] = partition
+        env["DBT_TARGET_PATH"] = str(dbt_target_path(partition))
+    return env
+
+
+def meltano_env(context, env: dict = None) -> dict:
+    """`partition_env` plus the tap-csv / target-bigquery settings that load a single day."""
+    env = partition_env(context, env)
+    partition = env.get(PARTITION_ENV)
+    if partition and stage_scope(context) == "daily":
+        # The other tables are the same for every day; concurrent partitions must not upsert them
+        env["TAP_CSV__SELECT"] = json.dumps(["olist_orders.*"])
+    if partition:
+        # tap-csv has no row filter of its own; SDK stream maps drop the other days
+        env["TAP_CSV_STREAM_MAPS"] = json.dumps({
+            "olist_orders": {"__filter__": f"order_purchase_timestamp.startswith('{partition}')"},
+        })
+        env["TARGET_BIGQUERY_OVERWRITE"] = "false"
+        env["TARGET_BIGQUERY_UPSERT"] = "true"
+    return env
@@ -0,0 +1,113 @@
+"""
+Retry and timeout policies for the ops of ELT_Pipeline_Job.
+
+- `RETRY_POLICIES`: Dagster retries a failed op in the same run, after an
+  exponentially growing, jittered delay. Only the failed op is retried, and
+  ops downstream wait for it. Warehouse-bound ops (dbt, GX, EDA) get more
+  attempts than the Meltano load, which is slow and whose failures (source
+  files, credentials) rarely go away by themselves.
+- `TIMEOUTS`: seconds one command of the op may run before `run_command`
+  kills its process group and fails the attempt, which is then retried like
+  any other failure. An op also waits at most this long for its resource
+  slots (scheduling.py). `OLIST_TIMEOUT_SCALE` multiplies all of them, e.g. for a
+  slower warehouse.
+- `RUN_TAGS`: run-level retries from the failed op, picked up by the Dagster
+  daemon when `run_retries` is enabled in dagster.yaml. Re-execution from
+  failure (also in the UI, and in dagster_proj/backfill.py) skips the ops that
+  already succeeded; their outputs are the warehouse tables and files they
+  wrote, which are reused as they are.
+- `deterministic_failures`: failed data checks - GX expectations (exit code
+  `VALIDATION_FAILED_EXIT`) and dbt tests with status `fail` - fail the op
+  with `Failure(allow_retries=False)` and turn off the run retry, since the
+  same data fails the same way again. Warehouse, network and other errors
+  keep the retries above.
+"""
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+
+from dagster import Backoff, Failure, Jitter, RetryPolicy
+
+from dagster_proj.jobs.partitions import dbt_target_path, partition_key
+from dagster_proj.jobs.telemetry import read_dbt_run_results
+
+TIMEOUT_SCALE = float(os.environ.get("OLIST_TIMEOUT_SCALE", 1.0))
+
+
+def _retry(max_retries, delay):
+    return RetryPolicy(max_retries=max_retries, delay=delay, backoff=Backoff.EXPONENTIAL, jitter=Jitter.PLUS_MINUS)
+
+
+RETRY_POLICIES = {
+    "Meltano_E_and_L": _retry(1, 60),
+    "DBT_STG_Build": _retry(2, 30),
+    "DBT_STG_Test": _retry(2, 15),
+    "DBT_TFM_Build": _retry(2, 30),
+    "DBT_TFM_Test": _retry(2, 15),
+    "DBT_AGG_Build": _retry(2, 30),
+    "Dashboard_API_Refresh": _retry(3, 5),
+    "GX_Validation": _retry(3, 20),
+    "GX_Data_Docs": _retry(2, 10),
+    "EDA_ML_Analysis": _retry(3, 20),
+    "Freight_Scoring": _retry(3, 10),
+    "Dashboard_Snapshot": _retry(3, 10),
+}
+
+TIMEOUTS = {
+    "Meltano_E_and_L": 3600,
+    "DBT_STG_Build": 900,
+    "DBT_STG_Test": 900,
+    "DBT_TFM_Build": 1800,
+    "DBT_TFM_Test": 900,
+    "DBT_AGG_Build": 900,
+    "Dashboard_API_Refresh": 300,
+    "GX_Validation": 1800,
+    "GX_Data_Docs": 600,
+    "EDA_ML_Analysis": 3600,
+    "Freight_Scoring": 900,
+    "Dashboard_Snapshot": 600,
+}
+
+RUN_TAGS = {
+    "dagster/max_retries": "1",
+    "dagster/retry_strategy": "FROM_FAILURE",
+}
+# Set on a run whose op failed a data check, so the daemon does not retry it
+NO_RUN_RETRY_TAG = "dagster/retry_on_asset_or_op_failure"
+# Exit code of GX/GX_Validation_Report.py when expectations failed (errors exit with 1)
+VALIDATION_FAILED_EXIT = 3
+
+
+def op_timeout(context) -> float:
+    """Timeout in seconds for one command of the running op."""
+    return TIMEOUTS[context.op_def.name] * TIMEOUT_SCALE
+
+
+def _no_retries(context, description) -> Failure:
+    context.instance.add_run_tags(context.run_id, {NO_RUN_RETRY_TAG: "false"})
+    context.log.error(f"🛑 [{context.op_def.name}] {description}; not retried.")
+    return Failure(description=description, allow_retries=False)
+
+
+@contextmanager
+def deterministic_failures(context, dbt=False):
+    """
+    Turns failed data checks of the enclosed commands into non-retried failures.
+
+    A command exiting with `VALIDATION_FAILED_EXIT` failed its GX expectations; with
+    `dbt`, a failed command whose run_results.json has tests with status `fail` failed
+    its dbt tests. Any other error is re-raised for the op's retry policy.
+    """
+    started = time.time()
+    try:
+        yield
+    except subprocess.CalledProcessError as e:
+        if e.returncode == VALIDATION_FAILED_EXIT:
+            raise _no_retries(context, "Data quality validation failed") from e
+        if dbt:
+            run_results = dbt_target_path(partition_key(context)) / "run_results.json"
+            failed = [r["node"] for r in read_dbt_run_results(started, run_results) if r["status"] == "fail"]
+            if failed:
+                raise _no_retries(context, f"{len(failed)} dbt tests failed: {', '.join(failed)}") from e
+        raise
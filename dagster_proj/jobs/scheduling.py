@@ -0,0 +1,286 @@
+"""
+Resource-aware scheduling for the ops of ELT_Pipeline_Job.
+
+Once DBT_TFM_Test has passed, GX validation, EDA/ML training and the dashboard
+aggregates can all run. The multiprocess executor starts them together
+without knowing what they use: XGBoost with `n_jobs=-1` takes every core,
+while GX and dbt compete with it for the same CPUs and warehouse.
+
+Each op declares its needs in `OP_RESOURCES`:
+
+- `cpu`: the cores it keeps busy. The multi-threaded ML ops use `None`;
+  they get whatever the ops that can run next to them leave free
+  (`op_threads`);
+- `memory_gb`: its peak resident memory;
+- `warehouse`: the warehouse connections it opens (for dbt, `threads` in
+  profiles.yml);
+- `estimate_s`: its duration, used until the run history has one.
+
+Three per-host budgets bound these needs:
+
+| Budget | Env var | Default |
+|---|---|---|
+| CPU slots | `OLIST_CPU_SLOTS` | the host's cores |
+| Memory | `OLIST_MEMORY_BUDGET_GB` | 75% of RAM |
+| Warehouse connections | `OLIST_WAREHOUSE_SLOTS` | 8 |
+
+They are used in three ways:
+
+- priority: each op is tagged `dagster/priority` with its critical-path
+  rank. The rank is the op's estimated duration plus the longest chain of
+  estimates below it, with median durations taken from past runs
+  (run_history.stage_estimates). When several ops are runnable, the executor
+  starts first the one the end of the run depends on;
+- admission: before doing any work, an op leases its slots
+  (`resource_slots`). A slot is a lock file under OLIST_SLOT_DIR: one per CPU
+  slot, per half GB and per connection. An op takes all the slots it needs or
+  none, and fails with `SlotTimeout` (retried like any other failure) when
+  they stay taken for longer than its command timeout. Concurrent runs
+  (backfills) therefore share the same budgets, and the locks of a crashed op
+  go away with its process. On the DuckDB backend an
+  op also locks the database file: exclusively for the ops in
+  `WAREHOUSE_WRITERS`, shared for the other ops that query it;
+- threads: `slot_env` passes the op's CPU share to its command, as
+  `OLIST_OP_THREADS` and the OpenMP / BLAS thread variables. XGBoost uses it
+  as `n_jobs` instead of every core. The warm worker's forked children
+  (dagster_proj/worker.py) already loaded their BLAS / OpenMP libraries, so
+  they apply the same count with threadpoolctl.
+
+The op DAG comes from the `upstream` declarations in fingerprints.STAGES,
+which mirror the job's dependencies. Priorities are computed when the code
+location loads, so a reload picks up newer estimates.
+"""
+import fcntl
+import itertools
+import math
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from dagster_proj.jobs.fingerprints import STAGES
+from dagster_proj.jobs.policies import op_timeout
+from dagster_proj.resources.warehouse import ENV_POOL_SIZE
+from dagster_proj.run_history import stage_estimates
+
+_RAM_GB = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 ** 30
+CPU_SLOTS = int(os.environ.get("OLIST_CPU_SLOTS", os.cpu_count() or 1))
+MEMORY_BUDGET_GB = float(os.environ.get("OLIST_MEMORY_BUDGET_GB", round(0.75 * _RAM_GB, 1)))
+WAREHOUSE_SLOTS = int(os.environ.get("OLIST_WAREHOUSE_SLOTS", 8))
+MEMORY_UNIT_GB = 0.5
+SLOT_DIR = Path(os.environ.get("OLIST_SLOT_DIR", Path(tempfile.gettempdir()) / f"olist-slots-{os.getuid()}"))
+POLL_SECONDS = float(os.environ.get("OLIST_SLOT_POLL_SECONDS", 2))
+THREADS_ENV = "OLIST_OP_THREADS"
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+OP_RESOURCES = {
+    "Meltano_E_and_L": {"cpu": 1, "memory_gb": 1, "warehouse": 1, "estimate_s": 600},
+    "DBT_STG_Build": {"cpu": 1, "memory_gb": 0.5, "warehouse": 4, "estimate_s": 120},
+    "DBT_STG_Test": {"cpu": 1, "memory_gb": 0.5, "warehouse": 4, "estimate_s": 60},
+    "DBT_TFM_Build": {"cpu": 1, "memory_gb": 0.5, "warehouse": 4, "estimate_s": 180},
+    "DBT_TFM_Test": {"cpu": 1, "memory_gb": 0.5, "warehouse": 4, "estimate_s": 60},
+    "DBT_AGG_Build": {"cpu": 1, "memory_gb": 0.5, "warehouse": 4, "estimate_s": 120},
+    "Dashboard_API_Refresh": {"cpu": 1, "memory_gb": 0.5, "warehouse": 1, "estimate_s": 5},
+    "GX_Validation": {"cpu": 1, "memory_gb": 2, "warehouse": 1, "estimate_s": 300},
+    "GX_Data_Docs": {"cpu": 1, "memory_gb": 1, "warehouse": 0, "estimate_s": 60},
+    "EDA_ML_Analysis": {"cpu": None, "memory_gb": 4, "warehouse": 2, "estimate_s": 600},
+    "Freight_Scoring": {"cpu": None, "memory_gb": 2, "warehouse": 0, "estimate_s": 60},
+    "Dashboard_Snapshot": {"cpu": 1, "memory_gb": 0.5, "warehouse": 1, "estimate_s": 10},
+}
+# Ops that open the warehouse read-write (dbt, GX and its sample tables). On the DuckDB
+# stand-in, which allows one writing process or several reading ones, they hold the
+# database file exclusively; the other ops that use the warehouse share it
+WAREHOUSE_WRITERS = {"Meltano_E_and_L", "DBT_STG_Build", "DBT_STG_Test", "DBT_TFM_Build", "DBT_TFM_Test",
+                     "DBT_AGG_Build", "GX_Validation", "GX_Data_Docs"}
+BUDGETS = {
+    "cpu": CPU_SLOTS,
+    "memory": max(1, int(MEMORY_BUDGET_GB / MEMORY_UNIT_GB)),
+    "warehouse": WAREHOUSE_SLOTS,
+}
+
+
+class SlotTimeout(TimeoutError):
+    """Raised by `resource_slots` when an op's slots stay taken for longer than its timeout."""
+
+
+@lru_cache(maxsize=None)
+def _ancestors(op) -> frozenset:
+    found, stack = set(), list(STAGES[op].get("upstream", []))
+    while stack:
+        upstream = stack.pop()
+        if upstream not in found:
+            found.add(upstream)
+            stack.extend(STAGES[upstream].get("upstream", []))
+    return frozenset(found)
+
+
+def _independent(a, b) -> bool:
+    return a not in _ancestors(b) and b not in _ancestors(a)
+
+
+def parallel_ops(op) -> list:
+    """Ops that can run at the same time as `op`: neither above nor below it."""
+    return [other for other in OP_RESOURCES if other != op and _independent(op, other)]
+
+
+def _max_parallel(ops, demand) -> float:
+    """Largest total `demand` of `ops` that can run at the same time (all subsets, the DAG is small)."""
+    best = 0
+    for size in range(1, len(ops) + 1):
+        for group in itertools.combinations(ops, size):
+            if all(_independent(a, b) for a, b in itertools.combinations(group, 2)):
+                best = max(best, sum(demand(op) for op in group))
+    return best
+
+
+@lru_cache(maxsize=None)
+def op_threads(op) -> int:
+    """Cores `op` may use: its declared `cpu`, or for ML ops what the ops running next to it leave free."""
+    cpu = OP_RESOURCES[op]["cpu"]
+    if cpu is not None:
+        return cpu
+    # Flexible ops are not expected to overlap each other; their leases serialise them if they do
+    fixed = [other for other in parallel_ops(op) if OP_RESOURCES[other]["cpu"] is not None]
+    return max(1, CPU_SLOTS - _max_parallel(fixed, lambda other: OP_RESOURCES[other]["cpu"]))
+
+
+def duration_estimates() -> dict:
+    """op -> expected seconds: median of its past successful runs in DAGSTER_HOME, else `estimate_s`."""
+    estimates = {op: spec["estimate_s"] for op, spec in OP_RESOURCES.items()}
+    try:
+        history = stage_estimates()
+    except sqlite3.Error as e:
+        print(f"⚠️ [Scheduler] Run history not readable, using default estimates: {e}")
+        history = {}
+    estimates.update({op: seconds for op, seconds in history.items() if op in estimates})
+    return estimates
+
+
+def critical_path_ranks(estimates) -> dict:
+    """op -> its estimate plus the longest chain of estimates below it, in seconds."""
+    downstream = {op: [other for other in OP_RESOURCES if op in STAGES[other].get("upstream", [])]
+                  for op in OP_RESOURCES}
+    ranks = {}
+
+    def rank(op):
+        if op not in ranks:
+            ranks[op] = estimates[op] + max((rank(below) for below in downstream[op]), default=0)
+        return ranks[op]
+
+    for op in OP_RESOURCES:
+        rank(op)
+    return ranks
+
+
+PRIORITIES = {op: int(round(rank)) for op, rank in critical_path_ranks(duration_estimates()).items()}
+
+
+def op_tags(op) -> dict:
+    """Tags of `op`: its executor priority and the resources it leases (shown in the UI)."""
+    spec = OP_RESOURCES[op]
+    return {
+        "dagster/priority": str(PRIORITIES[op]),
+        "olist/cpu": str(op_threads(op)),
+        "olist/memory_gb": str(spec["memory_gb"]),
+        "olist/warehouse": str(spec["warehouse"]),
+    }
+
+
+def slot_demand(op) -> dict:
+    """Slots `op` leases per resource, capped at the budget so an oversized op can still run alone."""
+    spec = OP_RESOURCES[op]
+    demand = {
+        "cpu": op_threads(op),
+        "memory": math.ceil(spec["memory_gb"] / MEMORY_UNIT_GB),
+        "warehouse": spec["warehouse"],
+    }
+    return {resource: min(count, BUDGETS[resource]) for resource, count in demand.items()}
+
+
+def duckdb_lock(context):
+    """(lock path, exclusive) for the running op on the DuckDB backend, else None."""
+    warehouse = getattr(context.resources, "warehouse", None)
+    op = context.op_def.name
+    if warehouse is None or warehouse.backend != "duckdb":
+        return None
+    if op in WAREHOUSE_WRITERS:
+        return warehouse.get_pool().duckdb_lock_path, True
+    if OP_RESOURCES[op]["warehouse"]:
+        return warehouse.get_pool().duckdb_lock_path, False
+    return None
+
+
+def _try_lease(demand, file_lock=None) -> list:
+    """Locked slot files covering all of `demand`, or None (holding nothing) when a resource is short."""
+    held = []
+    if file_lock is not None:
+        path, exclusive = file_lock
+        f = open(path, "a")
+        try:
+            fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return None
+        held.append(f)
+    for resource, count in demand.items():
+        taken = 0
+        for i in range(BUDGETS[resource]):
+            if taken == count:
+                break
+            f = open(SLOT_DIR / f"{resource}-{i}.lock", "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                continue
+            held.append(f)
+            taken += 1
+        if taken < count:
+            for f in held:
+                f.close()
+            return None
+    return held
+
+
+@contextmanager
+def resource_slots(context):
+    """Waits (at most the op's timeout) for, then holds, the running op's CPU, memory and warehouse slots."""
+    demand = slot_demand(context.op_def.name)
+    file_lock = duckdb_lock(context)
+    SLOT_DIR.mkdir(parents=True, exist_ok=True)
+    start = time.monotonic()
+    held = _try_lease(demand, file_lock)
+    if held is None:
+        timeout = op_timeout(context)
+        context.log.info(f"⏳ [Scheduler] Waiting for {demand['cpu']} CPU slots, "
+                         f"{demand['memory'] * MEMORY_UNIT_GB:g} GB and {demand['warehouse']} warehouse connections...")
+        while held is None:
+            waited = time.monotonic() - start
+            if waited >= timeout:
+                context.log.error(f"⏰ [Scheduler] Slots still taken after {waited:.0f}s")
+                raise SlotTimeout(f"{context.op_def.name}: slots {demand} not free within {timeout:.0f}s")
+            time.sleep(min(POLL_SECONDS, timeout - waited))
+            held = _try_lease(demand, file_lock)
+        context.log.info(f"▶ [Scheduler] Slots acquired after {time.monotonic() - start:.1f}s")
+    try:
+        yield demand
+    finally:
+        for f in held:
+            f.close()
+
+
+def slot_env(context, env: dict = None) -> dict:
+    """`env` (default: os.environ) plus the running op's thread count and connection limit."""
+    env = dict(os.environ if env is None else env)
+    op = context.op_def.name
+    threads = str(op_threads(op))
+    env[THREADS_ENV] = threads
+    for name in THREAD_VARIABLES:
+        env[name] = threads
+    warehouse = OP_RESOURCES[op]["warehouse"]
+    if warehouse and ENV_POOL_SIZE in env:
+        env[ENV_POOL_SIZE] = str(min(int(env[ENV_POOL_SIZE]), warehouse))
+    return env
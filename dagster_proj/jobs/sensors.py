@@ -0,0 +1,174 @@
+"""
+File-arrival sensor: runs ELT_Pipeline_Job for new or changed CSV drops.
+
+Every tick `csv_arrival_sensor` stats the CSV files in the landing directory
+(`meltano_kaggle_csv/data`, or `OLIST_LANDING_DIR`) and hashes only those whose
+size or mtime moved. A file counts as changed when its sha1 differs from the
+one of the last run it was part of, so touching or re-copying a file does not
+trigger anything.
+
+Changes are batched: a run is requested once no file has changed for
+`QUIET_SECONDS` (a drop of several files, or a file still being copied, ends
+up in one run), or at the latest `MAX_WAIT_SECONDS` after the first pending
+change. The run is tagged with the changed entities, so it loads only those
+and rebuilds only the models below them (see arrivals.py).
+
+A launched batch stays in the cursor under its run_key until the run with that
+key (or the daemon's retry of it) finishes. Its files count as processed only
+when the run succeeded. When the run failed or was canceled, the files go back
+to pending and are launched again, under a new run_key, after another quiet
+window. While a batch is in flight, new changes wait for it.
+
+The cursor holds the file hashes as JSON. On the very first tick the current
+files are recorded as the baseline without launching a run.
+"""
+import hashlib
+import json
+import os
+import time
+
+from dagster import DagsterRunStatus, DefaultSensorStatus, RunRequest, RunsFilter, SensorResult, SkipReason, sensor
+
+from dagster_proj.jobs.arrivals import ENTITIES_TAG, LANDING_DIR, TRIGGER_TAG, entity_files
+from dagster_proj.jobs.dagster_elt_pipeline import elt_pipeline_job
+
+TRIGGER = "csv_arrival"
+QUIET_SECONDS = float(os.environ.get("OLIST_ARRIVAL_QUIET_SECONDS", 120))
+MAX_WAIT_SECONDS = float(os.environ.get("OLIST_ARRIVAL_MAX_WAIT_SECONDS", 900))
+# Set by Dagster on sensor runs (and the retries of them), and on failed runs the daemon will retry
+RUN_KEY_TAG = "dagster/run_key"
+WILL_RETRY_TAG = "dagster/will_retry"
+
+
+def _file_entry(path) -> dict:
+    stat = path.stat()
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+
+def scan(cursor: dict, now: float) -> dict:
+    """
+    Updates `cursor` with the landing directory's current files.
+
+    cursor["files"]: name -> size, mtime and sha1 as of the last successful run;
+    cursor["pending"]: name -> the same for changed files, plus when they were
+    first seen changed and when they last changed;
+    cursor["launched"]: run_key -> the pending files of a batch whose run has
+    not finished yet.
+    """
+    files, pending = cursor.setdefault("files", {}), cursor.setdefault("pending", {})
+    in_flight = {name: entry for batch in cursor.setdefault("launched", {}).values()
+                 for name, entry in batch["files"].items()}
+    for path in sorted(LANDING_DIR.glob("*.csv")):
+        stat = path.stat()
+        known = pending.get(path.name) or in_flight.get(path.name) or files.get(path.name)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            continue
+        entry = _file_entry(path)
+        latest = in_flight.get(path.name) or files.get(path.name)
+        if latest and latest["sha1"] == entry["sha1"]:
+            # Same content as the last run got (touched or copied again)
+            latest.update(size=entry["size"], mtime_ns=entry["mtime_ns"])
+            pending.pop(path.name, None)
+            continue
+        first_seen = pending.get(path.name, {}).get("first_seen", now)
+        pending[path.name] = dict(entry, first_seen=first_seen, last_change=now)
+    return cursor
+
+
+def batch_ready(pending: dict, now: float) -> bool:
+    """Quiet for QUIET_SECONDS, or the oldest change has waited MAX_WAIT_SECONDS."""
+    quiet = now - max(entry["last_change"] for entry in pending.values())
+    waited = now - min(entry["first_seen"] for entry in pending.values())
+    return quiet >= QUIET_SECONDS or waited >= MAX_WAIT_SECONDS
+
+
+def settle_launched(context, cursor: dict, now: float) -> list:
+    """
+    Resolves the launched batches whose runs have finished; returns the run_keys still in flight.
+
+    On success the batch's files become `cursor["files"]`. On failure or
+    cancellation they go back to `cursor["pending"]` with `last_change` set to
+    now, so they are relaunched after a quiet window, under a new run_key. A
+    batch whose run never showed up within MAX_WAIT_SECONDS is requeued as well.
+    """
+    in_flight = []
+    for run_key, batch in list(cursor["launched"].items()):
+        runs = context.instance.get_runs(RunsFilter(job_name=elt_pipeline_job.name, tags={RUN_KEY_TAG: run_key}),
+                                         limit=1)
+        run = runs[0] if runs else None
+        if run is None and now - batch["requested_at"] < MAX_WAIT_SECONDS:
+            in_flight.append(run_key)
+            continue
+        if run is not None and not run.is_finished:
+            in_flight.append(run_key)
+            continue
+        if run is not None and run.status == DagsterRunStatus.FAILURE and run.tags.get(WILL_RETRY_TAG) == "true":
+            # The daemon is about to start the retry, under the same run_key
+            in_flight.append(run_key)
+            continue
+
+        del cursor["launched"][run_key]
+        if run is not None and run.status == DagsterRunStatus.SUCCESS:
+            for name, entry in batch["files"].items():
+                cursor["files"][name] = {k: entry[k] for k in ("size", "mtime_ns", "sha1")}
+            continue
+        outcome = f"run {run.run_id} {run.status.value.lower()}" if run else "no run was started"
+        context.log.warning(f"Requeuing batch {run_key} ({outcome}): {', '.join(sorted(batch['files']))}")
+        for name, entry in batch["files"].items():
+            if name in cursor["pending"]:
+                # Changed again since: keep the newer content, but not a later first_seen
+                cursor["pending"][name]["first_seen"] = min(cursor["pending"][name]["first_seen"], entry["first_seen"])
+            else:
+                cursor["pending"][name] = dict(entry, last_change=now)
+    return in_flight
+
+
+@sensor(job=elt_pipeline_job, minimum_interval_seconds=30, default_status=DefaultSensorStatus.STOPPED,
+        description="Runs the pipeline for new or changed CSV files, batched over a short window")
+def csv_arrival_sensor(context):
+    now = time.time()
+    if context.cursor is None:
+        cursor = {"files": {path.name: _file_entry(path) for path in sorted(LANDING_DIR.glob("*.csv"))},
+                  "pending": {}}
+        return SensorResult(skip_reason=SkipReason(f"Baseline recorded for {len(cursor['files'])} files"),
+                            cursor=json.dumps(cursor))
+
+    cursor = scan(json.loads(context.cursor), now)
+    in_flight = settle_launched(context, cursor, now)
+    pending = cursor["pending"]
+    if not pending:
+        message = f"Batch {in_flight[0]} still running" if in_flight else "No new or changed files"
+        return SensorResult(skip_reason=SkipReason(message), cursor=json.dumps(cursor))
+    if not batch_ready(pending, now):
+        return SensorResult(skip_reason=SkipReason(f"Batching {len(pending)} changed files until "
+                                                   f"{QUIET_SECONDS:.0f}s without changes"),
+                            cursor=json.dumps(cursor))
+    if in_flight:
+        return SensorResult(skip_reason=SkipReason(f"Previous batch {in_flight[0]} still running"),
+                            cursor=json.dumps(cursor))
+
+    entities_by_file = entity_files()
+    unknown = sorted(name for name in pending if name not in entities_by_file)
+    if unknown:
+        context.log.warning(f"Not in meltano.yml, ignored: {', '.join(unknown)}")
+    entities = sorted({entities_by_file[name] for name in pending if name in entities_by_file})
+    # Hashes and arrival times: the same content dropped again later, or requeued, is a new batch
+    batch_key = hashlib.sha1(json.dumps(pending, sort_keys=True).encode())
+    run_key = f"{TRIGGER}-{batch_key.hexdigest()[:16]}"
+
+    cursor["pending"] = {}
+    if not entities:
+        # Nothing to load: the files are processed as they are
+        for name, entry in pending.items():
+            cursor["files"][name] = {k: entry[k] for k in ("size", "mtime_ns", "sha1")}
+        return SensorResult(skip_reason=SkipReason("Only unknown files changed"), cursor=json.dumps(cursor))
+
+    # Unknown files are not loaded by the run, but are settled with its batch
+    cursor["launched"][run_key] = {"files": pending, "requested_at": now}
+    context.log.info(f"Launching a run for {', '.join(entities)} ({len(pending)} files)")
+    run_request = RunRequest(run_key=run_key, tags={ENTITIES_TAG: ",".join(entities), TRIGGER_TAG: TRIGGER})
+    return SensorResult(run_requests=[run_request], cursor=json.dumps(cursor))
@@ -0,0 +1,106 @@
+"""
+`stage_op`: the @op decorator shared by the stages of ELT_Pipeline_Job.
+
+Every stage does the same around its own work, in this order:
+
+1. returns at once when it is out of the run's scope (`skip_stage`: shared
+   stages in backfill partitions, per-day stages in the backfill's shared run)
+   or disabled by its `enabled` config;
+2. returns when its fingerprint matches its last success (`check_stage`);
+3. leases its CPU, memory and warehouse slots (`resource_slots`) and measures
+   the work (`stage_telemetry`), with failed data checks not retried
+   (`deterministic_failures`) for the stages that validate or test;
+4. records its fingerprint when the work succeeded.
+
+The decorated function only does the work, through a `StageRun`:
+
+    @stage_op("DBT_STG_Build", "staging_models_built", env=dbt_env, ins={"start_signal": In(Nothing)})
+    def run_dbt_stg_models(context, stage: StageRun):
+        stage.run("cd Dbt_Final/; python dbt_run_stg.py")
+
+`StageRun.run` streams the command's output into the run log as it arrives,
+with the stage's environment (`env`, plus `slot_env`) and timeout
+(`op_timeout`), and adds its wall time, dbt results and warehouse queries to
+the telemetry.
+"""
+from dagster import OpExecutionContext, op
+
+from dagster_proj.jobs.arrivals import arrival_env
+from dagster_proj.jobs.fingerprints import check_stage
+from dagster_proj.jobs.partitions import meltano_env, partition_env, skip_stage
+from dagster_proj.jobs.policies import RETRY_POLICIES, deterministic_failures, op_timeout
+from dagster_proj.jobs.scheduling import op_tags, resource_slots, slot_env
+from dagster_proj.jobs.subprocess_runner import run_command
+from dagster_proj.jobs.telemetry import stage_telemetry
+from dagster_proj.resources import WarehouseResource
+
+
+# Environments of a stage's commands, from the op context and the warehouse pool
+def dbt_env(context, pool) -> dict:
+    return arrival_env(context, partition_env(context))
+
+
+def meltano_stage_env(context, pool) -> dict:
+    return arrival_env(context, meltano_env(context))
+
+
+def script_env(context, pool) -> dict:
+    """GX and EDA/ML scripts open the same warehouse as the op."""
+    return partition_env(context, pool.subprocess_env())
+
+
+class StageRun:
+    """What a stage function works with: the op context, the warehouse pool and its telemetry."""
+
+    def __init__(self, context, pool, telemetry, env):
+        self.context = context
+        self.pool = pool
+        self.telemetry = telemetry
+        self.env = env
+        # Set to False when only part of the stage ran, so its fingerprint is not recorded
+        self.complete = True
+
+    def run(self, shell_command):
+        """Runs a command of the stage, streaming its output; raises when it fails or times out."""
+        return self.telemetry.add_command(run_command(
+            self.context, shell_command,
+            env=self.telemetry.command_env(slot_env(self.context, self.env(self.context, self.pool))),
+            timeout=op_timeout(self.context),
+        ))
+
+
+def stage_op(name, output, env=dbt_env, checks=None, **op_kwargs):
+    """
+    @op for the stage `name`, returning `output`; see the module docstring.
+
+    `checks` is "gx" or "dbt" for stages whose failures can be failed data checks;
+    other keyword arguments (`ins`, `config_schema`) are passed to @op.
+    """
+    def decorator(fn):
+        @op(name=name, retry_policy=RETRY_POLICIES[name], tags=op_tags(name), description=fn.__doc__, **op_kwargs)
+        def stage(context: OpExecutionContext, warehouse: WarehouseResource):
+            if not (context.op_config or {}).get("enabled", True):
+                context.log.info(f"⏭️ [{name}] Disabled for this run.")
+                return output
+            if skip_stage(context):
+                return output
+            # Skip when files, upstream stages and input tables match the last success
+            check = check_stage(context, warehouse.get_pool())
+            if check.unchanged:
+                return output
+
+            pool = warehouse.get_pool()
+            with resource_slots(context), stage_telemetry(context, pool) as telemetry:
+                run = StageRun(context, pool, telemetry, env)
+                if checks:
+                    with deterministic_failures(context, dbt=checks == "dbt"):
+                        fn(context, run)
+                else:
+                    fn(context, run)
+            if run.complete:
+                check.record_success()
+            return output
+
+        return stage
+
+    return decorator
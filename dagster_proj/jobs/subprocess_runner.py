@@ -0,0 +1,234 @@
+"""
+Streaming subprocess runner for the ops in dagster_elt_pipeline.py.
+
+`run_command` starts a shell command and forwards stdout and stderr to
+`context.log` line by line while the child is still running, each line prefixed
+with its arrival time relative to the start of the command. Reader threads hand
+lines over through a bounded queue (a child that floods its pipes is slowed down
+rather than buffered in memory), and only the last `TAIL_LINES` lines of each
+pipe are kept for the error raised on a non-zero exit.
+
+dbt progress lines (`3 of 12 START ...`, `3 of 12 OK created ... [CREATE TABLE
+(99.4k rows, 5.2 MiB processed) in 3.10s]`, `Done. PASS=12 ...`) are parsed
+into events: they are logged as one-line progress updates and returned on the
+`CommandResult` for callers that want them as metadata.
+
+Every command runs in its own session (process group). When it outlives its
+`timeout`, or the op is interrupted (run terminated, retry, worker shutdown),
+the whole group - the shell, dbt / python and anything they spawned - gets
+SIGTERM, then SIGKILL after `KILL_GRACE_SECONDS`, so no stuck child keeps
+holding warehouse connections or locks. A timeout raises `CommandTimeout`.
+"""
+import os
+import queue
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+TAIL_LINES = 200
+QUEUE_LINES = 1000
+MAX_LINE_CHARS = 8192
+KILL_GRACE_SECONDS = 10
+
+DBT_PROGRESS = re.compile(
+    r"^(?:\d{2}:\d{2}:\d{2}\s+)?(?P<index>\d+) of (?P<total>\d+) "
+    r"(?P<status>START|OK|PASS|WARN|FAIL|ERROR|SKIP)\b(?P<rest>.*)$"
+)
+# "... sql table model ecommerce.dim_db_customers ...", else the first name ("PASS not_null_... [PASS in 1.0s]")
+DBT_NODE = re.compile(r"\b(?:model|test|seed|snapshot) (?P<node>[\w.]+)")
+DBT_NAME = re.compile(r"(?P<node>[A-Za-z_][\w.]*)")
+DBT_ROWS = re.compile(r"\((?P<rows>[\d.]+[kMB]?) rows")
+DBT_SECONDS = re.compile(r"in (?P<seconds>[\d.]+)s\]")
+DBT_DONE = re.compile(r"Done\. (?P<counts>(?:[A-Z_]+=\d+\s*)+)")
+
+
+def _rows(text):
+    """'99.4k' -> 99400"""
+    scale = {"k": 1e3, "M": 1e6, "B": 1e9}.get(text[-1], 1)
+    return int(float(text.rstrip("kMB")) * scale)
+
+
+def parse_dbt_line(line: str):
+    """Progress event for a dbt log line, or None if the line is not a progress line."""
+    match = DBT_PROGRESS.match(line.strip())
+    if match:
+        node = DBT_NODE.search(match["rest"]) or DBT_NAME.search(match["rest"])
+        event = {
+            "event": "start" if match["status"] == "START" else "finish",
+            "index": int(match["index"]),
+            "total": int(match["total"]),
+            "status": match["status"],
+            "node": node["node"] if node else None,
+        }
+        rows = DBT_ROWS.search(line)
+        seconds = DBT_SECONDS.search(line)
+        if rows:
+            event["rows"] = _rows(rows["rows"])
+        if seconds:
+            event["seconds"] = float(seconds["seconds"])
+        return event
+    match = DBT_DONE.search(line)
+    if match:
+        counts = dict(pair.split("=") for pair in match["counts"].split())
+        return {"event": "done", **{k.lower(): int(v) for k, v in counts.items()}}
+    return None
+
+
+class CommandTimeout(subprocess.TimeoutExpired):
+    """Raised by `run_command` after it killed a command that exceeded its timeout."""
+
+
+class CommandResult:
+    """Exit code, elapsed time, output tails and parsed dbt events of one command."""
+
+    def __init__(self, command, returncode, seconds, stdout_tail, stderr_tail, events):
+        self.command = command
+        self.returncode = returncode
+        self.seconds = seconds
+        self.stdout_tail = stdout_tail
+        self.stderr_tail = stderr_tail
+        self.events = events
+
+
+def _pump(pipe, name, lines: queue.Queue):
+    try:
+        for line in iter(lambda: pipe.readline(MAX_LINE_CHARS), ""):
+            lines.put((name, time.monotonic(), line.rstrip("\r\n")))
+    finally:
+        pipe.close()
+        lines.put((name, None, None))
+
+
+def _log_event(context, event):
+    if event["event"] == "start":
+        context.log.info(f"📈 [dbt] {event['index']}/{event['total']} started {event['node']}")
+    elif event["event"] == "finish":
+        details = [event["status"]]
+        if "rows" in event:
+            details.append(f"{event['rows']} rows")
+        if "seconds" in event:
+            details.append(f"{event['seconds']}s")
+        context.log.info(f"📈 [dbt] {event['index']}/{event['total']} finished {event['node']}: {', '.join(details)}")
+    else:
+        counts = ", ".join(f"{k}={v}" for k, v in event.items() if k not in ("event", "at"))
+        context.log.info(f"📈 [dbt] done: {counts}")
+
+
+def _group_alive(pgid) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+def _kill_group(context, process):
+    """SIGTERM to the command's process group, SIGKILL to whatever is left after the grace period."""
+    if not _group_alive(process.pid):
+        return
+    os.killpg(process.pid, signal.SIGTERM)
+    context.log.warning(f"🔪 Sent SIGTERM to process group {process.pid}")
+    # The shell usually exits at once; its children may need a moment to shut down cleanly
+    grace_deadline = time.monotonic() + KILL_GRACE_SECONDS
+    while time.monotonic() < grace_deadline:
+        process.poll()
+        if not _group_alive(process.pid):
+            return
+        time.sleep(0.2)
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+        context.log.warning(f"🔪 Sent SIGKILL to process group {process.pid}")
+    except ProcessLookupError:
+        pass
+
+
+def run_command(context, shell_command: str, env: dict = None, check=True, timeout: float = None) -> CommandResult:
+    """
+    Runs `shell_command`, streaming both pipes into `context.log` as lines arrive.
+
+    Raises `subprocess.CalledProcessError` (with the output tails) on a non-zero
+    exit when `check` is set, like `subprocess.run(..., check=True)`, and
+    `CommandTimeout` after killing the command when it runs longer than `timeout` seconds.
+    """
+    env = dict(os.environ if env is None else env)
+    # Python children otherwise block-buffer stdout when it is a pipe
+    env.setdefault("PYTHONUNBUFFERED", "1")
+
+    start = time.monotonic()
+    process = subprocess.Popen(
+        shell_command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        env=env,
+        # Own process group, so a timeout can kill the children of the shell too
+        start_new_session=True,
+    )
+    lines = queue.Queue(maxsize=QUEUE_LINES)
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout", lines), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr", lines), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    tails = {"stdout": deque(maxlen=TAIL_LINES), "stderr": deque(maxlen=TAIL_LINES)}
+    events = []
+    open_pipes = len(readers)
+    deadline = start + timeout if timeout else None
+    timed_out = False
+    try:
+        while open_pipes:
+            try:
+                name, arrived, line = lines.get(timeout=1.0 if deadline else None)
+            except queue.Empty:
+                if time.monotonic() > deadline:
+                    timed_out = True
+                    context.log.error(f"⏰ Command exceeded its {timeout:.0f}s timeout: {shell_command}")
+                    break
+                continue
+            if line is None:
+                open_pipes -= 1
+                continue
+            tails[name].append(line)
+            prefix = f"[+{arrived - start:7.1f}s]" + (" [stderr]" if name == "stderr" else "")
+            context.log.info(f"{prefix} {line}")
+            event = parse_dbt_line(line)
+            if event is not None:
+                event["at"] = round(arrived - start, 3)
+                events.append(event)
+                _log_event(context, event)
+            if deadline and time.monotonic() > deadline:
+                timed_out = True
+                context.log.error(f"⏰ Command exceeded its {timeout:.0f}s timeout: {shell_command}")
+                break
+        if not timed_out:
+            # Both pipes are closed: the command is exiting, or closed its stdio and still runs
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()) if deadline else None)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                context.log.error(f"⏰ Command exceeded its {timeout:.0f}s timeout: {shell_command}")
+    finally:
+        # Timeout, or the op itself was interrupted: never leave the command running
+        if process.poll() is None:
+            _kill_group(context, process)
+
+    returncode = process.wait()
+    if timed_out:
+        raise CommandTimeout(shell_command, timeout,
+                             output="\n".join(tails["stdout"]), stderr="\n".join(tails["stderr"]))
+    for reader in readers:
+        reader.join()
+    result = CommandResult(shell_command, returncode, time.monotonic() - start,
+                           list(tails["stdout"]), list(tails["stderr"]), events)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, shell_command,
+                                            output="\n".join(result.stdout_tail),
+                                            stderr="\n".join(result.stderr_tail))
+    return result
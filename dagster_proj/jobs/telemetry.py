@@ -0,0 +1,223 @@
+"""
+Per-stage performance telemetry for the ops in dagster_elt_pipeline.py.
+
+`stage_telemetry(context)` wraps the body of an op and measures:
+
+- wall time and CPU time (the op process plus the subprocesses it waited for);
+- memory: `process_peak_rss_mb` is the peak RSS of the op process over its
+  lifetime (getrusage reports no per-interval peak). With the multiprocess
+  executor that process runs only this op. `child_peak_rss_mb` is the largest
+  child the op waited for, set only when one of its commands raised the
+  process's previous largest child;
+- rows written, from dbt's `target/run_results.json` after every dbt command
+  (BigQuery's `adapter_response` has `rows_affected` per model; partitioned
+  runs read their own target path);
+- rows read and bytes scanned by the warehouse queries: dbt's
+  `bytes_processed`, plus the BigQuery job statistics of the queries made
+  through `WarehousePool.query_df`. Queries made in the op process come from
+  the pool's totals. Queries made by the op's commands come from the
+  `OLIST_QUERY_STATS` file that `command_env` hands them. On DuckDB only rows
+  are counted;
+- bytes written, as reported by in-process ops through `record()`;
+- per-model dbt timings, each also logged as an `AssetMaterialization` keyed
+  `dbt/<model>` so the Dagster UI plots them across runs.
+
+On exit the figures are attached to the op's output with
+`context.add_output_metadata` and appended as one JSON line to
+`TELEMETRY_FILE`, a local time series. The op's wall time is compared with the
+median of its previous runs and a warning is logged when it regresses.
+"""
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dagster import AssetMaterialization, MetadataValue
+
+from dagster_proj.jobs.partitions import dbt_target_path, partition_key
+from dagster_proj.resources.warehouse import ENV_QUERY_STATS
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DBT_RUN_RESULTS = REPO_ROOT / "Dbt_Final" / "target" / "run_results.json"
+TELEMETRY_FILE = Path(os.environ.get("OLIST_TELEMETRY_FILE", REPO_ROOT / ".telemetry" / "stage_metrics.jsonl"))
+
+HISTORY_RUNS = 10
+REGRESSION_FACTOR = 1.5
+
+
+def _rss_mb(usage) -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def read_dbt_run_results(since: float, path=DBT_RUN_RESULTS) -> list:
+    """Per-node results of the last dbt invocation, if it wrote run_results.json after `since` (epoch seconds)."""
+    try:
+        if path.stat().st_mtime < since:
+            return []
+        with open(path) as f:
+            results = json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+    models = []
+    for result in results:
+        adapter = result.get("adapter_response") or {}
+        models.append({
+            "node": result["unique_id"],
+            "status": result.get("status"),
+            "seconds": round(result.get("execution_time") or 0.0, 3),
+            "rows_affected": adapter.get("rows_affected"),
+            "bytes_processed": adapter.get("bytes_processed"),
+        })
+    return models
+
+
+class StageTelemetry:
+    """Accumulates the measurements of one op; see `stage_telemetry`."""
+
+    def __init__(self, context, query_stats_path):
+        self.context = context
+        self.stage = context.op_def.name
+        self.partition = partition_key(context)
+        self.run_results_path = dbt_target_path(self.partition) / "run_results.json"
+        self.rows_read = 0
+        self.rows_written = 0
+        self.bytes_scanned = 0
+        self.bytes_written = 0
+        self.dbt_models = []
+        self.commands = []
+        self.query_stats_path = query_stats_path
+
+    def command_env(self, env: dict) -> dict:
+        """`env` plus the file where the command's warehouse pools report their queries."""
+        return {**env, ENV_QUERY_STATS: self.query_stats_path}
+
+    def add_command(self, result):
+        """Records a `run_command` result and the dbt run_results it left behind, if any."""
+        self.commands.append({"command": result.command, "seconds": round(result.seconds, 3),
+                              "returncode": result.returncode})
+        started = time.time() - result.seconds
+        for model in read_dbt_run_results(started, self.run_results_path):
+            self.dbt_models.append(model)
+            if model["node"].startswith(("model.", "seed.", "snapshot.")):
+                self.rows_written += model["rows_affected"] or 0
+            self.bytes_scanned += model["bytes_processed"] or 0
+            self.context.log_event(AssetMaterialization(
+                asset_key=["dbt", model["node"].split(".")[-1]],
+                description=f"{self.stage}: dbt {model['status']}",
+                metadata={k: v for k, v in model.items() if v is not None and k != "node"},
+            ))
+        return result
+
+    def record(self, rows_read=0, rows_written=0, bytes_scanned=0, bytes_written=0):
+        """Counts reported by ops that move data in-process."""
+        self.rows_read += rows_read
+        self.rows_written += rows_written
+        self.bytes_scanned += bytes_scanned
+        self.bytes_written += bytes_written
+
+    def add_query_stats(self):
+        """Adds the queries the op's commands reported to `query_stats_path`."""
+        try:
+            with open(self.query_stats_path) as f:
+                for line in f:
+                    if line.strip():
+                        self.record(**json.loads(line))
+        except (OSError, ValueError):
+            pass
+
+
+def _history(stage, path=TELEMETRY_FILE) -> list:
+    """Wall times of the stage's previous successful runs, oldest first."""
+    try:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+    return [r["wall_seconds"] for r in records if r["stage"] == stage and r.get("status") == "success"]
+
+
+def _append(record, path=TELEMETRY_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One write per record; O_APPEND keeps lines from parallel ops intact
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+@contextmanager
+def stage_telemetry(context, pool=None):
+    """
+    Measures the enclosed op body and publishes the result as output metadata and a JSONL record.
+
+    `pool` is the op's `WarehousePool`: the queries it runs during the body are counted.
+    """
+    fd, query_stats_path = tempfile.mkstemp(prefix="olist-queries-", suffix=".jsonl")
+    os.close(fd)
+    telemetry = StageTelemetry(context, query_stats_path)
+    started_at = datetime.now(timezone.utc)
+    wall_start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+    child_rss_start = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    pool_start = (pool.rows_read, pool.bytes_scanned) if pool else (0, 0)
+    status = "failure"
+    try:
+        yield telemetry
+        status = "success"
+    finally:
+        wall = time.perf_counter() - wall_start
+        telemetry.add_query_stats()
+        os.remove(query_stats_path)
+        if pool:
+            telemetry.record(rows_read=pool.rows_read - pool_start[0], bytes_scanned=pool.bytes_scanned - pool_start[1])
+        # RUSAGE_CHILDREN keeps the largest child so far: only a new maximum belongs to this op
+        child_rss = resource.getrusage(resource.RUSAGE_CHILDREN)
+        record = {
+            "run_id": context.run_id,
+            "stage": telemetry.stage,
+            "partition": telemetry.partition,
+            "status": status,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(_cpu_seconds() - cpu_start, 3),
+            "process_peak_rss_mb": round(_rss_mb(resource.getrusage(resource.RUSAGE_SELF)), 1),
+            "child_peak_rss_mb": (round(_rss_mb(child_rss), 1)
+                                  if child_rss.ru_maxrss > child_rss_start else None),
+            "rows_read": telemetry.rows_read,
+            "rows_written": telemetry.rows_written,
+            "bytes_scanned": telemetry.bytes_scanned,
+            "bytes_written": telemetry.bytes_written,
+            "dbt_models": len(telemetry.dbt_models),
+        }
+        history = _history(telemetry.stage)[-HISTORY_RUNS:]
+        _append({**record, "commands": telemetry.commands, "dbt": telemetry.dbt_models})
+
+        if status == "success":
+            metadata = {k: v for k, v in record.items()
+                        if k not in ("run_id", "stage", "partition", "status", "started_at") and v is not None}
+            if telemetry.dbt_models:
+                metadata["dbt_model_timings"] = MetadataValue.json(telemetry.dbt_models)
+            if history:
+                baseline = statistics.median(history)
+                metadata["wall_seconds_median_previous"] = round(baseline, 3)
+                if wall > REGRESSION_FACTOR * baseline:
+                    context.log.warning(f"🐢 [{telemetry.stage}] {wall:.1f}s vs median {baseline:.1f}s "
+                                        f"over the last {len(history)} runs")
+            context.add_output_metadata(metadata)
+            child = (f", largest child {record['child_peak_rss_mb']} MiB"
+                     if record["child_peak_rss_mb"] is not None else "")
+            context.log.info(f"⏱️ [{telemetry.stage}] {record['wall_seconds']}s wall, {record['cpu_seconds']}s CPU, "
+                             f"process peak RSS {record['process_peak_rss_mb']} MiB (lifetime){child}, "
+                             f"{record['rows_read']} rows read, {record['rows_written']} rows written, "
+                             f"{record['bytes_scanned']} bytes scanned")
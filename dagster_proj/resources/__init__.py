@@ -0,0 +1,16 @@
+# Exports are resolved on first access, so `import dagster_proj.resources.warehouse`
+# from the GX / EDA scripts does not import Dagster along with the package
+_EXPORTS = {
+    "WarehousePool": "dagster_proj.resources.warehouse",
+    "get_warehouse": "dagster_proj.resources.warehouse",
+    "WarehouseResource": "dagster_proj.resources.warehouse_resource",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,336 @@
+"""
+Shared warehouse connections for the pipeline stages.
+
+One `WarehousePool` per process holds a pooled SQLAlchemy engine (used by GX)
+and a BigQuery client (used by EDA), so stages running in the same process
+reuse warm connections instead of opening their own. The `duckdb` backend is a
+local stand-in for BigQuery with the same `<dataset>.<table>` layout.
+
+DuckDB lets one process open the file read-write, or several read-only, never
+both. On that backend `query_df` reads through a read-only connection, and
+every connection is closed after use instead of being kept in the pool, so a
+process holds the file only while it queries. Pipeline ops that write (dbt, GX
+sample tables) additionally hold `duckdb_lock_path` exclusively, and ops that
+read hold it shared (dagster_proj/jobs/scheduling.py).
+
+`query_df` counts the rows it returns and, on BigQuery, the bytes its jobs
+processed. A pipeline op reads the pool's totals for queries it runs in its own
+process. Its commands get an `OLIST_QUERY_STATS` file, where the scripts' pools
+append one line per query.
+
+This module does not import Dagster: the scripts run by the ops open the pool
+through `get_warehouse()` without paying for it. The Dagster resource wrapping
+the pool is `WarehouseResource` in warehouse_resource.py.
+"""
+import json
+import os
+import re
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+
+PROJECT_ID = "durable-ripsaw-477914-g0"
+DATASET = "ecommerce"
+DUCKDB_PATH = "warehouse/olist.duckdb"
+DBT_RUN_RESULTS = Path(__file__).resolve().parents[2] / "Dbt_Final" / "target" / "run_results.json"
+
+# Environment variables used to hand the resource config to child processes
+ENV_BACKEND = "OLIST_WAREHOUSE_BACKEND"
+ENV_PROJECT_ID = "OLIST_PROJECT_ID"
+ENV_DATASET = "OLIST_DATASET"
+ENV_DUCKDB_PATH = "OLIST_DUCKDB_PATH"
+ENV_POOL_SIZE = "OLIST_POOL_SIZE"
+# Set by the pipeline ops for their commands (dagster_proj/jobs/telemetry.py)
+ENV_QUERY_STATS = "OLIST_QUERY_STATS"
+
+BACKENDS = ("bigquery", "duckdb")
+# DuckDB has no per-table modification time: the stand-in records a version per copied table
+VERSIONS_TABLE = "_olist_table_versions"
+
+
+@lru_cache(maxsize=256)
+def _prepared(sql: str):
+    """Parses `sql` once; SQLAlchemy's compiled cache then reuses the statement."""
+    from sqlalchemy import text
+    return text(sql)
+
+
+def dbt_run_id(table_name: str):
+    """Invocation id of the last dbt run that built `table_name`, if it is in run_results.json."""
+    try:
+        with open(DBT_RUN_RESULTS) as f:
+            run_results = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for result in run_results.get("results", []):
+        if result.get("unique_id", "").endswith(f".{table_name}"):
+            return run_results.get("metadata", {}).get("invocation_id")
+    return None
+
+
+def _bigquery_parameter(name, value):
+    from google.cloud import bigquery
+
+    if isinstance(value, (list, tuple)):
+        element_type = _bigquery_type(value[0]) if value else "STRING"
+        return bigquery.ArrayQueryParameter(name, element_type, list(value))
+    return bigquery.ScalarQueryParameter(name, _bigquery_type(value), value)
+
+
+def _bigquery_type(value):
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime):
+        return "TIMESTAMP"
+    if isinstance(value, date):
+        return "DATE"
+    return "STRING"
+
+
+class WarehousePool:
+    """Process-wide pool of warehouse connections shared by the GX and EDA stages."""
+
+    def __init__(self, backend="bigquery", project_id=PROJECT_ID, dataset=DATASET,
+                 duckdb_path=DUCKDB_PATH, pool_size=4):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown warehouse backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        self.project_id = project_id
+        self.dataset = dataset
+        self.duckdb_path = os.path.abspath(duckdb_path)
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._engine = None
+        self._read_engine = None
+        self._client = None
+        # Totals of the queries run through `query_df` in this process
+        self.rows_read = 0
+        self.bytes_scanned = 0
+
+    @property
+    def connection_string(self) -> str:
+        if self.backend == "duckdb":
+            return f"duckdb:///{self.duckdb_path}"
+        return f"bigquery://{self.project_id}/{self.dataset}"
+
+    def engine_kwargs(self) -> dict:
+        """create_engine() pooling options, also handed to GX's SQL datasource."""
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.pool_size,
+            "pool_pre_ping": True,
+            "pool_recycle": 3600,
+        }
+
+    def table(self, table_name: str) -> str:
+        """Fully qualified, quoted reference to a table in the dataset."""
+        if self.backend == "duckdb":
+            return f'"{self.dataset}"."{table_name}"'
+        return f"`{self.project_id}.{self.dataset}.{table_name}`"
+
+    def table_version(self, table_name: str):
+        """
+        Cheap version stamp for a table, read from metadata only (no scan).
+
+        BigQuery reports the table's last-modified time. On the DuckDB stand-in it is
+        the version `snapshot_to_duckdb` recorded for the table in `VERSIONS_TABLE`,
+        else its row and column counts from duckdb_tables(), so a write to one table
+        leaves the others' versions alone. Falls back to the dbt run id, or None when
+        unknown.
+        """
+        try:
+            if self.backend == "bigquery":
+                table = self.bigquery_client().get_table(f"{self.project_id}.{self.dataset}.{table_name}")
+                return table.modified.isoformat()
+            return self._duckdb_table_version(table_name)
+        except Exception:
+            return dbt_run_id(table_name)
+
+    def _duckdb_table_version(self, table_name: str):
+        with self.read_engine().connect() as conn:
+            tables = dict(conn.execute(_prepared(
+                "SELECT table_name, estimated_size || ':' || column_count FROM duckdb_tables() "
+                "WHERE schema_name = :dataset AND table_name IN (:table_name, :versions)"
+            ), {"dataset": self.dataset, "table_name": table_name, "versions": VERSIONS_TABLE}).fetchall())
+            if table_name not in tables:
+                return None
+            if VERSIONS_TABLE in tables:
+                recorded = conn.execute(_prepared(
+                    f"SELECT version FROM {self.table(VERSIONS_TABLE)} WHERE table_name = :table_name"
+                ), {"table_name": table_name}).scalar()
+                if recorded is not None:
+                    return recorded
+            return f"rows:columns={tables[table_name]}"
+
+    @property
+    def duckdb_lock_path(self) -> str:
+        """Lock file serialising the processes that open the DuckDB file read-write."""
+        return f"{self.duckdb_path}.olist.lock"
+
+    def engine(self):
+        """Read-write engine (`execute`); on DuckDB its connections are not kept open."""
+        with self._lock:
+            if self._engine is None:
+                from sqlalchemy import create_engine
+                if self.backend == "duckdb":
+                    from sqlalchemy.pool import NullPool
+                    os.makedirs(os.path.dirname(self.duckdb_path), exist_ok=True)
+                    self._engine = create_engine(self.connection_string, poolclass=NullPool)
+                else:
+                    self._engine = create_engine(self.connection_string, **self.engine_kwargs())
+        return self._engine
+
+    def read_engine(self):
+        """Engine for queries: on DuckDB read-only, so several processes can read at once."""
+        if self.backend != "duckdb":
+            return self.engine()
+        with self._lock:
+            if self._read_engine is None:
+                from sqlalchemy import create_engine
+                from sqlalchemy.pool import NullPool
+                self._read_engine = create_engine(self.connection_string, poolclass=NullPool,
+                                                  connect_args={"read_only": True})
+        return self._read_engine
+
+    def bigquery_client(self):
+        if self.backend != "bigquery":
+            raise RuntimeError(f"No BigQuery client for the '{self.backend}' backend")
+        with self._lock:
+            if self._client is None:
+                from google.cloud import bigquery
+                self._client = bigquery.Client(project=self.project_id)
+        return self._client
+
+    def query_df(self, sql: str, params: dict = None):
+        """
+        Runs `sql` and returns a pandas DataFrame.
+
+        Parameters use the `:name` style on both backends; on BigQuery they are
+        sent as query parameters so the statement text (and its cache entry) is stable.
+        """
+        params = params or {}
+        if self.backend == "bigquery":
+            from google.cloud import bigquery
+
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[_bigquery_parameter(k, v) for k, v in params.items()]
+            )
+            bq_sql = re.sub(r"(?<![:\w]):(\w+)", r"@\1", sql)
+            job = self.bigquery_client().query(bq_sql, job_config=job_config)
+            df = job.to_dataframe()
+            self._count_query(len(df), job.total_bytes_processed or 0)
+            return df
+
+        import pandas as pd
+
+        with self.read_engine().connect() as conn:
+            result = conn.execute(_prepared(sql), params)
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        # DuckDB reports no scanned bytes
+        self._count_query(len(df), 0)
+        return df
+
+    def _count_query(self, rows, bytes_scanned):
+        with self._lock:
+            self.rows_read += rows
+            self.bytes_scanned += bytes_scanned
+        stats_path = os.environ.get(ENV_QUERY_STATS)
+        if stats_path:
+            # One write per line; O_APPEND keeps lines from parallel queries intact
+            with open(stats_path, "a") as f:
+                f.write(json.dumps({"rows_read": rows, "bytes_scanned": bytes_scanned}) + "\n")
+
+    def execute(self, sql: str, params: dict = None):
+        """Runs a statement that returns no rows (DDL/DML)."""
+        with self.engine().begin() as conn:
+            conn.execute(_prepared(sql), params or {})
+
+    def subprocess_env(self) -> dict:
+        """Environment for child processes so they open the same warehouse."""
+        env = os.environ.copy()
+        env.update({
+            ENV_BACKEND: self.backend,
+            ENV_PROJECT_ID: self.project_id,
+            ENV_DATASET: self.dataset,
+            ENV_DUCKDB_PATH: self.duckdb_path,
+            ENV_POOL_SIZE: str(self.pool_size),
+        })
+        return env
+
+    def dispose(self):
+        with self._lock:
+            for engine in (self._engine, self._read_engine):
+                if engine is not None:
+                    engine.dispose()
+            self._engine = self._read_engine = None
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_warehouse(backend=None, project_id=None, dataset=None, duckdb_path=None, pool_size=None) -> WarehousePool:
+    """
+    Returns the process-wide pool for the given config, creating it on first use.
+
+    Unset arguments fall back to the OLIST_* environment variables, then to the
+    BigQuery defaults, so scripts started by Dagster follow the resource config.
+    """
+    key = (
+        backend or os.environ.get(ENV_BACKEND, "bigquery"),
+        project_id or os.environ.get(ENV_PROJECT_ID, PROJECT_ID),
+        dataset or os.environ.get(ENV_DATASET, DATASET),
+        os.path.abspath(duckdb_path or os.environ.get(ENV_DUCKDB_PATH, DUCKDB_PATH)),
+        int(pool_size or os.environ.get(ENV_POOL_SIZE, 4)),
+    )
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = WarehousePool(*key)
+        return _pools[key]
+
+
+def snapshot_to_duckdb(table_names, source: WarehousePool = None, duckdb_path=DUCKDB_PATH):
+    """Copies warehouse tables into the local DuckDB stand-in, recording each table's source version."""
+    import duckdb
+
+    source = source or get_warehouse("bigquery")
+    os.makedirs(os.path.dirname(os.path.abspath(duckdb_path)), exist_ok=True)
+    con = duckdb.connect(duckdb_path)
+    versions = f'"{source.dataset}"."{VERSIONS_TABLE}"'
+    try:
+        con.execute(f'CREATE SCHEMA IF NOT EXISTS "{source.dataset}"')
+        con.execute(f"CREATE TABLE IF NOT EXISTS {versions} (table_name VARCHAR PRIMARY KEY, version VARCHAR)")
+        for table_name in table_names:
+            print(f"▶ Copying {source.table(table_name)} into {duckdb_path} ...")
+            version = source.table_version(table_name) or datetime.now().isoformat()
+            df = source.query_df(f"SELECT * FROM {source.table(table_name)}")
+            con.register("snapshot_df", df)
+            con.execute("BEGIN")
+            con.execute(f'CREATE OR REPLACE TABLE "{source.dataset}"."{table_name}" AS SELECT * FROM snapshot_df')
+            con.execute(f"INSERT OR REPLACE INTO {versions} VALUES (?, ?)", [table_name, version])
+            con.execute("COMMIT")
+            con.unregister("snapshot_df")
+            print(f"   Rows: {len(df)}")
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the local DuckDB stand-in from BigQuery")
+    parser.add_argument("--duckdb-path", default=DUCKDB_PATH)
+    parser.add_argument("tables", nargs="*", default=[
+        "dim_db_customers", "dim_db_sellers", "dim_db_products", "dim_db_dates", "fact_db_order_items",
+        "olist_geolocation",
+    ])
+    args = parser.parse_args()
+    snapshot_to_duckdb(args.tables, duckdb_path=args.duckdb_path)
@@ -0,0 +1,19 @@
+"""
+Dagster resource for the shared warehouse pool (see warehouse.py).
+"""
+from dagster import ConfigurableResource
+
+from dagster_proj.resources.warehouse import DATASET, DUCKDB_PATH, PROJECT_ID, WarehousePool, get_warehouse
+
+
+class WarehouseResource(ConfigurableResource):
+    """Dagster resource exposing the shared `WarehousePool`."""
+
+    backend: str = "bigquery"
+    project_id: str = PROJECT_ID
+    dataset: str = DATASET
+    duckdb_path: str = DUCKDB_PATH
+    pool_size: int = 4
+
+    def get_pool(self) -> WarehousePool:
+        return get_warehouse(self.backend, self.project_id, self.dataset, self.duckdb_path, self.pool_size)
@@ -0,0 +1,256 @@
+"""
+Where pipeline time goes, from the run history of a Dagster instance.
+
+    python -m dagster_proj.run_history                       # last 50 runs of ELT_Pipeline_Job
+    python -m dagster_proj.run_history --last 200 --json
+    python -m dagster_proj.run_history --run <run_id>        # one run's critical path
+
+Reads the SQLite storage that `dagster dev` keeps under DAGSTER_HOME (or any
+`--dagster-home`, e.g. dagster_proj/.tmp_dagster_home_*) read-only and
+directly, without loading the instance or replaying event logs:
+
+- `history/runs.db`: the runs of the job, newest first (index on
+  pipeline_name, id), with creation, start and end times;
+- `history/runs/<run_id>.db`: only the step lifecycle events of each run
+  (index on dagster_event_type, id); event bodies are not deserialised.
+
+Reported per op: duration distribution (p50/p90/max, attempts), the
+trend of its median over the recent runs against the runs before, and how
+often it sits on the critical path. Per run: time queued before it started,
+and its critical path - the chain of steps, walked back from the last one to
+finish through the upstream step that finished last, with the gap each step
+waited after its upstream (executor slot, process start).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+JOB_NAME = "ELT_Pipeline_Job"
+LAST_RUNS = 50
+TREND_RUNS = 5
+
+STEP_EVENTS = ("STEP_WORKER_STARTING", "STEP_START", "STEP_RESTARTED", "STEP_UP_FOR_RETRY",
+               "STEP_SUCCESS", "STEP_FAILURE", "STEP_SKIPPED")
+ATTEMPT_START = ("STEP_START", "STEP_RESTARTED")
+ATTEMPT_END = ("STEP_UP_FOR_RETRY", "STEP_SUCCESS", "STEP_FAILURE")
+
+
+def _epoch(value) -> float:
+    """Epoch seconds of a storage timestamp (naive UTC 'YYYY-MM-DD HH:MM:SS[.ffffff]' or already a float)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _connect(path: Path):
+    """
+    Read-only connection, closed on leaving the `with` block.
+
+    A store without a `-wal` file (shipped with the repo, or not open in Dagster)
+    is opened as immutable, so SQLite creates no `-shm`/`-wal` sidecars next to
+    it. A live store already has them and is read through its WAL.
+    """
+    live = path.with_name(path.name + "-wal").exists()
+    return closing(sqlite3.connect(f"file:{path}?mode=ro{'' if live else '&immutable=1'}", uri=True))
+
+
+def upstream_steps(job_name=JOB_NAME) -> dict:
+    """op name -> names of the ops it depends on, from the job definition."""
+    from dagster_proj.definitions import defs
+
+    graph = defs.get_job_def(job_name).graph
+    return {node.name: sorted({output.node.name for output in
+                               graph.dependency_structure.all_upstream_outputs_from_node(node.name)})
+            for node in graph.nodes}
+
+
+def load_runs(dagster_home, job_name=JOB_NAME, last=LAST_RUNS, run_id=None) -> list:
+    """The job's most recent runs (oldest first), each with its steps' timings."""
+    history = Path(dagster_home) / "history"
+    with _connect(history / "runs.db") as con:
+        query = ("SELECT run_id, status, partition, create_timestamp, start_time, end_time "
+                 "FROM runs WHERE pipeline_name = ?")
+        params = [job_name]
+        if run_id:
+            query += " AND run_id = ?"
+            params.append(run_id)
+        rows = con.execute(query + " ORDER BY id DESC LIMIT ?", params + [last]).fetchall()
+
+    runs = []
+    for run_id, status, partition, created, start, end in reversed(rows):
+        run = {"run_id": run_id, "status": status, "partition": partition, "created": _epoch(created),
+               "start": start, "end": end, "steps": {}}
+        if start and run["created"]:
+            run["queued_s"] = max(0.0, start - run["created"])
+        if start and end:
+            run["wall_s"] = end - start
+        shard = history / "runs" / f"{run_id}.db"
+        if shard.exists():
+            run["steps"] = _load_steps(shard)
+        runs.append(run)
+    return runs
+
+
+def _load_steps(shard: Path) -> dict:
+    placeholders = ", ".join("?" * len(STEP_EVENTS))
+    with _connect(shard) as con:
+        events = con.execute(
+            f"SELECT step_key, dagster_event_type, timestamp FROM event_logs "
+            f"WHERE dagster_event_type IN ({placeholders}) ORDER BY id", STEP_EVENTS,
+        ).fetchall()
+
+    steps = {}
+    for step_key, event_type, timestamp in events:
+        at = _epoch(timestamp)
+        step = steps.setdefault(step_key, {"attempts": 0, "work_s": 0.0})
+        if event_type == "STEP_WORKER_STARTING":
+            step.setdefault("launched", at)
+        elif event_type in ATTEMPT_START:
+            step.setdefault("start", at)
+            step["attempts"] += 1
+            step["_attempt_start"] = at
+        elif event_type in ATTEMPT_END:
+            step["work_s"] += at - step.pop("_attempt_start", at)
+            if event_type != "STEP_UP_FOR_RETRY":
+                step["end"] = at
+                step["status"] = "SUCCESS" if event_type == "STEP_SUCCESS" else "FAILURE"
+        else:
+            step["status"] = "SKIPPED"
+    for step in steps.values():
+        step.pop("_attempt_start", None)
+        if "start" in step and "end" in step:
+            step["duration_s"] = step["end"] - step["start"]
+        if "launched" in step and "start" in step:
+            step["startup_s"] = step["start"] - step["launched"]
+    return steps
+
+
+def critical_path(run, upstream) -> list:
+    """Steps of `run` from the first to the last one to finish, each gated by the upstream that finished last."""
+    steps = {k: s for k, s in run["steps"].items() if "end" in s}
+    if not steps:
+        return []
+    path = []
+    step_key = max(steps, key=lambda k: steps[k]["end"])
+    while step_key:
+        step = steps[step_key]
+        finished = [u for u in upstream.get(step_key, []) if u in steps]
+        gate = max(finished, key=lambda u: steps[u]["end"]) if finished else None
+        ready = steps[gate]["end"] if gate else run["start"]
+        path.append({
+            "step": step_key,
+            "duration_s": step.get("duration_s", 0.0),
+            # Time between becoming runnable and actually starting (executor slot, process start)
+            "wait_s": max(0.0, step["start"] - ready) if ready and "start" in step else 0.0,
+            "attempts": step["attempts"],
+        })
+        step_key = gate
+    return list(reversed(path))
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(runs, upstream) -> dict:
+    """Per-op distributions, trends and critical-path share, plus run-level queueing and wall time."""
+    durations, startup, attempts = {}, {}, {}
+    on_critical_path = {}
+    for run in runs:
+        for step_key, step in run["steps"].items():
+            if step.get("status") == "SUCCESS":
+                durations.setdefault(step_key, []).append(step["duration_s"])
+                startup.setdefault(step_key, []).append(step.get("startup_s", 0.0))
+                attempts.setdefault(step_key, []).append(step["attempts"])
+        if run["status"] == "SUCCESS":
+            run["critical_path"] = critical_path(run, upstream)
+            for entry in run["critical_path"]:
+                on_critical_path[entry["step"]] = on_critical_path.get(entry["step"], 0) + 1
+
+    succeeded = [run for run in runs if run["status"] == "SUCCESS"]
+    ops = {}
+    for step_key, values in durations.items():
+        recent, before = values[-TREND_RUNS:], values[-2 * TREND_RUNS:-TREND_RUNS]
+        ops[step_key] = {
+            "runs": len(values),
+            "p50_s": round(statistics.median(values), 2),
+            "p90_s": round(_percentile(values, 0.9), 2),
+            "max_s": round(max(values), 2),
+            "startup_p50_s": round(statistics.median(startup[step_key]), 2),
+            "retried_runs": sum(1 for a in attempts[step_key] if a > 1),
+            # Median of the last TREND_RUNS runs against the TREND_RUNS before them
+            "trend_pct": (round(100 * (statistics.median(recent) / statistics.median(before) - 1), 1)
+                          if before and statistics.median(before) > 0 else None),
+            "critical_path_share": round(on_critical_path.get(step_key, 0) / len(succeeded), 2) if succeeded else 0.0,
+        }
+
+    def _stats(key):
+        values = [run[key] for run in runs if key in run]
+        return {"p50_s": round(statistics.median(values), 2), "max_s": round(max(values), 2)} if values else {}
+
+    return {
+        "runs": len(runs),
+        "succeeded": len(succeeded),
+        "wall": _stats("wall_s"),
+        "queued": _stats("queued_s"),
+        "ops": dict(sorted(ops.items(), key=lambda item: -item[1]["p50_s"])),
+        "latest_critical_path": succeeded[-1]["critical_path"] if succeeded else [],
+        "latest_run_id": succeeded[-1]["run_id"] if succeeded else None,
+    }
+
+
+def stage_estimates(dagster_home=None, job_name=JOB_NAME, last=LAST_RUNS) -> dict:
+    """op name -> median duration in seconds over its recent successful runs ({} without history)."""
+    dagster_home = dagster_home or os.environ.get("DAGSTER_HOME")
+    if not dagster_home or not (Path(dagster_home) / "history" / "runs.db").exists():
+        return {}
+    durations = {}
+    for run in load_runs(dagster_home, job_name, last):
+        for step_key, step in run["steps"].items():
+            if step.get("status") == "SUCCESS":
+                durations.setdefault(step_key, []).append(step["duration_s"])
+    return {step_key: statistics.median(values) for step_key, values in durations.items()}
+
+
+def print_report(summary):
+    print(f"📊 {summary['runs']} runs ({summary['succeeded']} succeeded); "
+          f"wall p50 {summary['wall'].get('p50_s', '-')}s, max {summary['wall'].get('max_s', '-')}s; "
+          f"queued p50 {summary['queued'].get('p50_s', '-')}s, max {summary['queued'].get('max_s', '-')}s")
+    print(f"\n{'op':<24}{'runs':>6}{'p50 s':>9}{'p90 s':>9}{'max s':>9}{'start s':>9}{'retried':>9}"
+          f"{'trend':>8}{'crit.':>7}")
+    for step_key, op in summary["ops"].items():
+        trend = f"{op['trend_pct']:+.0f}%" if op["trend_pct"] is not None else "-"
+        print(f"{step_key:<24}{op['runs']:>6}{op['p50_s']:>9.1f}{op['p90_s']:>9.1f}{op['max_s']:>9.1f}"
+              f"{op['startup_p50_s']:>9.1f}{op['retried_runs']:>9}{trend:>8}{op['critical_path_share']:>7.0%}")
+
+    if summary["latest_critical_path"]:
+        total = sum(e["duration_s"] + e["wait_s"] for e in summary["latest_critical_path"])
+        print(f"\n🛤️ Critical path of run {summary['latest_run_id']} ({total:.1f}s):")
+        for entry in summary["latest_critical_path"]:
+            retries = f", {entry['attempts']} attempts" if entry["attempts"] > 1 else ""
+            print(f"   {entry['step']:<24}{entry['duration_s']:>8.1f}s  (waited {entry['wait_s']:.1f}s{retries})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Op durations, critical path and queueing from Dagster run history")
+    parser.add_argument("--dagster-home", default=os.environ.get("DAGSTER_HOME"),
+                        help="instance directory (default: $DAGSTER_HOME)")
+    parser.add_argument("--job", default=JOB_NAME)
+    parser.add_argument("--last", type=int, default=LAST_RUNS, help="number of most recent runs to analyse")
+    parser.add_argument("--run", help="analyse this run only")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+    if not args.dagster_home:
+        parser.error("set DAGSTER_HOME or pass --dagster-home")
+
+    summary = summarize(load_runs(args.dagster_home, args.job, args.last, args.run), upstream_steps(args.job))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
@@ -0,0 +1,263 @@
+"""
+Warm worker for the Python stages of ELT_Pipeline_Job (GX validation, Data Docs, EDA/ML).
+
+A cold `python GX/GX_Validation_Report.py` or `python EDA_ML/EDA_ML.py` spends
+several seconds importing great_expectations, pandas, scikit-learn, xgboost and
+seaborn before doing any work. The worker imports those libraries once and
+forks a child per run: the child already has them in memory, loads the entry
+script fresh and calls its `main(argv)`.
+
+    python -m dagster_proj.worker serve                      # keep running next to dagster dev
+    python -m dagster_proj.worker run gx -- --mode validate  # what the ops call
+
+`run` relays the child's stdout/stderr and exits with its exit code, so the ops
+keep streaming, timing and timing out the command as before (`run_command`).
+When no worker is listening, `run` calls the entry point in its own process
+instead - still without the module-level setup the scripts used to do.
+
+Only third-party libraries are preloaded; project modules read OLIST_* and
+EDA_* variables at import time, so they are imported in the child after the
+caller's environment and working directory are applied. Each run gets its own
+process group, killed when the caller disconnects (op timeout or termination).
+
+The preloaded numpy / scikit-learn / xgboost have already sized their BLAS and
+OpenMP thread pools, so the OMP_NUM_THREADS-style variables set by the op do
+not reach a forked child; the entry point runs under
+`threadpoolctl.threadpool_limits(OLIST_OP_THREADS)` instead.
+"""
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+THREADS_ENV = "OLIST_OP_THREADS"  # set by scheduling.slot_env
+SOCKET_PATH = os.environ.get("OLIST_WORKER_SOCKET",
+                             os.path.join(tempfile.gettempdir(), f"olist-worker-{os.getuid()}.sock"))
+EXIT_MARKER = b"\x00olist-worker-exit "
+
+# Entry scripts (each defines `main(argv) -> int`) and the libraries preloaded for them
+ENTRY_POINTS = {
+    "gx": "GX/GX_Validation_Report.py",
+    "eda": "EDA_ML/EDA_ML.py",
+}
+PRELOAD = {
+    "gx": ["great_expectations", "sqlalchemy", "pandas"],
+    "eda": ["pandas", "numpy", "pyarrow", "matplotlib.pyplot", "seaborn",
+            "sklearn.pipeline", "sklearn.compose", "sklearn.preprocessing", "sklearn.linear_model",
+            "sklearn.impute", "sklearn.metrics", "xgboost"],
+}
+
+
+def call_entry(name, argv) -> int:
+    """Loads the entry script `name` as a module and returns `main(argv)`."""
+    path = REPO_ROOT / ENTRY_POINTS[name]
+    # Same import environment as `python <script>`: the script's folder first on sys.path
+    sys.path.insert(0, str(path.parent))
+    sys.argv = [str(path)] + list(argv)
+    spec = importlib.util.spec_from_file_location(f"olist_{name}_entry", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        with _thread_limits():
+            spec.loader.exec_module(module)
+            return module.main(list(argv)) or 0
+    except SystemExit as e:  # argparse errors and --help
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+
+
+def _thread_limits():
+    """Caps the already loaded BLAS / OpenMP pools at OLIST_OP_THREADS (no-op when unset)."""
+    threads = os.environ.get(THREADS_ENV)
+    if not threads:
+        return contextlib.nullcontext()
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=int(threads))
+
+
+# ============================================
+# Server
+# ============================================
+def preload(names):
+    # Headless: no child may try to open a display window
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    modules = dict.fromkeys(module for name in names for module in PRELOAD[name])
+    for module in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"⚠️  [worker] {module} not preloaded: {e}")
+            continue
+        print(f"   [worker] preloaded {module} in {time.perf_counter() - start:.2f}s")
+
+
+def _run_child(conn, request):
+    """Forked child: applies the caller's environment, runs the entry point, never returns."""
+    code = 1
+    try:
+        os.setsid()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        code = call_entry(request["entry"], request["argv"])
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _read_request(conn) -> dict:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ConnectionError("client closed before sending a request")
+        data += chunk
+    request = json.loads(data)
+    if request.get("entry") not in ENTRY_POINTS:
+        raise ValueError(f"unknown entry point {request.get('entry')!r}")
+    return request
+
+
+def serve(socket_path=SOCKET_PATH, entries=tuple(ENTRY_POINTS)):
+    """Accepts runs on `socket_path` until interrupted; one forked child per run."""
+    preload(entries)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(16)
+    print(f"✅ [worker] Listening on {socket_path} (entries: {', '.join(entries)})")
+    # SIGTERM (e.g. from a process manager) shuts down like Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    running = {}  # pid -> client connection
+    killed = set()
+    try:
+        while True:
+            watched = [conn for pid, conn in running.items() if pid not in killed]
+            readable, _, _ = select.select([server] + watched, [], [], 1.0)
+            for sock in readable:
+                if sock is server:
+                    conn, _ = server.accept()
+                    try:
+                        request = _read_request(conn)
+                    except (ValueError, ConnectionError) as e:
+                        conn.sendall(f"❌ [worker] {e}\n".encode() + EXIT_MARKER + b"2\n")
+                        conn.close()
+                        continue
+                    sys.stdout.flush()
+                    pid = os.fork()
+                    if pid == 0:
+                        server.close()
+                        for other in running.values():
+                            other.close()
+                        _run_child(conn, request)
+                    running[pid] = conn
+                    print(f"▶ [worker] {request['entry']} {' '.join(request['argv'])} (pid {pid})")
+                elif not sock.recv(1, socket.MSG_PEEK):
+                    # The caller went away (timeout, run terminated): stop its run
+                    pid = next(p for p, c in running.items() if c is sock)
+                    print(f"⚠️  [worker] Caller of pid {pid} disconnected, killing it")
+                    killed.add(pid)
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except ProcessLookupError:  # not in its own session yet
+                        os.kill(pid, signal.SIGKILL)
+
+            # Reap finished children and hand their exit code to the caller
+            while running:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+                conn = running.pop(pid)
+                killed.discard(pid)
+                code = os.waitstatus_to_exitcode(status)
+                try:
+                    conn.sendall(EXIT_MARKER + str(code).encode() + b"\n")
+                except OSError:
+                    pass
+                conn.close()
+                print(f"{'✅' if code == 0 else '❌'} [worker] pid {pid} exited with {code}")
+    except KeyboardInterrupt:
+        print("🛑 [worker] Shutting down")
+    finally:
+        server.close()
+        os.unlink(socket_path)
+        for pid in running:
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+# ============================================
+# Client
+# ============================================
+def run(entry, argv, socket_path=SOCKET_PATH) -> int:
+    """Runs `entry` on the warm worker, relaying its output; in this process if none is running."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        print(f"💡 [worker] No warm worker on {socket_path}; running {entry} in-process "
+              f"(start one with: python -m dagster_proj.worker serve)")
+        return call_entry(entry, argv)
+
+    request = {"entry": entry, "argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+    client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+    code = 1
+    with client, client.makefile("rb") as stream:
+        for line in stream:
+            if line.startswith(EXIT_MARKER):
+                code = int(line[len(EXIT_MARKER):])
+                break
+            sys.stdout.buffer.write(line)
+            sys.stdout.buffer.flush()
+        else:
+            print("❌ [worker] Connection closed before the run finished")
+    return code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm worker for the GX and EDA/ML stages")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket of the worker")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="preload the libraries and accept runs")
+    serve_parser.add_argument("--entries", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS),
+                              help="entry points whose libraries are preloaded")
+    run_parser = commands.add_parser("run", help="run an entry point on the worker (or in-process)")
+    run_parser.add_argument("entry", choices=list(ENTRY_POINTS))
+    run_parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments for the entry point, after --")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.socket, args.entries)
+    else:
+        entry_args = args.args[1:] if args.args[:1] == ["--"] else args.args
+        sys.exit(run(args.entry, entry_args, args.socket))
@@ -0,0 +1,183 @@
+"""
+Dashboard series for the dashboard API, read from the dbt agg layer.
+
+`DashboardStore` loads `agg_dashboard_series` with one query per data version
+and keeps every endpoint's JSON pre-serialised (plain and gzip, with an ETag),
+so any number of viewers costs a single warehouse query per pipeline run. The
+pipeline bumps the version stamp file when new aggregates are built; the store
+notices on the next request and reloads.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+SERIES_TABLE = "agg_dashboard_series"
+TABS = ("customers", "sellers", "orders")
+VERSION_FILE = Path(os.environ.get(
+    "DASHBOARD_VERSION_FILE", Path(__file__).resolve().parent / ".state" / "version.txt"
+))
+
+
+def write_version_stamp(version: str = None, path=VERSION_FILE) -> str:
+    """Records a new data version (called by the pipeline once the aggregates are rebuilt)."""
+    version = version or uuid.uuid4().hex
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_version_stamp(path=VERSION_FILE):
+    try:
+        return Path(path).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def series_columns(df) -> dict:
+    """Columnar {year, label, value} lists for one series (year None = all years)."""
+    return {
+        "year": [None if pd.isna(y) else int(y) for y in df["year"]],
+        "label": [None if pd.isna(l) else str(l) for l in df["label"]],
+        "value": [float(v) for v in df["value"]],
+    }
+
+
+def group_tabs(df) -> dict:
+    """{tab: {series: columns}} for the rows of the series table."""
+    tabs = {}
+    for (tab, series), rows in df.groupby(["tab", "series"], sort=True):
+        tabs.setdefault(tab, {})[series] = series_columns(rows)
+    return tabs
+
+
+def load_series_table(warehouse):
+    return warehouse.query_df(
+        f"SELECT tab, series, year, label, value FROM {warehouse.table(SERIES_TABLE)}"
+    )
+
+
+def fetch_tab(warehouse, tab: str) -> dict:
+    """
+    All series of one tab, all years, as {series: columns}.
+
+    This is the same single query index.html issues per tab in BigQuery mode,
+    so it can be checked against the DuckDB stand-in.
+    """
+    df = warehouse.query_df(
+        f"SELECT tab, series, year, label, value FROM {warehouse.table(SERIES_TABLE)} WHERE tab = :tab",
+        {"tab": tab},
+    )
+    return group_tabs(df).get(tab, {})
+
+
+def fetch_tabs(warehouse, tabs=TABS, max_workers=None) -> dict:
+    """Fetches several tabs concurrently over the shared pool: {tab: {series: columns}}."""
+    tabs = list(tabs)
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(tabs), warehouse.pool_size) or 1) as executor:
+        return dict(zip(tabs, executor.map(lambda tab: fetch_tab(warehouse, tab), tabs)))
+
+
+class Payload:
+    """One endpoint's response body, pre-serialised and pre-compressed."""
+
+    def __init__(self, obj):
+        self.body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+class DashboardStore:
+    """Versioned in-memory cache of the dashboard endpoints."""
+
+    def __init__(self, warehouse, version_file=VERSION_FILE, poll_interval=1.0):
+        self.warehouse = warehouse
+        self.version_file = Path(version_file)
+        self.poll_interval = poll_interval
+        self.version = None
+        self.payloads = {}
+        self.loaded_at = None
+        self._checked_at = 0.0
+        self._forced = True
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Drops the cached payloads on the next request, even if the stamp did not change."""
+        self._forced = True
+
+    def _stale(self) -> bool:
+        if self._forced or self.version is None:
+            return True
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_interval:
+            return False
+        self._checked_at = now
+        if read_version_stamp(self.version_file) not in (None, self.version):
+            self._forced = True
+        return self._forced
+
+    def build_payloads(self, df, version) -> dict:
+        """Endpoint path -> Payload for every series, every tab and the manifest."""
+        payloads = {}
+        tabs = group_tabs(df)
+        for tab, series in tabs.items():
+            payloads[f"/tabs/{tab}"] = Payload({"version": version, "tab": tab, "series": series})
+            for name, columns in series.items():
+                payloads[f"/series/{name}"] = Payload({"version": version, "tab": tab, "series": name, **columns})
+
+        payloads["/manifest"] = Payload({
+            "version": version,
+            "tabs": {tab: sorted(series) for tab, series in tabs.items()},
+        })
+        return payloads
+
+    def load(self):
+        """Reads the whole series table (a few thousand rows) and rebuilds the payloads."""
+        version = read_version_stamp(self.version_file) or uuid.uuid4().hex
+        df = load_series_table(self.warehouse)
+        self.payloads = self.build_payloads(df, version)
+        self.version = version
+        self.loaded_at = time.time()
+        print(f"📦 Loaded {len(df)} dashboard rows ({len(self.payloads)} endpoints), version {version}")
+
+    async def get(self, path: str):
+        """Payload for `path`, reloading first if the data version changed."""
+        if self._stale():
+            async with self._lock:
+                # Only the first waiter reloads; the rest reuse its result
+                if self._forced or self.version is None:
+                    self._forced = False
+                    try:
+                        await asyncio.to_thread(self.load)
+                    except Exception:
+                        self._forced = True
+                        raise
+        return self.payloads.get(path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from dagster_proj.resources.warehouse import get_warehouse
+
+    parser = argparse.ArgumentParser(description="Fetch dashboard tabs the way index.html does (one query per tab)")
+    parser.add_argument("tabs", nargs="*", default=list(TABS))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for tab, series in fetch_tabs(get_warehouse(), args.tabs).items():
+        rows = sum(len(columns["value"]) for columns in series.values())
+        print(f"📊 {tab}: {len(series)} series, {rows} rows")
+    print(f"⏱️ Fetched {len(args.tabs)} tabs in {time.perf_counter() - start:.2f}s")
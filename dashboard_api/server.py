@@ -0,0 +1,147 @@
+"""
+Dashboard data API: serves the index.html chart series as cached JSON.
+
+    python dashboard_api/server.py --port 8765
+    open index.html?api=http://localhost:8765
+
+GET  /manifest          tabs, series names and the data version
+GET  /tabs/<tab>        every series of one dashboard tab
+GET  /series/<series>   one series as columnar {year, label, value}
+POST /invalidate        reload from the warehouse on the next request
+GET  /health
+
+Responses are gzip-compressed when the client accepts it and carry an ETag,
+so repeat loads are answered with 304 Not Modified.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dagster_proj.resources.warehouse import get_warehouse
+from dashboard_api.dashboard_data import VERSION_FILE, DashboardStore
+
+MAX_HEADER_BYTES = 16 * 1024
+KEEP_ALIVE_SECONDS = 15
+
+REASONS = {200: "OK", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class DashboardServer:
+    """Minimal HTTP/1.1 server (keep-alive, GET/HEAD/POST/OPTIONS) on top of asyncio streams."""
+
+    def __init__(self, store: DashboardStore, allow_origin="*"):
+        self.store = store
+        self.allow_origin = allow_origin
+
+    async def read_request(self, reader):
+        """Returns (method, path, headers), or None when the client closed the connection."""
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS)
+        if len(head) > MAX_HEADER_BYTES:
+            raise ValueError("Request header too large")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, _version = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        # Bodies are never used; drain them so keep-alive stays in sync
+        length = int(headers.get("content-length", 0) or 0)
+        if length:
+            await reader.readexactly(length)
+        return method.upper(), target.split("?", 1)[0].rstrip("/") or "/", headers
+
+    def response(self, status, body=b"", headers=None, head_only=False):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}",
+                 f"Access-Control-Allow-Origin: {self.allow_origin}",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (b"" if head_only else body)
+
+    async def handle(self, method, path, headers):
+        if method == "OPTIONS":
+            return self.response(204, headers={"Access-Control-Allow-Methods": "GET, HEAD, POST, OPTIONS",
+                                               "Access-Control-Allow-Headers": "If-None-Match"})
+        if path == "/health":
+            return self.response(200, b"ok", {"Content-Type": "text/plain"})
+        if path == "/invalidate":
+            if method != "POST":
+                return self.response(405, headers={"Allow": "POST"})
+            self.store.invalidate()
+            return self.response(204)
+        if method not in ("GET", "HEAD"):
+            return self.response(405, headers={"Allow": "GET, HEAD"})
+
+        payload = await self.store.get(path)
+        if payload is None:
+            return self.response(404, b'{"error":"not found"}', {"Content-Type": "application/json"})
+
+        cache_headers = {
+            "ETag": payload.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if payload.etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            return self.response(304, headers=cache_headers)
+
+        body = payload.body
+        content_headers = {"Content-Type": "application/json", **cache_headers}
+        if "gzip" in headers.get("accept-encoding", ""):
+            body = payload.gzip_body
+            content_headers["Content-Encoding"] = "gzip"
+        return self.response(200, body, content_headers, head_only=(method == "HEAD"))
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(self.response(400, headers={"Connection": "close"}))
+                    break
+
+                method, path, headers = request
+                try:
+                    writer.write(await self.handle(method, path, headers))
+                except Exception as e:
+                    print(f"❌ {method} {path} failed: {e}")
+                    writer.write(self.response(500, headers={"Connection": "close"}))
+                    break
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve(host, port, store, allow_origin="*"):
+    app = DashboardServer(store, allow_origin)
+    server = await asyncio.start_server(app.serve_client, host, port, limit=MAX_HEADER_BYTES)
+    print(f"🚀 Dashboard API listening on http://{host}:{port} (version file: {store.version_file})")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the dashboard series as cached JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--allow-origin", default="*", help="CORS origin allowed to read the API")
+    parser.add_argument("--version-file", default=str(VERSION_FILE))
+    args = parser.parse_args()
+
+    store = DashboardStore(get_warehouse(), version_file=args.version_file)
+    try:
+        asyncio.run(serve(args.host, args.port, store, args.allow_origin))
+    except KeyboardInterrupt:
+        print("👋 Dashboard API stopped.")
@@ -0,0 +1,107 @@
+"""
+Static snapshot of the dashboard series for GitHub Pages.
+
+Writes one columnar JSON file per dashboard tab under a content-hashed
+version directory, then points `manifest.json` at it:
+
+    dashboard_data/
+      manifest.json                 {"version", "created_at", "tabs": {tab: {"path", "series", "bytes"}}}
+      <version>/customers.json      {"version", "tab", "series": {name: {year, label, value}}}
+      <version>/sellers.json
+      <version>/orders.json
+
+Version directories are immutable, so browsers and the Pages CDN can cache
+them indefinitely; only the small manifest has to be revalidated. index.html
+fetches a tab's file the first time that tab is shown.
+
+    python dashboard_api/snapshot.py [--out-dir dashboard_data] [--keep 3]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dagster_proj.resources.warehouse import get_warehouse
+from dashboard_api.dashboard_data import group_tabs, load_series_table
+
+SNAPSHOT_DIR = Path(__file__).resolve().parents[1] / "dashboard_data"
+MANIFEST = "manifest.json"
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def export_snapshot(warehouse, out_dir=SNAPSHOT_DIR, keep=3) -> dict:
+    """
+    Exports every tab of agg_dashboard_series and returns the new manifest.
+
+    The version is a hash of the data, so re-running on unchanged aggregates
+    reuses the existing directory. Only the newest `keep` versions are kept.
+    """
+    out_dir = Path(out_dir)
+    tabs = group_tabs(load_series_table(warehouse))
+    if not tabs:
+        raise RuntimeError("agg_dashboard_series is empty; refusing to publish an empty snapshot")
+
+    bodies = {tab: _dumps(series) for tab, series in tabs.items()}
+    digest = hashlib.sha1()
+    for tab in sorted(bodies):
+        digest.update(tab.encode("utf-8") + b"\0" + bodies[tab])
+    version = digest.hexdigest()[:12]
+
+    version_dir = out_dir / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tabs": {},
+    }
+    for tab, series in tabs.items():
+        data = _dumps({"version": version, "tab": tab, "series": series})
+        _write_atomic(version_dir / f"{tab}.json", data)
+        manifest["tabs"][tab] = {
+            "path": f"{version}/{tab}.json",
+            "series": sorted(series),
+            "bytes": len(data),
+        }
+
+    # The manifest is switched last, so readers never see a half-written version
+    _write_atomic(out_dir / MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+    prune_versions(out_dir, keep=keep, current=version)
+    return manifest
+
+
+def prune_versions(out_dir, keep=3, current=None):
+    """Deletes all but the newest `keep` version directories (never the current one)."""
+    versions = sorted(
+        (p for p in Path(out_dir).iterdir() if p.is_dir()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old in versions[keep:]:
+        if old.name != current:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the dashboard series as static JSON files")
+    parser.add_argument("--out-dir", default=str(SNAPSHOT_DIR))
+    parser.add_argument("--keep", type=int, default=3, help="Number of snapshot versions to keep")
+    args = parser.parse_args()
+
+    manifest = export_snapshot(get_warehouse(), args.out_dir, args.keep)
+    total = sum(tab["bytes"] for tab in manifest["tabs"].values())
+    print(f"✅ Dashboard snapshot {manifest['version']} written to {args.out_dir} "
+          f"({len(manifest['tabs'])} tabs, {total / 1024:.1f} KiB)")